@@ -0,0 +1,206 @@
+import os
+import re
+import time
+import threading
+from typing import Dict, List, Optional
+import undetected_chromedriver as uc
+from logger import Logger
+from credentials_manager import CredentialsManager
+
+class AccountManager:
+    """
+    Менеджер нескольких аккаунтов Binance
+
+    Учетные данные всех аккаунтов хранятся в одном зашифрованном файле.
+    Для каждого аккаунта используется отдельный профиль Chrome (user-data-dir),
+    поэтому сессия переживает перезапуск и повторный вход не требуется.
+    URL распределяются между авторизованными аккаунтами, а входы разнесены
+    во времени, чтобы не создавать пиковую нагрузку на страницу логина.
+    """
+
+    def __init__(
+        self,
+        accounts_file: str = "accounts.enc",
+        profiles_dir: str = "profiles",
+        login_interval: float = 30
+    ):
+        self.logger = Logger("account_manager")
+        self.store = CredentialsManager(credentials_file=accounts_file)
+        self.profiles_dir = profiles_dir
+        self.login_interval = login_interval
+
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self._last_login_at = 0.0
+        self._authenticated: Dict[str, float] = {}
+        # URL -> ID аккаунта, закрепленного за ним
+        self._assignments: Dict[str, str] = {}
+
+    def _load_accounts(self) -> Dict[str, Dict[str, str]]:
+        """Загружает словарь аккаунтов из зашифрованного хранилища"""
+        data = self.store.load_credentials() or {}
+        return data.get("accounts", {})
+
+    def _save_accounts(self, accounts: Dict[str, Dict[str, str]]) -> bool:
+        """Сохраняет словарь аккаунтов в зашифрованное хранилище"""
+        return self.store.save_credentials({"accounts": accounts})
+
+    @staticmethod
+    def make_account_id(email: str) -> str:
+        """Формирует безопасный для файловой системы ID аккаунта из email"""
+        return re.sub(r"[^a-zA-Z0-9_.-]", "_", email.lower())
+
+    def add_account(self, email: str, password: str) -> str:
+        """
+        Добавляет или обновляет аккаунт
+
+        Args:
+            email: Логин аккаунта
+            password: Пароль аккаунта
+
+        Returns:
+            str: ID аккаунта
+        """
+        account_id = self.make_account_id(email)
+        with self._lock:
+            accounts = self._load_accounts()
+            accounts[account_id] = {
+                "email": email,
+                "password": password,
+                "profile_dir": self.profile_dir(account_id)
+            }
+            if not self._save_accounts(accounts):
+                raise RuntimeError("Не удалось сохранить аккаунт")
+
+        self.logger.info(f"✅ Аккаунт сохранен: {account_id}")
+        return account_id
+
+    def remove_account(self, account_id: str) -> bool:
+        """
+        Удаляет аккаунт (профиль браузера остается на диске)
+
+        Args:
+            account_id: ID аккаунта
+
+        Returns:
+            bool: True если аккаунт был удален
+        """
+        with self._lock:
+            accounts = self._load_accounts()
+            if account_id not in accounts:
+                return False
+            del accounts[account_id]
+            self._save_accounts(accounts)
+            self._authenticated.pop(account_id, None)
+            self._assignments = {
+                url: owner for url, owner in self._assignments.items() if owner != account_id
+            }
+
+        self.logger.info(f"✅ Аккаунт удален: {account_id}")
+        return True
+
+    def clear_accounts(self) -> bool:
+        """Удаляет все аккаунты"""
+        with self._lock:
+            self._authenticated.clear()
+            self._assignments.clear()
+            return self.store.clear_credentials()
+
+    def list_accounts(self) -> List[str]:
+        """Возвращает ID всех сохраненных аккаунтов"""
+        with self._lock:
+            return sorted(self._load_accounts())
+
+    def get_account(self, account_id: str) -> Optional[Dict[str, str]]:
+        """Возвращает данные аккаунта или None"""
+        with self._lock:
+            return self._load_accounts().get(account_id)
+
+    def profile_dir(self, account_id: str) -> str:
+        """Возвращает (и создает при необходимости) директорию профиля Chrome аккаунта"""
+        path = os.path.abspath(os.path.join(self.profiles_dir, account_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def create_driver(self, account_id: str) -> uc.Chrome:
+        """
+        Запускает Chrome с профилем аккаунта
+
+        Args:
+            account_id: ID аккаунта
+
+        Returns:
+            uc.Chrome: Драйвер с отдельным user-data-dir
+        """
+        options = uc.ChromeOptions()
+        options.add_argument('--start-maximized')
+        options.add_argument(f'--user-data-dir={self.profile_dir(account_id)}')
+        driver = uc.Chrome(options=options)
+        self.logger.info(f"✅ Запущен браузер для аккаунта {account_id}")
+        return driver
+
+    def acquire_login_slot(self, account_id: str) -> None:
+        """
+        Ожидает своей очереди на вход, разнося входы аккаунтов во времени
+
+        Args:
+            account_id: ID аккаунта (для логов)
+        """
+        with self._login_lock:
+            delay = self._last_login_at + self.login_interval - time.monotonic()
+            if delay > 0:
+                self.logger.info(f"⏳ Вход аккаунта {account_id} отложен на {delay:.0f} секунд")
+                time.sleep(delay)
+            self._last_login_at = time.monotonic()
+
+    def mark_authenticated(self, account_id: str) -> None:
+        """Отмечает аккаунт как авторизованный"""
+        with self._lock:
+            self._authenticated[account_id] = time.time()
+
+    def mark_unauthenticated(self, account_id: str) -> None:
+        """Снимает отметку авторизации; его URL будут перераспределены"""
+        with self._lock:
+            self._authenticated.pop(account_id, None)
+
+    def authenticated_accounts(self) -> List[str]:
+        """Возвращает ID авторизованных аккаунтов"""
+        with self._lock:
+            return sorted(self._authenticated)
+
+    def assign_urls(self, urls: List[str]) -> Dict[str, List[str]]:
+        """
+        Распределяет URL между авторизованными аккаунтами
+
+        Ранее назначенные URL остаются за своим аккаунтом, пока он авторизован;
+        новые и осиротевшие URL отдаются наименее загруженному аккаунту.
+
+        Args:
+            urls: Список URL для мониторинга
+
+        Returns:
+            Dict[str, List[str]]: ID аккаунта -> список URL
+        """
+        with self._lock:
+            accounts = sorted(self._authenticated)
+            if not accounts:
+                return {}
+
+            plan: Dict[str, List[str]] = {account_id: [] for account_id in accounts}
+            unassigned = []
+            for url in urls:
+                owner = self._assignments.get(url)
+                if owner in plan:
+                    plan[owner].append(url)
+                else:
+                    unassigned.append(url)
+
+            for url in unassigned:
+                owner = min(accounts, key=lambda account_id: len(plan[account_id]))
+                plan[owner].append(url)
+
+            self._assignments = {url: owner for owner, owned in plan.items() for url in owned}
+            return plan
+
+# Создаем глобальный экземпляр менеджера
+account_manager = AccountManager(login_interval=float(os.getenv("LOGIN_MIN_INTERVAL", "30")))
@@ -1,4 +1,3 @@
-import json
 import os
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -7,43 +6,26 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 import time
 from typing import Optional, Tuple, List, Dict
 from logger import Logger
-from credentials_manager import CredentialsManager
+from credentials_manager import credentials_manager
 from timeout_manager import TimeoutManager
 from selenium.webdriver.remote.webdriver import WebDriver
 from retry_manager import retry_manager
 from telegram_manager import TelegramManager
+from config_manager import config_manager
 
 class AuthManager:
     def __init__(self, driver: WebDriver):
         self.driver = driver
         self.logger = Logger("auth_manager")
         self.timeout_manager = TimeoutManager(driver)
-        self.credentials_manager = CredentialsManager()
-        self.selectors = self._load_selectors()
-        self.wait = WebDriverWait(driver, 10)
+        self.credentials_manager = credentials_manager
+        self.wait = WebDriverWait(driver, config_manager.settings.timeout)
+        
+    @property
+    def selectors(self) -> Dict:
+        """Селекторы из текущего снимка конфигурации (обновляются без перезапуска)"""
+        return config_manager.config.selectors
         
-    def _load_selectors(self) -> Dict:
-        """Загружает селекторы из файла конфигурации"""
-        try:
-            with open('selectors.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            self.logger.warning("⚠️ Файл селекторов не найден, используются значения по умолчанию")
-            return {
-                "login": {
-                    "email_input": ["input[type='email']"],
-                    "password_input": ["input[type='password']"],
-                    "submit_button": ["button[type='submit']"],
-                    "2fa_input": ["input[type='text']"],
-                    "2fa_submit": ["button[type='submit']"]
-                },
-                "dashboard": {
-                    "container": [".dashboard-container"],
-                    "logout_button": [".logout-button"],
-                    "confirm_logout": [".confirm-logout"]
-                }
-            }
-            
     def _find_element(self, selectors: List[str], timeout: int = 10) -> Optional[Tuple[By, str]]:
         """
         Находит элемент по списку селекторов
@@ -220,8 +202,9 @@ class AuthManager:
             
     def set_credentials(self, email: str, password: str) -> None:
         """Установка учетных данных"""
-        self.credentials_manager.set_credentials(email, password)
-        self._save_credentials()
+        success, message = self.credentials_manager.update_credentials({"email": email, "password": password})
+        if not success:
+            self.logger.error(f"❌ {message}")
         
     def wait_for_2fa(self, timeout: int = 300) -> bool:
         """
@@ -0,0 +1,557 @@
+"""
+Поддельный WebDriver для нагрузочных прогонов без браузера
+
+FakeWebDriver реализует ту часть API Selenium, которой пользуются менеджеры
+проекта: get, refresh, find_element(s), execute_script, save_screenshot,
+get_screenshot_as_png, quit, current_url, window_handles и switch_to.
+Страницы задаются HTML-фикстурами, задержки команд - моделью с
+фиксированным seed, ошибки - вероятностями или сценарием. Тысячи таких
+драйверов работают в одном процессе, а время прогона воспроизводимо.
+
+Пример:
+    driver = FakeWebDriver(
+        pages={"https://www.binance.com/": open("benchmarks/fixtures/leaderboard.html").read()},
+        latency={Command.GET: (0.8, 0.2), Command.FIND_ELEMENT: 0.01},
+        failures={Command.REFRESH: 0.01},
+        seed=1
+    )
+"""
+import re
+import time
+import random
+import struct
+import threading
+import zlib
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+from selenium.common.exceptions import (
+    InvalidSelectorException,
+    NoSuchElementException,
+    NoSuchWindowException,
+    WebDriverException
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
+
+# Задержка команды: секунды, (среднее, разброс) или функция от генератора случайных чисел
+Latency = Union[float, Tuple[float, float], Callable[[random.Random], float]]
+
+# Элементы без закрывающего тега
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Минимальный PNG 1x1 для снимков экрана
+_PNG_1X1 = (
+    b"\x89PNG\r\n\x1a\n"
+    + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    + struct.pack(">I", zlib.crc32(b"IHDR" + struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)))
+    + struct.pack(">I", 12) + b"IDAT" + zlib.compress(b"\x00\xff\xff\xff")
+    + struct.pack(">I", zlib.crc32(b"IDAT" + zlib.compress(b"\x00\xff\xff\xff")))
+    + struct.pack(">I", 0) + b"IEND" + struct.pack(">I", zlib.crc32(b"IEND"))
+)
+
+class Node:
+    """Узел разобранной HTML-страницы (общий для всех драйверов с этой страницей)"""
+
+    __slots__ = ("tag", "attrs", "children", "parent", "text")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List["Node"] = []
+        self.parent = parent
+        self.text = ""
+
+    def iter(self):
+        """Обходит потомков в порядке документа"""
+        for child in self.children:
+            yield child
+            yield from child.iter()
+
+    def inner_text(self) -> str:
+        """Текст узла и потомков с нормализованными пробелами"""
+        parts = [self.text] + [child.inner_text() for child in self.children if "hidden" not in child.attrs]
+        return " ".join(" ".join(parts).split())
+
+class _TreeBuilder(HTMLParser):
+    """Строит дерево Node из HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self._current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value if value is not None else "" for name, value in attrs}, self._current)
+        self._current.children.append(node)
+        if tag not in _VOID_TAGS:
+            self._current = node
+
+    def handle_endtag(self, tag):
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        if data.strip():
+            self._current.text = f"{self._current.text} {data.strip()}".strip()
+
+_PARSED: Dict[str, Node] = {}
+_PARSED_LOCK = threading.Lock()
+
+def parse_html(html: str) -> Node:
+    """Разбирает HTML один раз на процесс: страница одинакова для всех драйверов"""
+    root = _PARSED.get(html)
+    if root is None:
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        with _PARSED_LOCK:
+            root = _PARSED.setdefault(html, builder.root)
+    return root
+
+# Простой селектор: тег, #id, .класс и [атрибут], [атрибут='значение']
+_COMPOUND_PATTERN = re.compile(
+    r"(?P<tag>[a-zA-Z][\w-]*|\*)?"
+    r"(?P<rest>(?:#[\w-]+|\.[\w-]+|\[[\w-]+(?:[~^$*]?=(?:'[^']*'|\"[^\"]*\"|[^\]]*))?\])*)$"
+)
+_PART_PATTERN = re.compile(r"#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:([~^$*]?=)('[^']*'|\"[^\"]*\"|[^\]]*))?\]")
+
+@lru_cache(maxsize=1024)
+def _compile_compound(text: str) -> Callable[[Node], bool]:
+    """Компилирует простой селектор в проверку узла"""
+    match = _COMPOUND_PATTERN.match(text)
+    if not text or not match:
+        raise InvalidSelectorException(f"Неподдерживаемый селектор: {text}")
+    tag = match.group("tag")
+    checks: List[Callable[[Node], bool]] = []
+    if tag and tag != "*":
+        checks.append(lambda node, tag=tag.lower(): node.tag == tag)
+    for element_id, class_name, attr, op, value in _PART_PATTERN.findall(match.group("rest")):
+        if element_id:
+            checks.append(lambda node, element_id=element_id: node.attrs.get("id") == element_id)
+        elif class_name:
+            checks.append(lambda node, class_name=class_name: class_name in node.attrs.get("class", "").split())
+        elif not op:
+            checks.append(lambda node, attr=attr: attr in node.attrs)
+        else:
+            value = value.strip("'\"")
+            compare = {
+                "=": lambda actual, value=value: actual == value,
+                "~=": lambda actual, value=value: value in actual.split(),
+                "^=": lambda actual, value=value: actual.startswith(value),
+                "$=": lambda actual, value=value: actual.endswith(value),
+                "*=": lambda actual, value=value: value in actual
+            }[op]
+            checks.append(lambda node, attr=attr, compare=compare: attr in node.attrs and compare(node.attrs[attr]))
+    return lambda node: node.tag != "#document" and all(check(node) for check in checks)
+
+def _select_css(root: Node, selector: str) -> List[Node]:
+    """Выбирает узлы по CSS-селектору (простые селекторы, потомок, '>' и запятая)"""
+    found: List[Node] = []
+    for group in selector.split(","):
+        tokens = group.replace(">", " > ").split()
+        if not tokens:
+            raise InvalidSelectorException(f"Пустой селектор: {selector}")
+        current = [root]
+        child_only = False
+        for token in tokens:
+            if token == ">":
+                child_only = True
+                continue
+            check = _compile_compound(token)
+            matched: List[Node] = []
+            seen = set()
+            for context in current:
+                candidates = context.children if child_only else context.iter()
+                for node in candidates:
+                    if check(node) and id(node) not in seen:
+                        seen.add(id(node))
+                        matched.append(node)
+            current = matched
+            child_only = False
+        known = {id(node) for node in found}
+        found.extend(node for node in current if id(node) not in known)
+    return found
+
+# XPath вида //тег[условие and условие], условия: @attr='v', contains(@attr, 'v'), contains(text(), 'v')
+_XPATH_PATTERN = re.compile(r"^//(?P<tag>[\w*-]+)(?:\[(?P<conditions>.*)\])?$")
+_XPATH_CONDITION = re.compile(
+    r"^(?:@(?P<attr>[\w-]+)\s*=\s*'(?P<value>[^']*)'|"
+    r"contains\(\s*(?:@(?P<contains_attr>[\w-]+)|(?P<text>text\(\)))\s*,\s*'(?P<needle>[^']*)'\s*\))$"
+)
+
+def _select_xpath(root: Node, xpath: str) -> List[Node]:
+    """Выбирает узлы по простому XPath, который используется в проекте"""
+    match = _XPATH_PATTERN.match(xpath.strip())
+    if not match:
+        raise InvalidSelectorException(f"Неподдерживаемый XPath: {xpath}")
+    tag = match.group("tag")
+    checks: List[Callable[[Node], bool]] = []
+    if tag != "*":
+        checks.append(lambda node: node.tag == tag)
+    for condition in filter(None, re.split(r"\s+and\s+", match.group("conditions") or "")):
+        parts = _XPATH_CONDITION.match(condition.strip())
+        if not parts:
+            raise InvalidSelectorException(f"Неподдерживаемое условие XPath: {condition}")
+        if parts.group("attr"):
+            checks.append(lambda node, a=parts.group("attr"), v=parts.group("value"): node.attrs.get(a) == v)
+        elif parts.group("text"):
+            checks.append(lambda node, needle=parts.group("needle"): needle in node.text)
+        else:
+            checks.append(
+                lambda node, a=parts.group("contains_attr"), needle=parts.group("needle"): needle in node.attrs.get(a, "")
+            )
+    return [node for node in root.iter() if all(check(node) for check in checks)]
+
+def select(root: Node, by: str, value: str) -> List[Node]:
+    """Выбирает узлы по локатору Selenium"""
+    if by == By.CSS_SELECTOR:
+        return _select_css(root, value)
+    if by == By.XPATH:
+        return _select_xpath(root, value)
+    if by == By.ID:
+        return [node for node in root.iter() if node.attrs.get("id") == value]
+    if by == By.CLASS_NAME:
+        return [node for node in root.iter() if value in node.attrs.get("class", "").split()]
+    if by == By.TAG_NAME:
+        return [node for node in root.iter() if node.tag == value.lower()]
+    if by == By.NAME:
+        return [node for node in root.iter() if node.attrs.get("name") == value]
+    raise InvalidSelectorException(f"Неподдерживаемый тип локатора: {by}")
+
+class FakeWebElement:
+    """Элемент страницы поддельного драйвера"""
+
+    def __init__(self, driver: "FakeWebDriver", node: Node):
+        self._driver = driver
+        self._node = node
+
+    @property
+    def tag_name(self) -> str:
+        return self._node.tag
+
+    @property
+    def text(self) -> str:
+        self._driver.execute(Command.GET_ELEMENT_TEXT)
+        return self._node.inner_text() if self._visible() else ""
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        self._driver.execute(Command.GET_ELEMENT_ATTRIBUTE)
+        overrides = self._driver._overrides.get(id(self._node), {})
+        if name in overrides:
+            return overrides[name]
+        return self._node.attrs.get(name)
+
+    def is_displayed(self) -> bool:
+        # Selenium проверяет видимость скриптом
+        self._driver.execute(Command.W3C_EXECUTE_SCRIPT)
+        return self._visible()
+
+    def _visible(self) -> bool:
+        node = self._node
+        while node is not None:
+            if "hidden" in self._driver._overrides.get(id(node), node.attrs):
+                return False
+            node = node.parent
+        return True
+
+    def is_enabled(self) -> bool:
+        self._driver.execute(Command.IS_ELEMENT_ENABLED)
+        return "disabled" not in self._node.attrs
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> "FakeWebElement":
+        return self._driver._find(self._node, by, value, single=True)[0]
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List["FakeWebElement"]:
+        return self._driver._find(self._node, by, value, single=False)
+
+    def send_keys(self, *values: str) -> None:
+        self._driver.execute(Command.SEND_KEYS_TO_ELEMENT)
+        state = self._driver._overrides.setdefault(id(self._node), dict(self._node.attrs))
+        state["value"] = state.get("value", "") + "".join(values)
+
+    def clear(self) -> None:
+        self._driver.execute(Command.CLEAR_ELEMENT)
+        self._driver._overrides.setdefault(id(self._node), dict(self._node.attrs))["value"] = ""
+
+    def click(self) -> None:
+        """Нажатие: переход по ссылке, отправка формы или обработчик из on_click"""
+        self._driver.execute(Command.CLICK_ELEMENT)
+        for selector, handler in self._driver.click_handlers:
+            if self._node in _select_css(self._driver._root, selector):
+                handler(self._driver, self)
+                return
+        node = self._node
+        if node.tag == "a" and node.attrs.get("href"):
+            self._driver._navigate(urljoin(self._driver._url, node.attrs["href"]))
+            return
+        if node.tag == "button" and node.attrs.get("type", "submit") == "submit":
+            form = node.parent
+            while form is not None and form.tag != "form":
+                form = form.parent
+            if form is not None:
+                self._driver._navigate(urljoin(self._driver._url, form.attrs.get("action", "")))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeWebElement) and other._node is self._node
+
+    def __hash__(self) -> int:
+        return id(self._node)
+
+class _SwitchTo:
+    """Переключение вкладок поддельного драйвера"""
+
+    def __init__(self, driver: "FakeWebDriver"):
+        self._driver = driver
+
+    def window(self, handle: str) -> None:
+        driver = self._driver
+        driver.execute(Command.SWITCH_TO_WINDOW)
+        if handle not in driver._tabs:
+            raise NoSuchWindowException(f"Нет вкладки {handle}")
+        driver._handle = handle
+
+    def new_window(self, type_hint: Optional[str] = None) -> None:
+        driver = self._driver
+        driver.execute(Command.NEW_WINDOW)
+        driver._tab_counter += 1
+        handle = f"tab-{driver._tab_counter}"
+        driver._tabs[handle] = "about:blank"
+        driver._handle = handle
+        driver._load("about:blank")
+
+class FakeWebDriver:
+    """
+    WebDriver без браузера со сценарием задержек, ошибок и страниц
+
+    Каждая команда, как и в Selenium, проходит через execute с именем из
+    selenium.webdriver.remote.command.Command, поэтому обертки driver.execute
+    (счетчики команд, замеры) работают и с этим драйвером. В execute
+    проверяется, не завершен ли драйвер, применяются запланированные и случайные ошибки, затем
+    выдерживается задержка по модели. Генератор случайных чисел создается
+    из seed, поэтому одинаковые прогоны дают одинаковые задержки и ошибки.
+    """
+
+    def __init__(
+        self,
+        pages: Optional[Dict[str, Union[str, Callable[[str], str]]]] = None,
+        latency: Optional[Dict[str, Latency]] = None,
+        failures: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None,
+        time_scale: float = 1.0,
+        scripts: Optional[List[Tuple[str, Callable[..., Any]]]] = None
+    ):
+        """
+        Args:
+            pages: Префикс URL -> HTML или функция (URL) -> HTML; выбирается самый длинный префикс
+            latency: Команда (имя из Command) -> задержка в секундах; ключ "*" задает задержку остальных команд
+            failures: Команда -> вероятность WebDriverException
+            seed: Seed генератора задержек и ошибок
+            time_scale: Множитель всех задержек (0 - без ожидания)
+            scripts: Дополнительные обработчики execute_script (подстрока скрипта, функция)
+        """
+        self.pages = dict(pages or {})
+        self.latency = dict(latency or {})
+        self.failures = dict(failures or {})
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.scripts: List[Tuple[str, Callable[..., Any]]] = list(scripts or []) + [
+            ("document.readyState", lambda driver, *args: "complete"),
+            ("return 1", lambda driver, *args: 1),
+            ("data-row-key", _read_rows)
+        ]
+        self.click_handlers: List[Tuple[str, Callable[["FakeWebDriver", FakeWebElement], None]]] = []
+        self.commands: Dict[str, int] = {}
+        self.quit_called = False
+
+        self._lock = threading.Lock()
+        self._scheduled_failures: List[Tuple[str, Exception]] = []
+        self._crashed = False
+        self._tab_counter = 1
+        self._tabs: Dict[str, str] = {"tab-1": "about:blank"}
+        self._handle = "tab-1"
+        self._root = parse_html("")
+        self._overrides: Dict[int, Dict[str, str]] = {}
+        self.switch_to = _SwitchTo(self)
+        self.session_id = f"fake-{id(self):x}"
+
+    # Сценарий ошибок
+
+    def fail_next(self, command: str, exception: Optional[Exception] = None, count: int = 1) -> None:
+        """Следующие count вызовов команды (или "*" - любой) завершатся ошибкой"""
+        with self._lock:
+            for _ in range(count):
+                self._scheduled_failures.append((command, exception or WebDriverException(f"Запланированная ошибка {command}")))
+
+    def crash(self) -> None:
+        """Имитирует падение браузера: все последующие команды завершаются ошибкой"""
+        self._crashed = True
+
+    def on_click(self, selector: str, handler: Callable[["FakeWebDriver", FakeWebElement], None]) -> None:
+        """Задает обработчик нажатия на элементы по CSS-селектору"""
+        self.click_handlers.append((selector, handler))
+
+    def show(self, selector: str) -> None:
+        """Делает видимыми скрытые (атрибут hidden) элементы текущей страницы"""
+        for node in _select_css(self._root, selector):
+            self._overrides.setdefault(id(node), dict(node.attrs)).pop("hidden", None)
+
+    def execute(self, driver_command: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Учитывает команду, применяет ошибки и задержку (как RemoteWebDriver.execute)"""
+        name = driver_command
+        with self._lock:
+            self.commands[name] = self.commands.get(name, 0) + 1
+            if self._crashed or self.quit_called:
+                raise WebDriverException("invalid session id: браузер недоступен")
+            for index, (command, exception) in enumerate(self._scheduled_failures):
+                if command in (name, "*"):
+                    del self._scheduled_failures[index]
+                    raise exception
+            probability = self.failures.get(name, self.failures.get("*", 0.0))
+            if probability and self.rng.random() < probability:
+                raise WebDriverException(f"Случайная ошибка {name}")
+            delay = self._delay(name)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _delay(self, name: str) -> float:
+        """Задержка команды по модели (вызывается под блокировкой: генератор общий)"""
+        model = self.latency.get(name, self.latency.get("*", 0.0))
+        if callable(model):
+            value = model(self.rng)
+        elif isinstance(model, tuple):
+            mean, spread = model
+            value = max(0.0, self.rng.gauss(mean, spread))
+        else:
+            value = model
+        return value * self.time_scale
+
+    # Навигация
+
+    def _page(self, url: str) -> str:
+        """Находит HTML страницы по самому длинному подходящему префиксу"""
+        prefixes = [prefix for prefix in self.pages if url.startswith(prefix)]
+        if not prefixes:
+            return "<html><body></body></html>"
+        page = self.pages[max(prefixes, key=len)]
+        return page(url) if callable(page) else page
+
+    def _load(self, url: str) -> None:
+        self._tabs[self._handle] = url
+        self._root = parse_html(self._page(url))
+        self._overrides = {}
+
+    def _navigate(self, url: str) -> None:
+        self.execute(Command.GET)
+        self._load(url)
+
+    def get(self, url: str) -> None:
+        self._navigate(url)
+
+    def refresh(self) -> None:
+        self.execute(Command.REFRESH)
+        self._load(self._url)
+
+    @property
+    def _url(self) -> str:
+        return self._tabs[self._handle]
+
+    @property
+    def current_url(self) -> str:
+        self.execute(Command.GET_CURRENT_URL)
+        return self._url
+
+    @property
+    def title(self) -> str:
+        self.execute(Command.GET_TITLE)
+        titles = select(self._root, By.TAG_NAME, "title")
+        return titles[0].inner_text() if titles else ""
+
+    @property
+    def page_source(self) -> str:
+        self.execute(Command.GET_PAGE_SOURCE)
+        return self._page(self._url)
+
+    @property
+    def window_handles(self) -> List[str]:
+        self.execute(Command.W3C_GET_WINDOW_HANDLES)
+        return list(self._tabs)
+
+    @property
+    def current_window_handle(self) -> str:
+        self.execute(Command.W3C_GET_CURRENT_WINDOW_HANDLE)
+        return self._handle
+
+    def close(self) -> None:
+        """Закрывает текущую вкладку"""
+        self.execute(Command.CLOSE)
+        self._tabs.pop(self._handle, None)
+
+    # Поиск элементов
+
+    def _find(self, root: Node, by: str, value: Optional[str], single: bool) -> List[FakeWebElement]:
+        if root is self._root:
+            command = Command.FIND_ELEMENT if single else Command.FIND_ELEMENTS
+        else:
+            command = Command.FIND_CHILD_ELEMENT if single else Command.FIND_CHILD_ELEMENTS
+        self.execute(command)
+        nodes = select(root, by, value)
+        if single and not nodes:
+            raise NoSuchElementException(f"Элемент не найден: {by}={value}")
+        return [FakeWebElement(self, node) for node in (nodes[:1] if single else nodes)]
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> FakeWebElement:
+        return self._find(self._root, by, value, single=True)[0]
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List[FakeWebElement]:
+        return self._find(self._root, by, value, single=False)
+
+    # Скрипты и снимки
+
+    def execute_script(self, script: str, *args) -> Any:
+        """Выполняет первый обработчик, подстрока которого есть в скрипте (иначе None)"""
+        self.execute(Command.W3C_EXECUTE_SCRIPT)
+        for needle, handler in self.scripts:
+            if needle in script:
+                return handler(self, *args)
+        return None
+
+    def get_screenshot_as_png(self) -> bytes:
+        self.execute(Command.SCREENSHOT)
+        return _PNG_1X1
+
+    def save_screenshot(self, filename: str) -> bool:
+        data = self.get_screenshot_as_png()
+        with open(filename, "wb") as f:
+            f.write(data)
+        return True
+
+    def quit(self) -> None:
+        self.execute(Command.QUIT)
+        self.quit_called = True
+
+def _read_rows(driver: FakeWebDriver, row_selector: str = "tr[data-row-key]") -> List[Dict[str, str]]:
+    """Обработчик скрипта position_reader.read_positions по разобранной странице"""
+
+    def text(row: Node, selector: str) -> str:
+        nodes = _select_css(row, selector)
+        return nodes[0].inner_text() if nodes else "N/A"
+
+    rows = []
+    for row in _select_css(driver._root, row_selector):
+        numbers = _select_css(row, "td[aria-colindex='6'] .Number")
+        rows.append({
+            "key": row.attrs.get("data-row-key"),
+            "symbol": text(row, ".name"),
+            "leverage": text(row, "td[aria-colindex='2']"),
+            "entry_price": text(row, "td[aria-colindex='3']"),
+            "mark_price": text(row, "td[aria-colindex='4']"),
+            "time": text(row, "td[aria-colindex='5']"),
+            "pnl": numbers[0].inner_text() if len(numbers) > 0 else "N/A",
+            "pnl_percent": numbers[1].inner_text() if len(numbers) > 1 else "N/A"
+        })
+    return rows
@@ -0,0 +1,85 @@
+"""
+Замер пропускной способности разбора текста ячеек
+
+Запуск из корня проекта:
+    python benchmarks/number_parser_bench.py [--tokens 200000] [--unique 2000]
+
+Набор строк повторяет то, что приходит со страницы при каждом обновлении:
+большинство значений (символы, плечо, цена входа) повторяются из раза в раз,
+меняются только текущая цена и PNL. Сравниваются первый проход (кеш пуст,
+каждое уникальное значение разбирается заново) и повторный проход с
+прогретым кешем. Чем больше --unique, тем ближе первый проход к разбору
+без кеша.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import number_parser
+from number_parser import parse_decimal, parse_float, parse_leverage, parse_timestamp
+
+def make_tokens(count: int, unique: int, seed: int = 1) -> dict:
+    """Создает наборы строк разных видов с заданным числом уникальных значений"""
+    rng = random.Random(seed)
+
+    def pool(factory: Callable[[], str]) -> List[str]:
+        values = [factory() for _ in range(unique)]
+        return [rng.choice(values) for _ in range(count)]
+
+    return {
+        "price": pool(lambda: f"{rng.uniform(0.0001, 70000):,.4f}"),
+        "amount_usdt": pool(lambda: f"{rng.uniform(-50000, 50000):+,.2f} USDT"),
+        "percent": pool(lambda: f"{rng.uniform(-300, 300):+.2f}%"),
+        "price_eu": pool(lambda: f"{rng.uniform(1000, 70000):,.2f}".replace(",", " ").replace(".", ",")),
+        "leverage": pool(lambda: f"Cross {rng.choice((5, 10, 20, 25, 50, 75, 100, 125))}x"),
+        "time": pool(lambda: time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(rng.uniform(1.7e9, 1.75e9))))
+    }
+
+def clear_caches() -> None:
+    """Очищает кеши разбора"""
+    parse_decimal.cache_clear()
+    parse_leverage.cache_clear()
+    number_parser._parse_time.cache_clear()
+
+def measure(parse: Callable[[str], object], tokens: List[str], cold: bool) -> float:
+    """Возвращает количество разобранных строк в секунду"""
+    if cold:
+        clear_caches()
+    else:
+        for token in tokens:
+            parse(token)
+    started = time.perf_counter()
+    for token in tokens:
+        parse(token)
+    return len(tokens) / (time.perf_counter() - started)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность number_parser")
+    parser.add_argument("--tokens", type=int, default=200_000, help="Количество строк в каждом наборе")
+    parser.add_argument("--unique", type=int, default=2_000, help="Количество уникальных значений в наборе")
+    args = parser.parse_args()
+
+    datasets = make_tokens(args.tokens, args.unique)
+    parsers = {
+        "price": parse_decimal,
+        "amount_usdt": parse_decimal,
+        "percent": parse_float,
+        "price_eu": parse_decimal,
+        "leverage": parse_leverage,
+        "time": parse_timestamp
+    }
+
+    print(f"{'набор':<12} {'первый проход, стр/с':>22} {'с кешем, стр/с':>18} {'ускорение':>10}")
+    for name, tokens in datasets.items():
+        parse = parsers[name]
+        cold = measure(parse, tokens, cold=True)
+        warm = measure(parse, tokens, cold=False)
+        print(f"{name:<12} {cold:>22,.0f} {warm:>18,.0f} {warm / cold:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Нагрузочный прогон оркестрации на поддельных драйверах
+
+Запуск из корня проекта:
+    python benchmarks/orchestration_bench.py [--monitors 500] [--drivers 50] [--duration 60]
+
+MonitorScheduler, DriverManager и DriverSupervisor работают в обычном
+режиме, но вместо Chrome используются FakeWebDriver со страницей
+benchmarks/fixtures/leaderboard.html. Проверка URL повторяет
+main.scrape_url и main.check_table_data: своя вкладка на URL, обновление,
+ожидание загрузки, чтение таблицы и сравнение со снимком. Задержки команд
+моделируются с фиксированным seed, случайные ошибки команд и падения
+браузеров (которые затем заменяет супервизор) задаются параметрами.
+В конце выводятся пропускная способность, опоздания запусков и число
+перезапусков драйверов.
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import argparse
+import threading
+import random
+import zlib
+from typing import Dict, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT)
+
+from selenium.webdriver.remote.command import Command
+from fake_webdriver import FakeWebDriver
+from driver_manager import DriverManager
+from driver_profiler import DriverProfiler
+from driver_supervisor import DriverSupervisor
+from monitor_scheduler import MonitorScheduler
+from notification_store import NotificationStore
+from page_manager import PageManager
+from position_differ import PositionDiffer
+from position_reader import position_values, read_positions
+from scraper_bench import percentile
+
+# Модель задержек команд Chrome (среднее и разброс в секундах)
+LATENCY = {
+    Command.GET: (0.8, 0.2),
+    Command.REFRESH: (0.6, 0.15),
+    Command.NEW_WINDOW: (0.05, 0.01),
+    Command.W3C_EXECUTE_SCRIPT: (0.02, 0.005),
+    "*": (0.005, 0.002)
+}
+
+class Chaos:
+    """Общий генератор падений браузеров (воспроизводимый по seed)"""
+
+    def __init__(self, crash_rate: float, seed: int):
+        self.crash_rate = crash_rate
+        self.crashes = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def maybe_crash(self, driver: FakeWebDriver) -> None:
+        with self._lock:
+            if not self.crash_rate or self._rng.random() >= self.crash_rate:
+                return
+            self.crashes += 1
+        driver.crash()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон планировщика на поддельных драйверах")
+    parser.add_argument("--monitors", type=int, default=500, help="Количество отслеживаемых URL")
+    parser.add_argument("--drivers", type=int, default=50, help="Количество драйверов")
+    parser.add_argument("--workers", type=int, default=32, help="Воркеров планировщика")
+    parser.add_argument("--interval", type=float, default=30, help="Интервал проверки URL в секундах")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность прогона в секундах")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Множитель задержек команд (0 - без ожидания)")
+    parser.add_argument("--failure-rate", type=float, default=0.001, help="Вероятность ошибки каждой команды")
+    parser.add_argument("--crash-rate", type=float, default=0.001, help="Вероятность падения браузера на проверку")
+    parser.add_argument("--probe-interval", type=float, default=2, help="Интервал проверок супервизора")
+    parser.add_argument("--seed", type=int, default=1, help="Seed задержек и ошибок")
+    parser.add_argument("--profile", action="store_true", help="Вывести время команд WebDriver по вызывающим")
+    parser.add_argument("--verbose", action="store_true", help="Не отключать логи менеджеров")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Ошибки проверок учитываются статистикой планировщика
+        logging.disable(logging.CRITICAL)
+
+    with open(os.path.join(FIXTURES, "leaderboard.html"), "r", encoding="utf-8") as f:
+        leaderboard = f.read()
+
+    generations: Dict[int, int] = {}
+
+    def launch_driver(driver_id: int) -> FakeWebDriver:
+        generations[driver_id] = generations.get(driver_id, 0) + 1
+        return FakeWebDriver(
+            pages={"https://www.binance.com/": leaderboard},
+            latency=LATENCY,
+            failures={"*": args.failure_rate},
+            seed=args.seed * 1_000_003 + driver_id * 1_009 + generations[driver_id],
+            time_scale=args.time_scale
+        )
+
+    profiler = DriverProfiler(enabled=args.profile)
+    driver_manager = DriverManager(on_register=profiler.instrument)
+    differ = PositionDiffer(NotificationStore(os.path.join(tempfile.mkdtemp(), "bench.db")))
+    chaos = Chaos(args.crash_rate, args.seed)
+    url_tabs: Dict[str, Tuple[int, str]] = {}
+    url_tabs_lock = threading.Lock()
+    durations = []
+    durations_lock = threading.Lock()
+
+    def resolve_driver_id(url: str) -> int:
+        return zlib.crc32(url.encode()) % args.drivers + 1
+
+    def scrape_url(url: str, job_id: int, driver_id: int) -> None:
+        """Повторяет main.scrape_url и main.check_table_data без Telegram"""
+        started = time.perf_counter()
+        driver = driver_manager.get_driver(driver_id)
+        if not driver:
+            raise RuntimeError(f"Драйвер {driver_id} не найден")
+        chaos.maybe_crash(driver)
+
+        with url_tabs_lock:
+            tab = url_tabs.get(url)
+        if tab and tab[0] == driver_id and tab[1] in driver.window_handles:
+            driver.switch_to.window(tab[1])
+            driver.refresh()
+        else:
+            driver.switch_to.new_window("tab")
+            with url_tabs_lock:
+                url_tabs[url] = (driver_id, driver.current_window_handle)
+            driver.get(url)
+
+        if not PageManager(driver).wait_for_page_load():
+            raise RuntimeError(f"Страница {url} не загрузилась")
+        rows = read_positions(driver)
+        for position in rows.values():
+            position_values(position)
+        differ.diff(url, rows)
+        driver_manager.update_activity(driver_id)
+
+        with durations_lock:
+            durations.append(time.perf_counter() - started)
+
+    def on_driver_replaced(driver_id: int, new_driver) -> None:
+        with url_tabs_lock:
+            for url in [url for url, tab in url_tabs.items() if tab[0] == driver_id]:
+                del url_tabs[url]
+
+    scheduler = MonitorScheduler(
+        scrape_url,
+        resolve_driver_id,
+        max_workers=args.workers,
+        default_interval=args.interval,
+        default_jitter=0.1
+    )
+    supervisor = DriverSupervisor(
+        driver_manager,
+        launch_driver,
+        on_replaced=on_driver_replaced,
+        lease=scheduler.driver_pool.lease,
+        probe_interval=args.probe_interval
+    )
+
+    for driver_id in range(1, args.drivers + 1):
+        driver_manager.register_driver(driver_id, launch_driver(driver_id))
+        supervisor.supervise(driver_id)
+    scheduler.set_targets({
+        f"https://www.binance.com/en/futures-activity/leaderboard/user?encryptedUid={index:032X}": {}
+        for index in range(args.monitors)
+    })
+
+    started = time.monotonic()
+    scheduler.start()
+    supervisor.start()
+    try:
+        time.sleep(args.duration)
+    finally:
+        supervisor.stop()
+        scheduler.stop()
+        elapsed = time.monotonic() - started
+        driver_manager.cleanup_all()
+
+    stats = scheduler.stats().values()
+    runs = sum(job["runs"] for job in stats)
+    failures = sum(job["failures"] for job in stats)
+    busy_skips = sum(job["busy_skips"] for job in stats)
+    lateness = sorted(job["max_lateness"] for job in stats)
+    durations.sort()
+
+    print(f"Мониторов: {args.monitors}, драйверов: {args.drivers}, воркеров: {args.workers}, "
+          f"интервал: {args.interval:g} с, прогон: {elapsed:.1f} с")
+    print(f"Проверок: {runs} ({runs / elapsed:.1f}/с, ожидалось ~{args.monitors / args.interval:.1f}/с), "
+          f"ошибок: {failures}, отложено (драйвер занят): {busy_skips}")
+    print(f"Длительность проверки: p50 {percentile(durations, 50) * 1000:.0f} мс, "
+          f"p99 {percentile(durations, 99) * 1000:.0f} мс")
+    print(f"Макс. опоздание по URL: p50 {percentile(lateness, 50):.2f} с, p99 {percentile(lateness, 99):.2f} с, "
+          f"пропущено сроков: {sum(job['missed_deadlines'] for job in stats)}")
+    print(f"Падений браузера: {chaos.crashes}, перезапусков: {sum(generations.values()) - args.drivers}")
+    if args.profile:
+        print()
+        print(profiler.summary(top=20))
+
+if __name__ == "__main__":
+    main()
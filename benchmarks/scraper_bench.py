@@ -0,0 +1,295 @@
+"""
+Замер горячих путей парсинга на локальных страницах-фикстурах
+
+Запуск из корня проекта:
+    python benchmarks/scraper_bench.py [--iterations 50] [--output bench.json] [--compare baseline.json]
+
+Страницы из benchmarks/fixtures (таблица позиций, список ордеров, вход,
+2FA и дашборд) раздаются встроенным http.server, а браузер Chrome в
+headless-режиме проходит по ним тем же кодом, что и в работе. Для каждой
+операции выводятся перцентили задержки и количество команд WebDriver на
+одну операцию. Результаты сохраняются в JSON вместе с коммитом, а
+--compare показывает изменение относительно прошлого прогона.
+"""
+import os
+import sys
+import json
+import math
+import time
+import tempfile
+import argparse
+import threading
+import subprocess
+from collections import Counter
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, ROOT)
+
+from selenium import webdriver
+
+# Рост p50 операции (в долях), который считается регрессией при сравнении
+REGRESSION_THRESHOLD = 0.2
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """Раздача фикстур без записи каждого запроса в stderr"""
+
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    """Локальный HTTP-сервер со страницами-фикстурами"""
+
+    def __init__(self, directory: str = FIXTURES):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+        self._thread = threading.Thread(target=self._server.serve_forever, name="FixtureServer")
+        self._thread.daemon = True
+
+    def url(self, page: str) -> str:
+        """Возвращает адрес страницы-фикстуры"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{page}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+class CommandCounter:
+    """Считает команды WebDriver, которые уходят в браузер"""
+
+    def __init__(self, driver):
+        self.counts: Counter = Counter()
+        execute = driver.execute
+
+        # Команды WebElement тоже проходят через driver.execute
+        def counted(driver_command, params=None):
+            self.counts[driver_command] += 1
+            return execute(driver_command, params)
+
+        driver.execute = counted
+
+    def take(self) -> Counter:
+        """Возвращает команды с прошлого вызова и сбрасывает счетчик"""
+        counts, self.counts = self.counts, Counter()
+        return counts
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, math.ceil(percent / 100 * len(values)) - 1))
+    return values[index]
+
+def measure(
+    name: str,
+    operation: Callable[[], object],
+    counter: CommandCounter,
+    iterations: int,
+    prepare: Optional[Callable[[], None]] = None
+) -> Dict:
+    """
+    Выполняет операцию несколько раз и собирает задержки и команды WebDriver
+
+    Args:
+        name: Имя операции в отчете
+        operation: Замеряемая операция
+        counter: Счетчик команд драйвера
+        iterations: Количество повторов
+        prepare: Подготовка перед каждым повтором (не входит в замер)
+
+    Returns:
+        Dict: Перцентили задержки (мс) и команды на операцию
+    """
+    durations = []
+    commands: Counter = Counter()
+    for _ in range(iterations):
+        if prepare:
+            prepare()
+        counter.take()
+        started = time.perf_counter()
+        operation()
+        durations.append((time.perf_counter() - started) * 1000)
+        commands.update(counter.take())
+
+    durations.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": percentile(durations, 50),
+        "p90_ms": percentile(durations, 90),
+        "p99_ms": percentile(durations, 99),
+        "max_ms": durations[-1],
+        "commands_per_op": sum(commands.values()) / iterations,
+        "commands": {command: count / iterations for command, count in commands.most_common()}
+    }
+
+def bench_check_table_data(driver, server: FixtureServer, counter: CommandCounter, iterations: int) -> Dict:
+    """
+    Путь check_table_data: чтение всей таблицы, разбор чисел и сравнение со снимком
+
+    main.py при импорте запускает Chrome и проверку VPN, поэтому здесь
+    выполняются те же шаги, что и в main.process_positions, без записи
+    в историю и отправки в Telegram.
+    """
+    from notification_store import NotificationStore
+    from position_differ import PositionDiffer
+    from position_reader import position_values, read_positions
+
+    differ = PositionDiffer(NotificationStore(os.path.join(tempfile.mkdtemp(), "bench.db")))
+    driver.get(server.url("leaderboard.html"))
+
+    def operation():
+        rows = read_positions(driver)
+        for position in rows.values():
+            position_values(position)
+        differ.diff("bench", rows)
+
+    return measure("check_table_data", operation, counter, iterations)
+
+def bench_get_orders(driver, server: FixtureServer, counter: CommandCounter, iterations: int) -> Dict:
+    """OrderManager.get_orders по странице со списком ордеров"""
+    from order_manager import OrderManager
+
+    manager = OrderManager(driver)
+    driver.get(server.url("orders.html"))
+    return measure("OrderManager.get_orders", manager.get_orders, counter, iterations)
+
+def bench_refresh_and_wait(driver, server: FixtureServer, counter: CommandCounter, iterations: int) -> Dict:
+    """PageManager.refresh_and_wait_for_element по таблице позиций"""
+    from page_manager import PageManager
+    from position_reader import ROW_SELECTOR
+
+    manager = PageManager(driver)
+    driver.get(server.url("leaderboard.html"))
+    return measure(
+        "PageManager.refresh_and_wait_for_element",
+        lambda: manager.refresh_and_wait_for_element(ROW_SELECTOR, max_retries=1),
+        counter,
+        iterations
+    )
+
+def bench_auth_flow(driver, server: FixtureServer, counter: CommandCounter, iterations: int) -> List[Dict]:
+    """Вход по логину и паролю, 2FA, проверка дашборда и выход через методы AuthManager"""
+    from auth_manager import AuthManager
+
+    manager = AuthManager(driver)
+    selectors = manager.selectors
+
+    def fill(group: str, name: str, text: str) -> None:
+        by, selector = manager._find_element(selectors[group][name], timeout=5)
+        driver.find_element(by, selector).send_keys(text)
+
+    def login():
+        fill("login", "email_input", "bench@example.com")
+        fill("login", "password_input", "bench-password")
+        if not manager._click_element(selectors["login"]["submit_button"], timeout=5):
+            raise RuntimeError("Кнопка входа не найдена")
+
+    def two_factor():
+        if not manager._is_2fa_required():
+            raise RuntimeError("Поле 2FA не найдено")
+        fill("login", "2fa_input", "123456")
+        manager._click_element(selectors["login"]["2fa_submit"], timeout=5)
+        success, message = manager._wait_for_login_completion(timeout=10)
+        if not success:
+            raise RuntimeError(message)
+
+    def check_and_logout():
+        if not manager.is_logged_in() or not manager.logout():
+            raise RuntimeError("Проверка дашборда или выход не выполнены")
+
+    return [
+        measure("AuthManager.login_form", login, counter, iterations,
+                prepare=lambda: driver.get(server.url("login.html"))),
+        measure("AuthManager.2fa", two_factor, counter, iterations,
+                prepare=lambda: driver.get(server.url("mfa.html"))),
+        measure("AuthManager.is_logged_in+logout", check_and_logout, counter, iterations,
+                prepare=lambda: driver.get(server.url("dashboard.html")))
+    ]
+
+def create_driver(headless: bool = True):
+    """Создает Chrome для прогона"""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1280,900")
+    return webdriver.Chrome(options=options)
+
+def git_commit() -> Optional[str]:
+    """Текущий коммит репозитория (для сравнения прогонов)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(results: List[Dict], baseline: Optional[Dict] = None) -> None:
+    """Выводит таблицу результатов и изменение p50 относительно прошлого прогона"""
+    previous = {result["name"]: result for result in (baseline or {}).get("results", [])}
+    print(f"{'операция':<42} {'p50':>8} {'p90':>8} {'p99':>8} {'команд':>7}  изменение p50")
+    for result in results:
+        change = ""
+        base = previous.get(result["name"])
+        if base and base["p50_ms"]:
+            delta = result["p50_ms"] / base["p50_ms"] - 1
+            change = f"{delta:+.0%}" + (" ⚠️ регрессия" if delta > REGRESSION_THRESHOLD else "")
+        print(
+            f"{result['name']:<42} {result['p50_ms']:>7.1f}ms {result['p90_ms']:>6.1f}ms "
+            f"{result['p99_ms']:>6.1f}ms {result['commands_per_op']:>7.1f}  {change}"
+        )
+
+    print()
+    for result in results:
+        top = ", ".join(f"{command} {count:g}" for command, count in list(result["commands"].items())[:5])
+        print(f"{result['name']}: {top}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер парсинга на локальных фикстурах")
+    parser.add_argument("--iterations", type=int, default=50, help="Повторов каждой операции")
+    parser.add_argument("--output", help="Сохранить результаты в JSON")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--headed", action="store_true", help="Показывать окно браузера")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+    server = FixtureServer()
+    server.start()
+    driver = create_driver(headless=not args.headed)
+    counter = CommandCounter(driver)
+    try:
+        results = [
+            bench_check_table_data(driver, server, counter, args.iterations),
+            bench_get_orders(driver, server, counter, args.iterations),
+            bench_refresh_and_wait(driver, server, counter, args.iterations),
+            *bench_auth_flow(driver, server, counter, args.iterations)
+        ]
+    finally:
+        driver.quit()
+        server.stop()
+
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"commit": git_commit(), "created_at": time.time(), "iterations": args.iterations, "results": results},
+                f,
+                ensure_ascii=False,
+                indent=2
+            )
+
+if __name__ == "__main__":
+    main()
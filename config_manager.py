@@ -0,0 +1,252 @@
+import os
+import json
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Set
+from dotenv import load_dotenv
+from logger import Logger
+from env_manager import EnvManager
+
+# Селекторы по умолчанию, если selectors.json отсутствует
+DEFAULT_SELECTORS = {
+    "login": {
+        "email_input": ["input[type='email']"],
+        "password_input": ["input[type='password']"],
+        "submit_button": ["button[type='submit']"],
+        "2fa_input": ["input[type='text']"],
+        "2fa_submit": ["button[type='submit']"]
+    },
+    "dashboard": {
+        "container": [".dashboard-container"],
+        "logout_button": [".logout-button"],
+        "confirm_logout": [".confirm-logout"]
+    }
+}
+
+@dataclass(frozen=True)
+class Settings:
+    """Параметры работы из раздела settings файла config.json"""
+    refresh_interval: int = 30
+    max_retries: int = 3
+    timeout: int = 10
+    max_workers: int = 4
+    jitter_percent: int = 10
+    # Окно и период расчета аналитики по позициям (секунды)
+    analytics_window: int = 300
+    analytics_interval: int = 10
+
+@dataclass(frozen=True)
+class AppConfig:
+    """Неизменяемый снимок всей конфигурации приложения"""
+    settings: Settings = field(default_factory=Settings)
+    urls: List[str] = field(default_factory=list)
+    login_urls: List[str] = field(default_factory=list)
+    # URL -> индивидуальные параметры проверки (interval, priority, jitter)
+    monitors: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Текст файла правил оповещений (разбирается в rule_engine)
+    rules: str = ""
+    selectors: Dict[str, Any] = field(default_factory=lambda: DEFAULT_SELECTORS)
+
+class ConfigManager:
+    """
+    Единая точка загрузки конфигурации
+
+    Объединяет .env, config.json, urls.json, selectors.json и файл правил
+    оповещений в один снимок AppConfig, который загружается один раз. Фоновый
+    поток отслеживает время изменения файлов, перечитывает только изменившиеся
+    и уведомляет подписчиков.
+    """
+
+    def __init__(
+        self,
+        config_file: str = "config.json",
+        urls_file: str = "urls.json",
+        selectors_file: str = "selectors.json",
+        env_file: str = ".env",
+        rules_file: str = "alert_rules.txt",
+        watch_interval: float = 2
+    ):
+        self.logger = Logger("config_manager")
+        self.files = {
+            "config": config_file,
+            "urls": urls_file,
+            "selectors": selectors_file,
+            "env": env_file,
+            "rules": rules_file
+        }
+        self.watch_interval = watch_interval
+
+        self._lock = threading.Lock()
+        self._env: Optional[EnvManager] = None
+        self._subscribers: List[Callable[[AppConfig, AppConfig, Set[str]], None]] = []
+        self._mtimes: Dict[str, Optional[float]] = {name: self._mtime(path) for name, path in self.files.items()}
+        self._config = replace(
+            AppConfig(urls=self._read_urls(), selectors=self._read_selectors(), rules=self._read_rules()),
+            **self._read_config_file()
+        )
+
+        self._watch_thread = None
+        self._stop_watch = threading.Event()
+
+    @property
+    def config(self) -> AppConfig:
+        """Текущий снимок конфигурации"""
+        return self._config
+
+    @property
+    def settings(self) -> Settings:
+        """Текущие параметры работы"""
+        return self._config.settings
+
+    @property
+    def env(self) -> EnvManager:
+        """Общий менеджер переменных окружения (создается при первом обращении)"""
+        if self._env is None:
+            with self._lock:
+                if self._env is None:
+                    self._env = EnvManager()
+        return self._env
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        """Возвращает время изменения файла или None"""
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _read_json(self, path: str, default: Any) -> Any:
+        """Читает JSON-файл, возвращая значение по умолчанию при ошибке"""
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            self.logger.warning(f"⚠️ Файл {path} не найден")
+            return default
+        except json.JSONDecodeError as e:
+            self.logger.error(f"❌ Ошибка при чтении файла {path}", exc_info=e)
+            return default
+
+    def _read_config_file(self) -> Dict[str, Any]:
+        """Читает config.json и возвращает поля AppConfig, которые он задает"""
+        data = self._read_json(self.files["config"], {})
+        return {
+            "settings": self._parse_settings(data.get("settings", {})),
+            "login_urls": list(data.get("urls", [])),
+            "monitors": dict(data.get("monitors", {}))
+        }
+
+    def _parse_settings(self, raw: Dict[str, Any]) -> Settings:
+        """Преобразует раздел settings из config.json в Settings"""
+        defaults = Settings()
+        values = {}
+        for name in (
+            "refresh_interval", "max_retries", "timeout", "max_workers", "jitter_percent",
+            "analytics_window", "analytics_interval"
+        ):
+            try:
+                values[name] = int(raw.get(name, getattr(defaults, name)))
+            except (TypeError, ValueError):
+                self.logger.warning(f"⚠️ Неверное значение settings.{name}: {raw.get(name)}")
+                values[name] = getattr(defaults, name)
+        return Settings(**values)
+
+    def _read_urls(self) -> List[str]:
+        """Читает список URL для мониторинга из urls.json"""
+        return list(self._read_json(self.files["urls"], {}).get("urls", []))
+
+    def _read_selectors(self) -> Dict[str, Any]:
+        """Читает селекторы из selectors.json"""
+        return self._read_json(self.files["selectors"], DEFAULT_SELECTORS)
+
+    def _read_rules(self) -> str:
+        """Читает текст файла правил оповещений"""
+        try:
+            with open(self.files["rules"], "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            self.logger.warning(f"⚠️ Файл {self.files['rules']} не найден")
+            return ""
+
+    def subscribe(self, callback: Callable[[AppConfig, AppConfig, Set[str]], None]) -> None:
+        """
+        Подписывает обработчик на изменения конфигурации
+
+        Args:
+            callback: Функция (старый снимок, новый снимок, имена изменившихся разделов)
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def reload(self, sections: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Перечитывает изменившиеся файлы и уведомляет подписчиков
+
+        Args:
+            sections: Разделы для принудительного перечитывания (config, urls, selectors, env, rules)
+
+        Returns:
+            Set[str]: Имена перечитанных разделов
+        """
+        changed = set(sections or ())
+        for name, path in self.files.items():
+            mtime = self._mtime(path)
+            if mtime != self._mtimes.get(name):
+                self._mtimes[name] = mtime
+                changed.add(name)
+
+        if not changed:
+            return changed
+
+        old = self._config
+        new = old
+        if "env" in changed:
+            load_dotenv(self.files["env"], override=True)
+        if "config" in changed:
+            new = replace(new, **self._read_config_file())
+        if "urls" in changed:
+            new = replace(new, urls=self._read_urls())
+        if "selectors" in changed:
+            new = replace(new, selectors=self._read_selectors())
+        if "rules" in changed:
+            new = replace(new, rules=self._read_rules())
+
+        self._config = new
+        self.logger.info(f"🔄 Конфигурация перечитана: {', '.join(sorted(changed))}")
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(old, new, changed)
+            except Exception as e:
+                self.logger.error("❌ Ошибка в обработчике изменения конфигурации", exc_info=e)
+
+        return changed
+
+    def start_watching(self) -> None:
+        """Запускает отслеживание изменений файлов конфигурации"""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop_watch.clear()
+        self._watch_thread = threading.Thread(target=self._watch_loop, name="ConfigWatcher")
+        self._watch_thread.daemon = True
+        self._watch_thread.start()
+        self.logger.info("✅ Запущено отслеживание файлов конфигурации")
+
+    def stop_watching(self) -> None:
+        """Останавливает отслеживание изменений файлов конфигурации"""
+        self._stop_watch.set()
+        if self._watch_thread:
+            self._watch_thread.join(timeout=5)
+
+    def _watch_loop(self) -> None:
+        """Цикл проверки времени изменения файлов"""
+        while not self._stop_watch.wait(self.watch_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                self.logger.error("❌ Ошибка при перечитывании конфигурации", exc_info=e)
+
+# Создаем глобальный экземпляр менеджера
+config_manager = ConfigManager()
@@ -1,45 +1,109 @@
 import os
 import json
-import base64
+import time
+import threading
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from typing import Dict, Optional, Tuple
 from logger import Logger
 
 class CredentialsManager:
-    def __init__(self, encryption_key: Optional[str] = None):
+    """
+    Менеджер зашифрованных учетных данных
+    
+    Расшифрованные данные и объекты Fernet кешируются на уровне процесса,
+    поэтому создание нового менеджера в каждом потоке не приводит к повторному
+    чтению файла и расшифровке. Кеш живет не дольше CREDENTIALS_CACHE_TTL секунд
+    и может быть очищен явно через wipe_cache().
+    """
+    
+    _cache_lock = threading.Lock()
+    # путь к файлу -> (учетные данные, время истечения)
+    _cache: Dict[str, Tuple[Dict[str, str], float]] = {}
+    _fernets: Dict[str, Fernet] = {}
+    
+    def __init__(
+        self,
+        encryption_key: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        credentials_file: str = "credentials.enc"
+    ):
         self.logger = Logger("credentials_manager")
-        self.credentials_file = "credentials.enc"
-        self.encryption_key = encryption_key or os.getenv("ENCRYPTION_KEY")
-        
-        if not self.encryption_key:
-            # Генерируем новый ключ, если его нет
-            self.encryption_key = self._generate_key()
-            self.logger.info("✅ Сгенерирован новый ключ шифрования")
-            
+        self.credentials_file = credentials_file
+        self.key_file = os.getenv("ENCRYPTION_KEY_FILE", os.path.join("state", "encryption.key"))
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("CREDENTIALS_CACHE_TTL", "900"))
+        self.encryption_key = encryption_key or os.getenv("ENCRYPTION_KEY") or self._load_or_generate_key()
         self.fernet = self._create_fernet()
         
+    def _load_or_generate_key(self) -> str:
+        """
+        Загружает сохраненный ключ шифрования или генерирует и сохраняет новый
+        
+        Без сохранения сгенерированный ключ терялся при перезапуске, и ранее
+        зашифрованный файл становился нечитаемым.
+        """
+        with self._cache_lock:
+            if os.path.exists(self.key_file):
+                with open(self.key_file, "r") as f:
+                    return f.read().strip()
+                    
+            key = self._generate_key()
+            key_dir = os.path.dirname(self.key_file)
+            if key_dir and not os.path.exists(key_dir):
+                os.makedirs(key_dir)
+                
+            # Файл ключа доступен только владельцу
+            fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(key)
+                
+            self.logger.info(f"✅ Сгенерирован и сохранен новый ключ шифрования: {self.key_file}")
+            return key
+        
     def _generate_key(self) -> str:
         """Генерирует новый ключ шифрования"""
-        salt = os.urandom(16)
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(os.urandom(32)))
-        return key.decode()
+        # Ключ Fernet - 32 случайных байта, KDF над случайными данными ничего не добавляет
+        return Fernet.generate_key().decode()
         
     def _create_fernet(self) -> Fernet:
-        """Создает объект Fernet для шифрования"""
+        """Создает объект Fernet для шифрования (один на ключ в процессе)"""
         try:
-            return Fernet(self.encryption_key.encode())
+            with self._cache_lock:
+                fernet = self._fernets.get(self.encryption_key)
+                if fernet is None:
+                    fernet = Fernet(self.encryption_key.encode())
+                    self._fernets[self.encryption_key] = fernet
+                return fernet
         except Exception as e:
             self.logger.error("❌ Ошибка создания объекта Fernet", exc_info=e)
             raise
             
+    def _cache_get(self) -> Optional[Dict[str, str]]:
+        """Возвращает копию учетных данных из кеша, если срок не истек"""
+        with self._cache_lock:
+            entry = self._cache.get(self.credentials_file)
+            if entry is None:
+                return None
+            credentials, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._cache[self.credentials_file]
+                return None
+            return dict(credentials)
+            
+    def _cache_put(self, credentials: Dict[str, str]) -> None:
+        """Помещает учетные данные в кеш"""
+        if self.cache_ttl <= 0:
+            return
+        with self._cache_lock:
+            self._cache[self.credentials_file] = (dict(credentials), time.monotonic() + self.cache_ttl)
+            
+    @classmethod
+    def wipe_cache(cls) -> None:
+        """Удаляет все расшифрованные учетные данные из памяти процесса"""
+        with cls._cache_lock:
+            for credentials, _ in cls._cache.values():
+                credentials.clear()
+            cls._cache.clear()
+        
     def save_credentials(self, credentials: Dict[str, str]) -> bool:
         """
         Сохраняет учетные данные в зашифрованном виде
@@ -59,6 +123,7 @@ class CredentialsManager:
             with open(self.credentials_file, "wb") as f:
                 f.write(encrypted_data)
                 
+            self._cache_put(credentials)
             self.logger.info("✅ Учетные данные успешно сохранены")
             return True
             
@@ -73,6 +138,10 @@ class CredentialsManager:
         Returns:
             Dict[str, str]: Словарь с учетными данными или None
         """
+        cached = self._cache_get()
+        if cached is not None:
+            return cached
+            
         try:
             if not os.path.exists(self.credentials_file):
                 self.logger.warning("⚠️ Файл с учетными данными не найден")
@@ -84,6 +153,7 @@ class CredentialsManager:
                 
             decrypted_data = self.fernet.decrypt(encrypted_data)
             credentials = json.loads(decrypted_data.decode())
+            self._cache_put(credentials)
             
             self.logger.info("✅ Учетные данные успешно загружены")
             return credentials
@@ -140,10 +210,18 @@ class CredentialsManager:
             bool: Успех операции
         """
         try:
+            with self._cache_lock:
+                entry = self._cache.pop(self.credentials_file, None)
+                if entry:
+                    entry[0].clear()
+                    
             if os.path.exists(self.credentials_file):
                 os.remove(self.credentials_file)
                 self.logger.info("✅ Учетные данные успешно удалены")
             return True
         except Exception as e:
             self.logger.error("❌ Ошибка удаления учетных данных", exc_info=e)
-            return False 
\ No newline at end of file
+            return False
+
+# Создаем глобальный экземпляр менеджера
+credentials_manager = CredentialsManager()
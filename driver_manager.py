@@ -1,125 +1,289 @@
 import threading
 import time
-from typing import Dict, Optional, Any
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, Optional, Set
 from selenium.webdriver.remote.webdriver import WebDriver
 from logger import Logger
-from retry_manager import retry_manager
+
+class _DriverEntry:
+    """Запись реестра драйверов; поля обновляются без блокировки реестра"""
+
+    __slots__ = ('driver', 'alive', 'last_active')
+
+    def __init__(self, driver: WebDriver):
+        self.driver = driver
+        self.alive = True
+        self.last_active = time.time()
 
 class DriverManager:
-    """Менеджер для управления WebDriver с поддержкой потокобезопасности"""
-    
-    def __init__(self):
+    """
+    Менеджер для управления WebDriver с поддержкой потокобезопасности
+
+    Реестр хранится как неизменяемый снимок словаря: чтение (get_driver,
+    update_activity) выполняется без блокировок, а изменения создают новый
+    снимок под блокировкой записи. Закрытие браузеров (driver.quit) выполняется
+    в фоновых потоках-демонах уже после удаления из реестра, поэтому зависший
+    Chrome не блокирует ни поиск драйверов другими потоками, ни выход из процесса.
+    """
+
+    def __init__(
+        self,
+        teardown_workers: int = 4,
+        quit_timeout: float = 10,
+        on_register: Optional[Callable[[int, WebDriver], None]] = None
+    ):
+        """
+        Args:
+            teardown_workers: Количество одновременно закрываемых браузеров
+            quit_timeout: Максимальное время закрытия всех браузеров в cleanup_all
+            on_register: Обработчик каждого нового драйвера (ID, драйвер) до его публикации
+                в реестре, например обертка команд для замера
+        """
         self.logger = Logger("driver_manager")
-        self._drivers: Dict[int, Dict[str, Any]] = {}
+        self._drivers: Dict[int, _DriverEntry] = {}
         self._lock = threading.Lock()
         self._cleanup_thread = None
         self._stop_cleanup = threading.Event()
-        
+        self.teardown_workers = teardown_workers
+        self.quit_timeout = quit_timeout
+        self.on_register = on_register
+        self._teardown_slots = threading.BoundedSemaphore(teardown_workers)
+        # Драйверы под внешним наблюдением (например, супервизора) не удаляются очисткой
+        self._cleanup_exempt: Set[int] = set()
+
+    def _update(self, thread_id: int, entry: Optional[_DriverEntry]) -> Optional[_DriverEntry]:
+        """
+        Публикует новый снимок реестра (копирование при записи)
+
+        Args:
+            thread_id: ID потока
+            entry: Новая запись или None для удаления
+
+        Returns:
+            Optional[_DriverEntry]: Предыдущая запись
+        """
+        with self._lock:
+            drivers = dict(self._drivers)
+            previous = drivers.pop(thread_id, None)
+            if entry is not None:
+                drivers[thread_id] = entry
+            self._drivers = drivers
+        return previous
+
+    def _prepare(self, thread_id: int, driver: WebDriver) -> None:
+        """Вызывает on_register; ошибка обработчика не мешает работе драйвера"""
+        if not self.on_register:
+            return
+        try:
+            self.on_register(thread_id, driver)
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка обработчика регистрации драйвера {thread_id}", exc_info=e)
+
     def register_driver(self, thread_id: int, driver: WebDriver) -> None:
         """Регистрирует новый драйвер с потокобезопасностью"""
+        self._prepare(thread_id, driver)
+        previous = self._update(thread_id, _DriverEntry(driver))
+        self.logger.info(f"✅ Драйвер зарегистрирован для потока {thread_id}")
+        if previous and previous.driver is not driver:
+            self._quit_async(thread_id, previous.driver)
+
+        # Запускаем поток очистки если он еще не запущен
         with self._lock:
-            self._drivers[thread_id] = {
-                'driver': driver,
-                'alive': True,
-                'last_active': time.time()
-            }
-            self.logger.info(f"✅ Драйвер зарегистрирован для потока {thread_id}")
-            
-            # Запускаем поток очистки если он еще не запущен
             if not self._cleanup_thread or not self._cleanup_thread.is_alive():
                 self._start_cleanup_thread()
-                
+
     def get_driver(self, thread_id: int) -> Optional[WebDriver]:
-        """Получает драйвер по ID потока с потокобезопасностью"""
-        with self._lock:
-            driver_info = self._drivers.get(thread_id)
-            if driver_info and driver_info['alive']:
-                driver_info['last_active'] = time.time()
-                return driver_info['driver']
-            return None
-            
+        """Получает драйвер по ID потока без блокировки"""
+        entry = self._drivers.get(thread_id)
+        if entry and entry.alive:
+            entry.last_active = time.time()
+            return entry.driver
+        return None
+
     def get_active_drivers(self) -> Dict[int, Dict[str, Any]]:
-        """Получает информацию о всех активных драйверах с потокобезопасностью"""
-        with self._lock:
-            return {
-                thread_id: {
-                    'alive': info['alive'],
-                    'last_active': info['last_active']
-                }
-                for thread_id, info in self._drivers.items()
+        """Получает информацию о всех зарегистрированных драйверах"""
+        return {
+            thread_id: {
+                'alive': entry.alive,
+                'last_active': entry.last_active
             }
-            
+            for thread_id, entry in self._drivers.items()
+        }
+
     def update_activity(self, thread_id: int) -> None:
-        """Обновляет время последней активности драйвера с потокобезопасностью"""
-        with self._lock:
-            if thread_id in self._drivers:
-                self._drivers[thread_id]['last_active'] = time.time()
-                
+        """Обновляет время последней активности драйвера без блокировки"""
+        entry = self._drivers.get(thread_id)
+        if entry:
+            entry.last_active = time.time()
+
     def mark_driver_dead(self, thread_id: int) -> None:
-        """Помечает драйвер как неактивный с потокобезопасностью"""
-        with self._lock:
-            if thread_id in self._drivers:
-                self._drivers[thread_id]['alive'] = False
-                self.logger.info(f"❌ Драйвер помечен как неактивный для потока {thread_id}")
-                
-    def remove_driver(self, thread_id: int) -> None:
-        """Удаляет драйвер с потокобезопасностью"""
+        """Помечает драйвер как неактивный"""
+        entry = self._drivers.get(thread_id)
+        if entry and entry.alive:
+            entry.alive = False
+            self.logger.info(f"❌ Драйвер помечен как неактивный для потока {thread_id}")
+            
+    def mark_driver_alive(self, thread_id: int) -> None:
+        """Снова помечает драйвер как активный (например, после успешной проверки)"""
+        entry = self._drivers.get(thread_id)
+        if entry and not entry.alive:
+            entry.alive = True
+            entry.last_active = time.time()
+            self.logger.info(f"✅ Драйвер снова активен для потока {thread_id}")
+            
+    def exempt_from_cleanup(self, thread_id: int, exempt: bool = True) -> None:
+        """
+        Исключает драйвер из автоматической очистки неактивных драйверов
+        
+        Args:
+            thread_id: ID потока
+            exempt: True - не удалять драйвер, False - вернуть под обычную очистку
+        """
         with self._lock:
-            if thread_id in self._drivers:
-                try:
-                    driver = self._drivers[thread_id]['driver']
-                    driver.quit()
-                except Exception as e:
-                    self.logger.error(f"❌ Ошибка при закрытии драйвера {thread_id}", exc_info=e)
-                finally:
-                    del self._drivers[thread_id]
-                    self.logger.info(f"✅ Драйвер удален для потока {thread_id}")
-                    
+            if exempt:
+                self._cleanup_exempt.add(thread_id)
+            else:
+                self._cleanup_exempt.discard(thread_id)
+
+    def replace_driver(self, thread_id: int, driver: WebDriver) -> Optional[WebDriver]:
+        """
+        Заменяет драйвер потока новым с потокобезопасностью
+
+        Args:
+            thread_id: ID потока
+            driver: Новый драйвер
+
+        Returns:
+            Optional[WebDriver]: Предыдущий драйвер (закрывать его должен вызывающий, например через quit_async)
+        """
+        self._prepare(thread_id, driver)
+        previous = self._update(thread_id, _DriverEntry(driver))
+        self.logger.info(f"🔄 Драйвер заменен для потока {thread_id}")
+        return previous.driver if previous else None
+
+    def get_driver_any_state(self, thread_id: int) -> Optional[WebDriver]:
+        """Получает драйвер по ID потока, даже если он помечен как неактивный"""
+        entry = self._drivers.get(thread_id)
+        return entry.driver if entry else None
+
+    def remove_driver(self, thread_id: int) -> Optional[Future]:
+        """
+        Удаляет драйвер из реестра и закрывает его в фоновом потоке
+
+        Returns:
+            Optional[Future]: Задача закрытия браузера или None, если драйвера не было
+        """
+        entry = self._update(thread_id, None)
+        if not entry:
+            return None
+        self.logger.info(f"✅ Драйвер удален для потока {thread_id}")
+        return self._quit_async(thread_id, entry.driver)
+
+    def quit_async(self, thread_id: int, driver: WebDriver) -> Future:
+        """
+        Закрывает драйвер, уже не входящий в реестр (например, замененный), в фоне
+
+        Returns:
+            Future: Задача закрытия браузера
+        """
+        return self._quit_async(thread_id, driver)
+
+    def _quit_async(self, thread_id: int, driver: WebDriver) -> Future:
+        """
+        Закрывает браузер в фоновом потоке-демоне
+        
+        Потоки пула ThreadPoolExecutor интерпретатор дожидается при выходе,
+        поэтому один зависший driver.quit задерживал бы завершение процесса.
+        """
+        future: Future = Future()
+        
+        def run():
+            with self._teardown_slots:
+                self._quit_driver(thread_id, driver)
+            future.set_result(None)
+            
+        thread = threading.Thread(target=run, name=f"DriverTeardown-{thread_id}")
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def _quit_driver(self, thread_id: int, driver: WebDriver) -> None:
+        """Закрывает браузер, не пробрасывая ошибки"""
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка при закрытии драйвера {thread_id}", exc_info=e)
+
+    def _kill_service(self, thread_id: int, driver: WebDriver) -> None:
+        """Принудительно завершает процесс chromedriver, если закрытие зависло"""
+        service = getattr(driver, "service", None)
+        process = getattr(service, "process", None)
+        if process is None:
+            return
+        try:
+            process.kill()
+            self.logger.warning(f"⚠️ Процесс chromedriver драйвера {thread_id} завершен принудительно")
+        except Exception as e:
+            self.logger.error(f"❌ Не удалось завершить chromedriver драйвера {thread_id}", exc_info=e)
+
     def _start_cleanup_thread(self) -> None:
         """Запускает поток очистки неактивных драйверов"""
         self._stop_cleanup.clear()
         self._cleanup_thread = threading.Thread(target=self._cleanup_loop)
         self._cleanup_thread.daemon = True
         self._cleanup_thread.start()
-        
+
     def _cleanup_loop(self) -> None:
         """Цикл очистки неактивных драйверов"""
-        while not self._stop_cleanup.is_set():
+        # Проверяем каждую минуту; ожидание события позволяет остановиться сразу
+        while not self._stop_cleanup.wait(60):
             try:
                 self._cleanup_inactive_drivers()
-                time.sleep(60)  # Проверяем каждую минуту
             except Exception as e:
                 self.logger.error("❌ Ошибка в цикле очистки драйверов", exc_info=e)
-                
+
     def _cleanup_inactive_drivers(self) -> None:
-        """Очищает неактивные драйверы с потокобезопасностью"""
+        """Очищает неактивные драйверы"""
         current_time = time.time()
         with self._lock:
-            inactive_threads = [
-                thread_id for thread_id, info in self._drivers.items()
-                if not info['alive'] or (current_time - info['last_active']) > 300  # 5 минут
-            ]
-            
-            for thread_id in inactive_threads:
-                self.logger.warning(f"🧹 Очистка неактивного драйвера {thread_id}")
-                self.remove_driver(thread_id)
-                
+            exempt = set(self._cleanup_exempt)
+        inactive_threads = [
+            thread_id for thread_id, entry in self._drivers.items()
+            if thread_id not in exempt
+            and (not entry.alive or (current_time - entry.last_active) > 300)  # 5 минут
+        ]
+
+        for thread_id in inactive_threads:
+            self.logger.warning(f"🧹 Очистка неактивного драйвера {thread_id}")
+            self.remove_driver(thread_id)
+
     def cleanup_all(self) -> None:
-        """Очищает все драйверы и останавливает поток очистки"""
+        """Очищает все драйверы параллельно и останавливает поток очистки"""
         self._stop_cleanup.set()
         if self._cleanup_thread:
             self._cleanup_thread.join(timeout=5)
-            
+
         with self._lock:
-            thread_ids = list(self._drivers.keys())
-            for thread_id in thread_ids:
-                self.remove_driver(thread_id)
-                
+            entries = self._drivers
+            self._drivers = {}
+
+        futures: Dict[Future, int] = {
+            self._quit_async(thread_id, entry.driver): thread_id
+            for thread_id, entry in entries.items()
+        }
+        if futures:
+            _, pending = wait(futures, timeout=self.quit_timeout)
+            if pending:
+                self.logger.warning(f"⚠️ {len(pending)} браузеров не закрылись за {self.quit_timeout} секунд")
+                for future in pending:
+                    thread_id = futures[future]
+                    self._kill_service(thread_id, entries[thread_id].driver)
+
     def __enter__(self):
         return self
-        
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.cleanup_all()
 
 # Создаем глобальный экземпляр менеджера
-driver_manager = DriverManager() 
\ No newline at end of file
+driver_manager = DriverManager()
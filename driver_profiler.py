@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import threading
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+from selenium.webdriver.remote.webdriver import WebDriver
+from latency_histogram import LatencyHistogram
+from logger import Logger
+
+# Модули, которые не считаются вызывающими: вызов приписывается первой
+# функции проекта выше них по стеку
+SKIP_MODULES = ("selenium", "undetected_chromedriver", "fake_webdriver", __name__)
+
+# Глубина стека, дальше которой вызывающий не ищется
+MAX_CALLER_DEPTH = 32
+
+class _CommandStats:
+    """Задержки и ошибки одной пары (команда, вызывающий)"""
+
+    __slots__ = ("histogram", "errors")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+
+class DriverProfiler:
+    """
+    Замер каждой команды WebDriver по имени команды и вызывающей функции
+
+    Все команды Selenium, включая команды элементов, проходят через
+    driver.execute, поэтому при регистрации драйвера он подменяется
+    оберткой. Обертка определяет вызывающую функцию проекта по стеку
+    (например "check_table_data" или "AuthManager._find_element";
+    команды из лямбд WebDriverWait приписываются охватывающему методу)
+    и записывает время в гистограмму пары (команда, вызывающий).
+    Имя вызывающего кешируется по объекту кода, а сама запись - это
+    вычисление индекса корзины под короткой блокировкой, поэтому
+    накладные расходы на порядки меньше сетевого запроса к браузеру.
+    """
+
+    def __init__(self, enabled: bool = True, skip_modules: Tuple[str, ...] = SKIP_MODULES):
+        """
+        Args:
+            enabled: Включен ли замер (при False instrument ничего не делает)
+            skip_modules: Префиксы модулей, которые пропускаются при поиске вызывающего
+        """
+        self.logger = Logger("driver_profiler")
+        self.enabled = enabled
+        self.skip_modules = skip_modules
+
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], _CommandStats] = {}
+        # Объект кода -> имя вызывающего или None, если кадр пропускается
+        self._callers: Dict[CodeType, Optional[str]] = {}
+        self.started_at = time.time()
+
+    def instrument(self, driver_id: int, driver: WebDriver) -> None:
+        """
+        Оборачивает driver.execute замером (подходит как DriverManager.on_register)
+
+        Args:
+            driver_id: ID драйвера
+            driver: Драйвер
+        """
+        if not self.enabled or getattr(driver, "_profiled", False):
+            return
+        execute = driver.execute
+
+        def timed_execute(driver_command, params=None):
+            caller = self._caller(sys._getframe(1))
+            failed = False
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self._record(driver_command, caller, time.perf_counter() - started, failed)
+
+        driver.execute = timed_execute
+        driver._profiled = True
+        self.logger.info(f"⏱ Замер команд включен для драйвера {driver_id}")
+
+    def _label(self, code: CodeType, module: str) -> Optional[str]:
+        """Имя вызывающего по объекту кода или None для пропускаемых модулей"""
+        if module.startswith(self.skip_modules):
+            return None
+        # Лямбды и генераторы приписываются охватывающей функции, вложенные функции - себе:
+        # "PageManager.wait_for_page_load.<locals>.<lambda>" -> "PageManager.wait_for_page_load"
+        # co_qualname есть только начиная с Python 3.11
+        qualname = getattr(code, "co_qualname", code.co_name)
+        parts = [part for part in qualname.split(".<locals>.") if not part.startswith("<")]
+        return parts[-1] if parts else code.co_name
+
+    def _caller(self, frame: Optional[FrameType]) -> str:
+        """Первая функция проекта в стеке выше Selenium"""
+        callers = self._callers
+        for _ in range(MAX_CALLER_DEPTH):
+            if frame is None:
+                break
+            code = frame.f_code
+            if code in callers:
+                label = callers[code]
+            else:
+                label = callers[code] = self._label(code, frame.f_globals.get("__name__", ""))
+            if label is not None:
+                return label
+            frame = frame.f_back
+        return "?"
+
+    def _record(self, command: str, caller: str, seconds: float, failed: bool) -> None:
+        key = (command, caller)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _CommandStats()
+            stats.histogram.record(seconds)
+            if failed:
+                stats.errors += 1
+
+    def reset(self) -> None:
+        """Сбрасывает накопленную статистику"""
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+
+    def snapshot(self, by: str = "both") -> List[Dict]:
+        """
+        Возвращает статистику, отсортированную по суммарному времени
+
+        Args:
+            by: Группировка: "command", "caller" или "both" (команда и вызывающий)
+
+        Returns:
+            List[Dict]: Команда, вызывающий, количество, ошибки, суммарное время и перцентили (с)
+        """
+        with self._lock:
+            groups: Dict[Tuple[str, str], List[_CommandStats]] = {}
+            for (command, caller), stats in self._stats.items():
+                key = (command if by != "caller" else "*", caller if by != "command" else "*")
+                groups.setdefault(key, []).append(stats)
+            # Слияние под блокировкой: гистограммы продолжают пополняться воркерами
+            merged = {
+                key: (LatencyHistogram.combined(stats.histogram for stats in group), sum(stats.errors for stats in group))
+                for key, group in groups.items()
+            }
+
+        result = []
+        for (command, caller), (histogram, errors) in merged.items():
+            p50, p90, p99 = histogram.percentiles((50, 90, 99)).values()
+            result.append({
+                "command": command,
+                "caller": caller,
+                "count": histogram.count,
+                "errors": errors,
+                "total": histogram.total,
+                "mean": histogram.mean,
+                "p50": p50,
+                "p90": p90,
+                "p99": p99,
+                "max": histogram.max
+            })
+        result.sort(key=lambda row: row["total"], reverse=True)
+        return result
+
+    def summary(self, by: str = "both", top: int = 15) -> str:
+        """Текстовая сводка для логов и Telegram"""
+        rows = self.snapshot(by)
+        if not rows:
+            return "⏱ Команды WebDriver еще не выполнялись" if self.enabled else "⏱ Замер команд WebDriver выключен"
+
+        window = time.time() - self.started_at
+        total = sum(row["total"] for row in rows)
+        lines = [
+            f"⏱ Команды WebDriver за {window / 60:.0f} мин: "
+            f"{sum(row['count'] for row in rows)} команд, {total:.1f} с в браузере"
+        ]
+        for row in rows[:top]:
+            name = " ← ".join(part for part in (row["command"], row["caller"]) if part != "*")
+            errors = f", ошибок {row['errors']}" if row["errors"] else ""
+            lines.append(
+                f"{name}: {row['count']} шт, {row['total']:.1f} с ({row['total'] / total if total else 0:.0%}), "
+                f"p50 {row['p50'] * 1000:.0f} мс, p99 {row['p99'] * 1000:.0f} мс, "
+                f"макс {row['max'] * 1000:.0f} мс{errors}"
+            )
+        if len(rows) > top:
+            lines.append(f"... и еще {len(rows) - top}")
+        return "\n".join(lines)
+
+# Создаем глобальный экземпляр
+driver_profiler = DriverProfiler(enabled=os.getenv("DRIVER_PROFILING", "1") != "0")
@@ -0,0 +1,222 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Iterator, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+from logger import Logger
+from retry_manager import retry_manager
+from driver_manager import DriverManager
+from metrics import metrics
+
+PROBE_FAILURES = metrics.counter("cptrade_driver_probe_failures_total", "Неудачные проверки работоспособности драйверов")
+RESTARTS = metrics.counter("cptrade_driver_restarts_total", "Перезапуски драйверов по результату (ok, failed)", ("result",))
+
+@contextmanager
+def _no_lease(driver_id: int, timeout: float) -> Iterator[bool]:
+    """Аренда по умолчанию: драйвер всегда доступен"""
+    yield True
+
+class DriverSupervisor:
+    """
+    Следит за работоспособностью драйверов и заменяет упавшие
+
+    Проверка дешевая: запрос списка вкладок и выполнение тривиального скрипта.
+    Упавший драйвер запускается заново через фабрику с экспоненциальной
+    задержкой между попытками. Новый браузер запускается без глобальных
+    блокировок, в реестре драйвер подменяется одной короткой операцией.
+    """
+
+    def __init__(
+        self,
+        driver_manager: DriverManager,
+        driver_factory: Callable[[int], WebDriver],
+        on_replaced: Optional[Callable[[int, WebDriver], None]] = None,
+        lease: Callable[[int, float], ContextManager[bool]] = _no_lease,
+        probe_interval: float = 30,
+        failure_threshold: int = 2
+    ):
+        """
+        Args:
+            driver_manager: Реестр драйверов
+            driver_factory: Функция запуска нового драйвера по его ID
+            on_replaced: Обработчик после замены драйвера (ID, новый драйвер)
+            lease: Аренда драйвера, чтобы не проверять его во время работы воркера
+            probe_interval: Интервал проверок в секундах
+            failure_threshold: Число неудачных проверок подряд до замены
+        """
+        self.logger = Logger("driver_supervisor")
+        self.driver_manager = driver_manager
+        self.driver_factory = driver_factory
+        self.on_replaced = on_replaced
+        self.lease = lease
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+
+        self._lock = threading.Lock()
+        self._supervised: Dict[int, Dict[str, float]] = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def supervise(self, driver_id: int) -> None:
+        """Добавляет драйвер под наблюдение"""
+        with self._lock:
+            self._supervised.setdefault(driver_id, {
+                "failures": 0,
+                "restarts": 0,
+                "next_restart_at": 0.0,
+                "last_ok_at": time.time()
+            })
+        # Простаивающий или упавший драйвер заменяет супервизор, а не очистка менеджера
+        self.driver_manager.exempt_from_cleanup(driver_id)
+
+    def unsupervise(self, driver_id: int) -> None:
+        """Снимает драйвер с наблюдения"""
+        with self._lock:
+            self._supervised.pop(driver_id, None)
+        self.driver_manager.exempt_from_cleanup(driver_id, False)
+
+    def status(self) -> Dict[int, Dict[str, float]]:
+        """Возвращает состояние наблюдаемых драйверов"""
+        with self._lock:
+            return {driver_id: dict(state) for driver_id, state in self._supervised.items()}
+
+    @staticmethod
+    def probe(driver: WebDriver) -> bool:
+        """
+        Проверяет, что сессия и рендерер драйвера отвечают
+
+        Returns:
+            bool: True если драйвер работоспособен
+        """
+        try:
+            if not driver.window_handles:
+                return False
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def start(self) -> None:
+        """Запускает поток наблюдения"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="DriverSupervisor")
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.info("✅ Запущено наблюдение за драйверами")
+
+    def stop(self) -> None:
+        """Останавливает поток наблюдения"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        """Цикл проверок"""
+        while not self._stop.wait(self.probe_interval):
+            with self._lock:
+                driver_ids = list(self._supervised)
+            for driver_id in driver_ids:
+                if self._stop.is_set():
+                    break
+                try:
+                    self.check(driver_id)
+                except Exception as e:
+                    self.logger.error(f"❌ Ошибка при проверке драйвера {driver_id}", exc_info=e)
+
+    def check(self, driver_id: int) -> bool:
+        """
+        Проверяет драйвер и при необходимости заменяет его
+
+        Args:
+            driver_id: ID драйвера
+
+        Returns:
+            bool: True если драйвер работоспособен после проверки
+        """
+        driver = self.driver_manager.get_driver_any_state(driver_id)
+
+        if driver is not None:
+            with self.lease(driver_id, 1) as acquired:
+                # Драйвер занят воркером - значит, он отвечает; проверим в следующий раз
+                if not acquired:
+                    return True
+                healthy = self.probe(driver)
+
+            if healthy:
+                with self._lock:
+                    state = self._supervised.get(driver_id)
+                    if state:
+                        state["failures"] = 0
+                        state["last_ok_at"] = time.time()
+                self.driver_manager.mark_driver_alive(driver_id)
+                return True
+
+        with self._lock:
+            state = self._supervised.get(driver_id)
+            if state is None:
+                return False
+            state["failures"] += 1
+            failures = state["failures"]
+            due = time.time() >= state["next_restart_at"]
+
+        PROBE_FAILURES.inc()
+        self.logger.warning(f"⚠️ Драйвер {driver_id} не отвечает ({failures}/{self.failure_threshold})")
+        if driver is not None and failures < self.failure_threshold:
+            # Единичный сбой проверки еще не повод снимать драйвер с работы
+            return False
+        if driver is not None:
+            self.driver_manager.mark_driver_dead(driver_id)
+
+        if due:
+            return self._replace(driver_id)
+        return False
+
+    def _replace(self, driver_id: int) -> bool:
+        """Запускает новый драйвер и подменяет им упавший"""
+        with self._lock:
+            state = self._supervised.get(driver_id)
+            if state is None:
+                return False
+            attempt = int(state["restarts"])
+
+        try:
+            # Запуск браузера - долгая операция, выполняем ее без блокировок
+            new_driver = self.driver_factory(driver_id)
+        except Exception as e:
+            delay = retry_manager.exponential_backoff(attempt)
+            RESTARTS.labels("failed").inc()
+            with self._lock:
+                if driver_id in self._supervised:
+                    self._supervised[driver_id]["restarts"] += 1
+                    self._supervised[driver_id]["next_restart_at"] = time.time() + delay
+            self.logger.error(f"❌ Не удалось перезапустить драйвер {driver_id}, следующая попытка через {delay:.0f} с", exc_info=e)
+            return False
+
+        with self.lease(driver_id, 60) as acquired:
+            if acquired:
+                old_driver = self.driver_manager.replace_driver(driver_id, new_driver)
+
+        if not acquired:
+            # Драйвер занят воркером; замена повторится при следующей проверке
+            self.logger.warning(f"⚠️ Драйвер {driver_id} занят, замена отложена")
+            self.driver_manager.quit_async(driver_id, new_driver)
+            return False
+
+        # Упавший Chrome часто зависает в quit: закрываем в фоне, чтобы не
+        # останавливать проверку остальных драйверов
+        if old_driver is not None:
+            self.driver_manager.quit_async(driver_id, old_driver)
+
+        with self._lock:
+            if driver_id in self._supervised:
+                self._supervised[driver_id].update(failures=0, restarts=0, next_restart_at=0.0, last_ok_at=time.time())
+
+        RESTARTS.labels("ok").inc()
+        self.logger.info(f"✅ Драйвер {driver_id} перезапущен")
+        if self.on_replaced:
+            try:
+                self.on_replaced(driver_id, new_driver)
+            except Exception as e:
+                self.logger.error(f"❌ Ошибка в обработчике замены драйвера {driver_id}", exc_info=e)
+        return True
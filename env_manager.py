@@ -6,10 +6,15 @@ from logger import Logger
 class EnvManager:
     """Менеджер переменных окружения"""
     
+    # .env читается и проверяется один раз на процесс
+    _loaded = False
+    
     def __init__(self):
         self.logger = Logger("env_manager")
-        self._load_env()
-        self._validate_env()
+        if not EnvManager._loaded:
+            self._load_env()
+            self._validate_env()
+            EnvManager._loaded = True
         
     def _load_env(self) -> None:
         """Загружает переменные окружения из .env файла"""
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Union
+from PIL import Image
+
+def dhash(image: Union[bytes, Image.Image], hash_size: int = 8) -> int:
+    """
+    Вычисляет разностный перцептивный хеш (dHash) изображения
+
+    Args:
+        image: Изображение в виде байтов или объекта PIL
+        hash_size: Размер стороны хеша (8 дает 64-битный хеш)
+
+    Returns:
+        int: Хеш в виде целого числа
+    """
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(BytesIO(image))
+
+    # Целочисленное reduce дешевле resize на полноразмерном скриншоте
+    gray = image.convert("L")
+    factor = max(1, min(gray.width // (hash_size * 4), gray.height // (hash_size * 4)))
+    if factor > 1:
+        gray = gray.reduce(factor)
+    small = gray.resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(first: int, second: int) -> int:
+    """Возвращает количество различающихся бит двух хешей"""
+    return bin(first ^ second).count("1")
+
+class ChangeDetector:
+    """
+    Определяет, изменилось ли изображение по сравнению с предыдущим для ключа
+
+    Ключи включают URL страницы, поэтому их число не ограничено сверху:
+    история хранится в порядке последнего использования, и при превышении
+    max_keys вытесняются давно не проверявшиеся ключи.
+    """
+
+    def __init__(self, threshold: int = 5, max_keys: int = 1024):
+        self.threshold = threshold
+        self.max_keys = max_keys
+        # Последний запомненный хеш по ключу
+        self._history: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str, image_hash: int) -> bool:
+        """
+        Сравнивает хеш с последним для ключа и запоминает его при изменении
+
+        Args:
+            key: Ключ истории (поток и/или URL)
+            image_hash: Перцептивный хеш нового изображения
+
+        Returns:
+            bool: True если отличие превышает порог (или истории еще нет)
+        """
+        with self._lock:
+            last = self._history.get(key)
+            if last is not None:
+                self._history.move_to_end(key)
+                if hamming_distance(last, image_hash) < self.threshold:
+                    return False
+
+            self._history[key] = image_hash
+            while len(self._history) > self.max_keys:
+                self._history.popitem(last=False)
+            return True
+
+    def reset(self, key: str) -> None:
+        """Удаляет историю для ключа"""
+        with self._lock:
+            self._history.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._history)
@@ -0,0 +1,100 @@
+import math
+from array import array
+from typing import Dict, Iterable
+
+# Точность: 16 корзин на каждую степень двойки (относительная ошибка до ~6%)
+_SUB_BITS = 4
+_SUB_COUNT = 1 << _SUB_BITS
+# Значения меньше этого порога (в микросекундах) хранятся точно
+_LINEAR_LIMIT = _SUB_COUNT * 2
+# Корзин хватает на значения до ~2^40 мкс (около 12 суток)
+_BUCKETS = _LINEAR_LIMIT + 40 * _SUB_COUNT
+
+def _bucket(micros: int) -> int:
+    """Номер корзины для значения в микросекундах"""
+    if micros < _LINEAR_LIMIT:
+        return max(0, micros)
+    shift = micros.bit_length() - _SUB_BITS - 1
+    index = _LINEAR_LIMIT + (shift - 1) * _SUB_COUNT + (micros >> shift) - _SUB_COUNT
+    return min(index, _BUCKETS - 1)
+
+def _upper_bound(index: int) -> int:
+    """Наибольшее значение (мкс), попадающее в корзину"""
+    if index < _LINEAR_LIMIT:
+        return index
+    shift = (index - _LINEAR_LIMIT) // _SUB_COUNT + 1
+    top = (index - _LINEAR_LIMIT) % _SUB_COUNT + _SUB_COUNT
+    return ((top + 1) << shift) - 1
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с логарифмическими корзинами (в духе HdrHistogram)
+
+    Значения хранятся в микросекундах в фиксированном массиве счетчиков:
+    до 32 мкс точно, дальше по 16 корзин на каждую степень двойки. Запись -
+    одно вычисление индекса и инкремент, память не растет, а перцентили
+    считаются с относительной ошибкой не больше ~6%. Гистограммы можно
+    складывать (merge), например чтобы получить сводку по команде из
+    гистограмм по отдельным вызывающим функциям.
+
+    Класс не потокобезопасен: запись выполняется под блокировкой владельца.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = array("q", [0]) * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Добавляет значение в секундах"""
+        self.counts[_bucket(int(seconds * 1_000_000))] += 1
+        if not self.count or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Добавляет значения другой гистограммы"""
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, percent: float) -> float:
+        """Перцентиль в секундах (ближайший ранг, верхняя граница корзины)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, _upper_bound(index) / 1_000_000)
+        return self.max
+
+    def percentiles(self, percents: Iterable[float] = (50, 90, 99)) -> Dict[float, float]:
+        """Несколько перцентилей за один вызов"""
+        return {percent: self.percentile(percent) for percent in percents}
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @classmethod
+    def combined(cls, histograms: Iterable["LatencyHistogram"]) -> "LatencyHistogram":
+        """Новая гистограмма из суммы нескольких"""
+        result = cls()
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
@@ -0,0 +1,365 @@
+import os
+import math
+import time
+import socket
+import sqlite3
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from logger import Logger
+
+class LeaseStore:
+    """
+    Интерфейс хранилища аренд (leases)
+
+    Аренда закрепляет ключ (URL) за узлом до момента expires_at. Узел должен
+    продлевать свои аренды; просроченную аренду может забрать любой узел.
+    Время берется из time.time(), поэтому часы узлов должны быть синхронизированы
+    (NTP), а TTL - заметно больше возможного расхождения часов.
+    """
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        """Захватывает свободную или просроченную аренду; True если ключ теперь наш"""
+        raise NotImplementedError
+
+    def renew(self, keys: Iterable[str], owner: str, ttl: float) -> List[str]:
+        """Продлевает аренды узла; возвращает ключи, которые удалось продлить"""
+        raise NotImplementedError
+
+    def release(self, keys: Iterable[str], owner: str) -> None:
+        """Освобождает аренды узла"""
+        raise NotImplementedError
+
+    def owners(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Возвращает действующих владельцев ключей"""
+        raise NotImplementedError
+
+    def heartbeat(self, node: str, ttl: float) -> None:
+        """Отмечает узел живым на ttl секунд"""
+        raise NotImplementedError
+
+    def live_nodes(self) -> List[str]:
+        """Возвращает живые узлы"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Закрывает хранилище"""
+
+class MemoryLeaseStore(LeaseStore):
+    """Хранилище аренд в памяти процесса (для одного узла и отладки)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._nodes: Dict[str, float] = {}
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(key)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._leases[key] = (owner, now + ttl)
+            return True
+
+    def renew(self, keys: Iterable[str], owner: str, ttl: float) -> List[str]:
+        now = time.time()
+        renewed = []
+        with self._lock:
+            for key in keys:
+                current = self._leases.get(key)
+                if current and current[0] == owner and current[1] > now:
+                    self._leases[key] = (owner, now + ttl)
+                    renewed.append(key)
+        return renewed
+
+    def release(self, keys: Iterable[str], owner: str) -> None:
+        with self._lock:
+            for key in keys:
+                current = self._leases.get(key)
+                if current and current[0] == owner:
+                    del self._leases[key]
+
+    def owners(self, keys: Iterable[str]) -> Dict[str, str]:
+        now = time.time()
+        with self._lock:
+            return {
+                key: self._leases[key][0]
+                for key in keys
+                if key in self._leases and self._leases[key][1] > now
+            }
+
+    def heartbeat(self, node: str, ttl: float) -> None:
+        with self._lock:
+            self._nodes[node] = time.time() + ttl
+
+    def live_nodes(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return sorted(node for node, expires_at in self._nodes.items() if expires_at > now)
+
+class SqliteLeaseStore(LeaseStore):
+    """
+    Хранилище аренд в общем файле SQLite
+
+    Файл может лежать на общем диске нескольких узлов. Поэтому используется
+    обычный журнал отката, а не WAL: WAL требует общей памяти и не работает
+    через сетевые файловые системы. Захват выполняется в транзакции
+    BEGIN IMMEDIATE, чтобы два узла не забрали одну аренду.
+    """
+
+    def __init__(self, db_path: str = os.path.join("state", "leases.db"), busy_timeout: float = 10):
+        self.logger = Logger("lease_store")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        """Создает таблицы при необходимости"""
+        with self._lock:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leases_owner ON leases (owner)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS nodes (
+                    node TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _transaction(self, statements: Callable[[sqlite3.Connection], object]) -> object:
+        """Выполняет функцию в транзакции BEGIN IMMEDIATE"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._transaction(lambda conn: conn.execute(
+            """
+            INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE leases.owner = excluded.owner OR leases.expires_at <= ?
+            """,
+            (key, owner, now + ttl, now)
+        ))
+        return cursor.rowcount > 0
+
+    def renew(self, keys: Iterable[str], owner: str, ttl: float) -> List[str]:
+        keys = list(keys)
+        if not keys:
+            return []
+        now = time.time()
+
+        def statements(conn: sqlite3.Connection) -> List[str]:
+            renewed = []
+            for key in keys:
+                cursor = conn.execute(
+                    "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ? AND expires_at > ?",
+                    (now + ttl, key, owner, now)
+                )
+                if cursor.rowcount:
+                    renewed.append(key)
+            return renewed
+
+        return self._transaction(statements)
+
+    def release(self, keys: Iterable[str], owner: str) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        self._transaction(lambda conn: conn.executemany(
+            "DELETE FROM leases WHERE key = ? AND owner = ?",
+            [(key, owner) for key in keys]
+        ))
+
+    def owners(self, keys: Iterable[str]) -> Dict[str, str]:
+        wanted = set(keys)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, owner FROM leases WHERE expires_at > ?", (time.time(),)
+            ).fetchall()
+        return {key: owner for key, owner in rows if key in wanted}
+
+    def heartbeat(self, node: str, ttl: float) -> None:
+        now = time.time()
+        self._transaction(lambda conn: (
+            conn.execute(
+                "INSERT INTO nodes (node, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(node) DO UPDATE SET expires_at = excluded.expires_at",
+                (node, now + ttl)
+            ),
+            # Давно пропавшие узлы удаляем, чтобы таблица не росла
+            conn.execute("DELETE FROM nodes WHERE expires_at <= ?", (now - 24 * 3600,))
+        ))
+
+    def live_nodes(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT node FROM nodes WHERE expires_at > ? ORDER BY node", (time.time(),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class LeaseDistributor:
+    """
+    Распределяет отслеживаемые URL между узлами через аренды
+
+    Каждый узел периодически продлевает свои аренды, отпускает лишние сверх
+    справедливой доли (URL / живые узлы) и забирает свободные и просроченные.
+    Порядок захвата задается rendezvous-хешированием узла и URL, поэтому при
+    появлении или пропаже узла переезжает минимум URL. Подписчики получают
+    список URL, закрепленных за этим узлом.
+    """
+
+    def __init__(
+        self,
+        store: LeaseStore,
+        node_id: Optional[str] = None,
+        ttl: float = 30,
+        renew_interval: float = 10
+    ):
+        """
+        Args:
+            store: Хранилище аренд
+            node_id: Имя узла (по умолчанию hostname:pid)
+            ttl: Время жизни аренды в секундах
+            renew_interval: Интервал продления (должен быть заметно меньше ttl)
+        """
+        self.logger = Logger("lease_distributor")
+        self.store = store
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+
+        self._lock = threading.Lock()
+        self._keys: Set[str] = set()
+        self._owned: Set[str] = set()
+        self._subscribers: List[Callable[[List[str]], None]] = []
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _preference(self, key: str) -> str:
+        """Вес rendezvous-хеширования пары (узел, ключ)"""
+        return hashlib.sha1(f"{self.node_id}|{key}".encode()).hexdigest()
+
+    def owned(self) -> List[str]:
+        """Возвращает URL, закрепленные за этим узлом"""
+        with self._lock:
+            return sorted(self._owned)
+
+    def set_keys(self, keys: Iterable[str]) -> None:
+        """Задает полный список URL для распределения и запускает перераспределение"""
+        with self._lock:
+            self._keys = set(keys)
+        self._wakeup.set()
+
+    def subscribe(self, callback: Callable[[List[str]], None]) -> None:
+        """Подписывает обработчик на изменение закрепленных за узлом URL"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def rebalance(self) -> List[str]:
+        """
+        Выполняет один цикл продления, освобождения и захвата аренд
+
+        Returns:
+            List[str]: URL, закрепленные за узлом после цикла
+        """
+        self.store.heartbeat(self.node_id, self.ttl)
+        with self._lock:
+            keys = set(self._keys)
+            previous = set(self._owned)
+
+        # Продлеваем свои аренды; не продленные значит уже заняты другими
+        owned = set(self.store.renew(previous & keys, self.node_id, self.ttl))
+        self.store.release(previous - keys, self.node_id)
+
+        live = max(len(self.store.live_nodes()), 1)
+        share = math.ceil(len(keys) / live)
+
+        if len(owned) > share:
+            # Лишние отдаем, начиная с наименее предпочтительных для узла
+            excess = sorted(owned, key=self._preference)[share:]
+            self.store.release(excess, self.node_id)
+            owned -= set(excess)
+        elif len(owned) < share:
+            taken = self.store.owners(keys - owned)
+            for key in sorted(keys - owned - set(taken), key=self._preference):
+                if len(owned) >= share:
+                    break
+                if self.store.claim(key, self.node_id, self.ttl):
+                    owned.add(key)
+
+        with self._lock:
+            self._owned = owned
+            subscribers = list(self._subscribers)
+        if owned != previous:
+            self.logger.info(f"🔄 За узлом {self.node_id} закреплено URL: {len(owned)} из {len(keys)}")
+            urls = sorted(owned)
+            for callback in subscribers:
+                try:
+                    callback(urls)
+                except Exception as e:
+                    self.logger.error("❌ Ошибка в обработчике перераспределения URL", exc_info=e)
+        return sorted(owned)
+
+    def start(self) -> None:
+        """Запускает фоновое продление и перераспределение аренд"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="LeaseDistributor")
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.info(f"✅ Распределение URL через аренды запущено (узел {self.node_id})")
+
+    def stop(self) -> None:
+        """Останавливает продление и освобождает аренды, чтобы другие узлы забрали URL сразу"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._lock:
+            owned, self._owned = self._owned, set()
+        try:
+            self.store.release(owned, self.node_id)
+            # Нулевой TTL сразу исключает узел из расчета справедливой доли
+            self.store.heartbeat(self.node_id, 0)
+        except Exception as e:
+            self.logger.error("❌ Ошибка при освобождении аренд", exc_info=e)
+
+    def _loop(self) -> None:
+        """Цикл продления аренд"""
+        while not self._stop.is_set():
+            try:
+                self.rebalance()
+            except Exception as e:
+                self.logger.error("❌ Ошибка при продлении аренд", exc_info=e)
+            self._wakeup.wait(self.renew_interval)
+            self._wakeup.clear()
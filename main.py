@@ -8,65 +8,86 @@ import sys
 import os
 import traceback
 import requests
-import json
 import random
 import threading
 from queue import Queue
+from concurrent.futures import ThreadPoolExecutor, wait
 from auth_manager import AuthManager
 from page_manager import PageManager
-from order_manager import OrderManager
 from driver_manager import DriverManager
-from screenshot_manager import ScreenshotManager
+from driver_profiler import driver_profiler
+from screenshot_manager import UNCHANGED, ScreenshotManager, compose_grid
 from telegram_manager import telegram_manager
+from notification_store import notification_store
 from vpn_checker import VPNChecker
-from env_manager import EnvManager
+from config_manager import config_manager
 import base64
 from io import BytesIO
 from PIL import Image
 from logger import Logger
-from credentials_manager import CredentialsManager
-from typing import Dict
+from retry_manager import retry_manager
+from account_manager import account_manager
+from url_registry import url_registry
+from monitor_scheduler import SCRAPE_RATE, SCRAPES, MonitorScheduler
+from metrics import MetricsServer, metrics
+from driver_supervisor import DriverSupervisor
+from position_reader import read_positions, position_values
+from position_differ import CLOSED, format_position_event, position_differ
+from process_coordinator import ProcessCoordinator
+from position_store import position_store, trader_id
+from snapshot_buffer import snapshot_buffer
+from position_analytics import METRICS, AnalyticsMonitor, PositionAnalytics
+from rule_engine import Alert, RuleEngine, parse_rules
+from lease_store import LeaseDistributor, MemoryLeaseStore, SqliteLeaseStore
+from typing import Dict, List, Optional, Tuple
 
 # Инициализация менеджера переменных окружения
-env = EnvManager()
+env = config_manager.env
 
 # Инициализация логгера
 logger = Logger("binance_bot")
 
-# Инициализация менеджера драйверов
-driver_manager = DriverManager()
+# Инициализация менеджера драйверов (команды всех драйверов замеряются профилировщиком)
+driver_manager = DriverManager(on_register=driver_profiler.instrument)
 
-# Инициализация драйвера
-options = uc.ChromeOptions()
-options.add_argument('--start-maximized')
-driver = uc.Chrome(options=options)
+# WORKER_PROCESSES > 0 включает многопроцессный режим: браузерами владеют
+# процессы-воркеры, а основной процесс свой Chrome не запускает
+WORKER_PROCESSES = env.get_int("WORKER_PROCESSES", 0)
 
-# Регистрируем драйвер в менеджере
-driver_manager.register_driver(1, driver)
-
-# Проверка VPN перед запуском
-vpn_checker = VPNChecker(driver)
-success, message = vpn_checker.check_vpn()
+if WORKER_PROCESSES <= 0:
+    # Инициализация драйвера
+    options = uc.ChromeOptions()
+    options.add_argument('--start-maximized')
+    driver = uc.Chrome(options=options)
+    
+    # Регистрируем драйвер в менеджере
+    driver_manager.register_driver(1, driver)
+    
+    # Проверка VPN перед запуском
+    vpn_checker = VPNChecker(driver)
+    success, message = vpn_checker.check_vpn()
+    
+    if not success:
+        logger.error(f"❌ {message}")
+        if not vpn_checker.wait_for_vpn(timeout=env.get_int("VPN_CHECK_TIMEOUT", 300)):
+            logger.critical("❌ Превышено время ожидания VPN. Завершение работы.")
+            driver.quit()
+            sys.exit(1)
 
-if not success:
-    logger.error(f"❌ {message}")
-    if not vpn_checker.wait_for_vpn(timeout=env.get_int("VPN_CHECK_TIMEOUT", 300)):
-        logger.critical("❌ Превышено время ожидания VPN. Завершение работы.")
-        driver.quit()
-        sys.exit(1)
+# Ограничение параллельности и времени съемки скриншотов для /screenshot
+CAPTURE_PARALLELISM = env.get_int("SCREENSHOT_PARALLELISM", 8)
+CAPTURE_TIMEOUT = float(env.get("SCREENSHOT_TIMEOUT", "30"))
+capture_executor = ThreadPoolExecutor(max_workers=CAPTURE_PARALLELISM, thread_name_prefix="ScreenshotCapture")
 
 # Загрузка URL из конфигурационного файла
 def load_urls():
-    try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-            return config.get('urls', [])
-    except FileNotFoundError:
-        logger.warning("Файл конфигурации не найден")
-        return []
-    except json.JSONDecodeError as e:
-        logger.error("Ошибка при чтении файла конфигурации", exc_info=e)
-        return []
+    return list(config_manager.config.login_urls)
+
+def apply_settings(old_config, new_config, changed) -> None:
+    """Применяет параметры из config.json к работающим менеджерам"""
+    if "config" in changed:
+        retry_manager.max_retries = new_config.settings.max_retries
+        logger.info(f"🔄 Применены настройки: {new_config.settings}")
 
 def take_screenshot(driver, thread_id):
     """Создание скриншота текущего окна браузера"""
@@ -77,126 +98,240 @@ def take_screenshot(driver, thread_id):
         logger.error(f"❌ Ошибка при создании скриншота (Поток {thread_id})", exc_info=e)
         return None
 
-def check_table_data(driver, thread_id):
+def record_position(url: str, position: Dict[str, str], ts: Optional[float] = None) -> None:
+    """Сохраняет снимок позиции в буфер последних значений и в историю и проверяет правила"""
+    ts = ts or time.time()
+    trader = trader_id(url)
+    values = position_values(position)
+    snapshot_buffer.append(trader, position["symbol"], ts, values)
+    position_store.record(trader, position, ts)
+    rule_engine.evaluate_position((trader, position["symbol"]), {**values, "symbol": position["symbol"]}, ts)
+
+# Значки важности оповещений
+SEVERITY_ICONS = {"info": "ℹ️", "warning": "⚠️", "urgent": "🚨"}
+
+def send_alert(alert: Alert) -> None:
+    """Отправляет оповещение о срабатывании правила"""
+    rule = alert.rule
+    key = " / ".join(str(part) for part in alert.key) if isinstance(alert.key, tuple) else str(alert.key)
+    values = ", ".join(
+        f"{name} = {value:g}" if isinstance(value, float) else f"{name} = {value}"
+        for name, value in alert.values.items()
+    )
+    telegram_manager.enqueue_message(
+        f"{SEVERITY_ICONS[rule.severity]} {rule.name}: {key}\n{rule.condition}\n{values}",
+        idempotency_key=f"alert:{rule.name}:{key}:{int(alert.ts)}"
+    )
+
+def apply_analytics_settings(old_config, new_config, changed) -> None:
+    """Применяет окно и период аналитики из config.json и правила оповещений"""
+    if "config" in changed:
+        analytics_monitor.window = new_config.settings.analytics_window
+        analytics_monitor.interval = new_config.settings.analytics_interval
+    if "rules" in changed:
+        rules, errors = parse_rules(new_config.rules, METRICS)
+        for error in errors:
+            logger.error(f"❌ Неверное правило оповещения ({error})")
+        rule_engine.set_rules(rules)
+
+# Правила оповещений по снимкам позиций, метрикам и ордерам
+rule_engine = RuleEngine(send_alert)
+
+# Расчет метрик по всем позициям и проверка правил metrics
+analytics_monitor = AnalyticsMonitor(PositionAnalytics(snapshot_buffer), rule_engine)
+
+def process_positions(url: str, rows: Dict[str, Dict[str, str]], ts: Optional[float] = None) -> int:
     """
-    Проверяет данные в таблице и отправляет их через Telegram
+    Сохраняет снимок таблицы позиций и отправляет в Telegram события по изменениям
+
+    Args:
+        url: URL трейдера
+        rows: data-row-key -> текст ячеек позиции
+        ts: Время снимка
+
+    Returns:
+        int: Количество событий
+    """
+    ts = ts or time.time()
+    last_data_at[url] = ts
+    # Запись в историю только ставится в очередь и не задерживает проверку
+    for position in rows.values():
+        record_position(url, position, ts)
+
+    # Ключ идемпотентности по содержимому события исключает повторную
+    # отправку после перезапуска
+    events = position_differ.diff(trader_id(url), rows, ts)
+    for event in events:
+        telegram_manager.enqueue_message(format_position_event(event), idempotency_key=event.idempotency_key)
+        if event.type == CLOSED:
+            # Ряд закрытой позиции освобождается (и пропадает из /status), а новая
+            # позиция по тому же символу начинает правила с чистого состояния
+            symbol = event.position["symbol"]
+            rule_engine.forget((event.trader, symbol), snapshot_buffer.release(event.trader, symbol))
+    return len(events)
+
+def check_table_data(driver, thread_id, url: Optional[str] = None):
+    """
+    Проверяет данные в таблице, сохраняет их в историю и отправляет через Telegram события позиций
     
     Args:
         driver: WebDriver
         thread_id: ID потока
+        url: URL трейдера (по умолчанию берется из драйвера)
+        
+    Raises:
+        Exception: Ошибка чтения таблицы пробрасывается, чтобы планировщик
+            засчитал проверку как неудачную
     """
     logger = Logger("main")
     
     try:
-        # Ждем загрузки таблицы
+        # Ждем загрузки таблицы и считываем все строки
         logger.info(f"⏳ Ожидание загрузки таблицы (Поток {thread_id})...")
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "tr[data-row-key]"))
-        )
-        
-        # Находим все строки таблицы
-        rows = driver.find_elements(By.CSS_SELECTOR, "tr[data-row-key]")
+        rows = read_positions(driver)
         
         if not rows:
-            logger.warning(f"⚠️ Таблица пуста (Поток {thread_id})")
-            return
+            logger.info(f"ℹ️ Открытых позиций нет (Поток {thread_id})")
             
-        # Собираем данные из первой строки
-        row = rows[0]
-        
-        # Извлекаем данные из ячеек
-        symbol = row.find_element(By.CSS_SELECTOR, ".name").text
-        leverage = row.find_element(By.CSS_SELECTOR, "td[aria-colindex='2']").text
-        entry_price = row.find_element(By.CSS_SELECTOR, "td[aria-colindex='3']").text
-        mark_price = row.find_element(By.CSS_SELECTOR, "td[aria-colindex='4']").text
-        time_element = row.find_element(By.CSS_SELECTOR, "td[aria-colindex='5']").text
-        
-        # Извлекаем PNL и процент
-        pnl_cell = row.find_element(By.CSS_SELECTOR, "td[aria-colindex='6']")
-        pnl_elements = pnl_cell.find_elements(By.CSS_SELECTOR, ".Number")
-        pnl = pnl_elements[0].text if len(pnl_elements) > 0 else "N/A"
-        pnl_percent = pnl_elements[1].text if len(pnl_elements) > 1 else "N/A"
-        
-        # Формируем сообщение
-        message = (
-            f"📊 Данные позиции (Поток {thread_id}):\n\n"
-            f"Символ: {symbol}\n"
-            f"Плечо: {leverage}x\n"
-            f"Цена входа: {entry_price}\n"
-            f"Текущая цена: {mark_price}\n"
-            f"Время: {time_element}\n"
-            f"PNL: {pnl}\n"
-            f"PNL %: {pnl_percent}"
-        )
-        
-        # Отправляем сообщение в Telegram
-        telegram_manager.send_message(message)
-        logger.info(f"✅ Данные отправлены в Telegram (Поток {thread_id})")
+        events = process_positions(url or driver.current_url, rows)
+        if events:
+            logger.info(f"✅ Событий позиций в очереди Telegram: {events} (Поток {thread_id})")
         
     except TimeoutException:
         logger.error(f"❌ Таймаут при ожидании таблицы (Поток {thread_id})")
+        raise
     except NoSuchElementException as e:
         logger.error(f"❌ Элемент не найден (Поток {thread_id}): {str(e)}")
-    except Exception as e:
-        logger.error(f"❌ Ошибка при проверке данных таблицы (Поток {thread_id})", exc_info=e)
+        raise
 
-def open_binance_page(url, thread_id):
-    try:
-        # Используем существующий драйвер
-        driver = driver_manager.get_driver(thread_id)
-        if not driver:
-            logger.error(f"❌ Драйвер не найден для потока {thread_id}")
-            return
+# ID аккаунта -> ID драйвера в менеджере драйверов
+account_threads: Dict[str, int] = {}
+
+# URL -> (ID драйвера, дескриптор вкладки); вкладки переживают изменения списка URL
+url_tabs: Dict[str, Tuple[int, str]] = {}
+url_tabs_lock = threading.Lock()
+
+# URL -> время последнего полученного снимка таблицы (свежесть данных в /metrics)
+last_data_at: Dict[str, float] = {}
+started_at = time.time()
+
+# Событие завершения работы
+shutdown_event = threading.Event()
+
+# Распределение URL между узлами (включается переменной LEASE_STORE)
+lease_distributor: Optional[LeaseDistributor] = None
+
+# Координатор процессов-воркеров (только в многопроцессном режиме)
+coordinator: Optional[ProcessCoordinator] = None
+
+# Количество позиций в ответе /status
+STATUS_POSITIONS = env.get_int("STATUS_POSITIONS", 20)
+
+def monitored_urls():
+    """Возвращает URL, которые обслуживает этот узел"""
+    if lease_distributor:
+        return lease_distributor.owned()
+    return url_registry.list()
+
+def start_lease_distribution(on_assigned) -> bool:
+    """
+    Включает распределение URL между узлами через аренды
+    
+    LEASE_STORE задает путь к общему файлу SQLite или "memory" для
+    хранилища в памяти (один узел).
+    
+    Args:
+        on_assigned: Обработчик списка URL, закрепленных за узлом
         
-        # Инициализация менеджеров
-        page_manager = PageManager(driver)
-        auth_manager = AuthManager(driver)
+    Returns:
+        bool: True если распределение включено
+    """
+    global lease_distributor
+    lease_path = env.get("LEASE_STORE")
+    if not lease_path:
+        return False
         
-        # Проверяем VPN
-        vpn_checker = VPNChecker(driver)
-        logger.info("⏳ Ожидание активации VPN...")
-        logger.info("После включения VPN нажмите Enter в консоли")
-        input()
-        logger.info("✅ Пользователь подтвердил активацию VPN")
+    store = MemoryLeaseStore() if lease_path == "memory" else SqliteLeaseStore(lease_path)
+    ttl = env.get_int("LEASE_TTL", 30)
+    lease_distributor = LeaseDistributor(store, env.get("NODE_ID"), ttl=ttl, renew_interval=ttl / 3)
+    lease_distributor.set_keys(url_registry.list())
+    url_registry.subscribe(lease_distributor.set_keys)
+    lease_distributor.subscribe(on_assigned)
+    lease_distributor.start()
+    return True
+
+def login_driver(thread_id: int) -> bool:
+    """
+    Выполняет ручной вход в Binance на драйвере
+    
+    Args:
+        thread_id: ID потока драйвера в менеджере драйверов
         
-        # Переходим на страницу логина Binance
-        logger.info("🌐 Переход на страницу логина Binance...")
-        driver.get("https://accounts.binance.com/en/login")
+    Returns:
+        bool: True если пользователь авторизован
+    """
+    driver = driver_manager.get_driver(thread_id)
+    if not driver:
+        logger.error(f"❌ Драйвер не найден для потока {thread_id}")
+        return False
         
-        # Ждем загрузки страницы
-        if not page_manager.wait_for_page_load():
-            logger.error(f"❌ Ошибка загрузки страницы логина (Поток {thread_id})")
-            return
-            
-        logger.info(f"✅ Страница логина Binance успешно открыта (Поток {thread_id})")
-        logger.info("⏳ Ожидание ручной авторизации...")
-        logger.info("После авторизации нажмите Enter в консоли")
-        input()
+    # Инициализация менеджеров
+    page_manager = PageManager(driver)
+    auth_manager = AuthManager(driver)
+    
+    # Проверяем VPN
+    logger.info("⏳ Ожидание активации VPN...")
+    logger.info("После включения VPN нажмите Enter в консоли")
+    input()
+    logger.info("✅ Пользователь подтвердил активацию VPN")
+    
+    # Переходим на страницу логина Binance
+    logger.info("🌐 Переход на страницу логина Binance...")
+    driver.get("https://accounts.binance.com/en/login")
+    
+    # Ждем загрузки страницы
+    if not page_manager.wait_for_page_load():
+        logger.error(f"❌ Ошибка загрузки страницы логина (Поток {thread_id})")
+        return False
         
-        # Ждем появления элемента с никнеймом пользователя
-        logger.info(f"⏳ Ожидание загрузки дашборда (Поток {thread_id})...")
-        try:
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "#dashboard-userinfo-nickname"))
-            )
-            nickname = driver.find_element(By.CSS_SELECTOR, "#dashboard-userinfo-nickname").text
-            logger.info(f"✅ Пользователь авторизован: {nickname} (Поток {thread_id})")
-            
-            # После успешного входа запускаем проверку авторизации
-            logger.info("⏳ Запуск проверки авторизации...")
-            success, message = auth_manager.check_auth_after_login()
-            if not success:
-                logger.error(f"❌ Ошибка при проверке авторизации: {message}")
-                return
-            logger.info("✅ Проверка авторизации успешно завершена")
-            
-        except TimeoutException:
-            logger.error(f"❌ Не удалось найти элемент с никнеймом пользователя (Поток {thread_id})")
-            return
-        except Exception as e:
-            logger.error(f"❌ Ошибка при проверке никнейма пользователя (Поток {thread_id})", exc_info=e)
+    logger.info(f"✅ Страница логина Binance успешно открыта (Поток {thread_id})")
+    logger.info("⏳ Ожидание ручной авторизации...")
+    logger.info("После авторизации нажмите Enter в консоли")
+    input()
+    
+    # Ждем появления элемента с никнеймом пользователя
+    logger.info(f"⏳ Ожидание загрузки дашборда (Поток {thread_id})...")
+    try:
+        WebDriverWait(driver, 30).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "#dashboard-userinfo-nickname"))
+        )
+        nickname = driver.find_element(By.CSS_SELECTOR, "#dashboard-userinfo-nickname").text
+        logger.info(f"✅ Пользователь авторизован: {nickname} (Поток {thread_id})")
+        
+        # После успешного входа запускаем проверку авторизации
+        logger.info("⏳ Запуск проверки авторизации...")
+        success, message = auth_manager.check_auth_after_login()
+        if not success:
+            logger.error(f"❌ Ошибка при проверке авторизации: {message}")
+            return False
+        logger.info("✅ Проверка авторизации успешно завершена")
+        return True
+        
+    except TimeoutException:
+        logger.error(f"❌ Не удалось найти элемент с никнеймом пользователя (Поток {thread_id})")
+        return False
+    except Exception as e:
+        logger.error(f"❌ Ошибка при проверке никнейма пользователя (Поток {thread_id})", exc_info=e)
+        return False
+
+def open_binance_page(url, thread_id):
+    try:
+        if not login_driver(thread_id):
             return
             
+        driver = driver_manager.get_driver(thread_id)
+        page_manager = PageManager(driver)
+        
         # Переходим по URL из JSON
         logger.info(f"🌐 Переход по URL: {url} (Поток {thread_id})")
         driver.get(url)
@@ -209,42 +344,355 @@ def open_binance_page(url, thread_id):
         logger.info(f"✅ Страница {url} успешно открыта (Поток {thread_id})")
         
         # Проверяем данные в таблице и отправляем их через Telegram
-        check_table_data(driver, thread_id)
+        check_table_data(driver, thread_id, url)
         
     except Exception as e:
         logger.error(f"❌ Ошибка при открытии страницы (Поток {thread_id})", exc_info=e)
 
-def start_multiple_pages():
-    """Запускает несколько страниц Binance в разных потоках"""
+def is_dashboard_loaded(driver, timeout: int = 30) -> bool:
+    """Проверяет, открыт ли дашборд авторизованного пользователя"""
     try:
-        # Загружаем URL из JSON файла
-        with open('urls.json', 'r') as f:
-            urls_data = json.load(f)
-            urls = urls_data.get('urls', [])
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "#dashboard-userinfo-nickname"))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+def authenticate_account(account_id: str, thread_id: int):
+    """
+    Запускает браузер с профилем аккаунта и выполняет вход при необходимости
+    
+    Args:
+        account_id: ID аккаунта
+        thread_id: ID потока, под которым драйвер регистрируется в менеджере
         
-        if not urls:
-            logger.error("❌ Нет URL для открытия в файле urls.json")
+    Returns:
+        WebDriver или None, если авторизоваться не удалось
+    """
+    account_driver = account_manager.create_driver(account_id)
+    driver_manager.register_driver(thread_id, account_driver)
+    
+    # Профиль сохраняет сессию: если дашборд открывается, вход не нужен
+    account_driver.get("https://www.binance.com/en/my/dashboard")
+    if is_dashboard_loaded(account_driver, timeout=15):
+        logger.info(f"✅ Сессия аккаунта {account_id} восстановлена из профиля")
+        account_manager.mark_authenticated(account_id)
+        return account_driver
+        
+    # Входы разных аккаунтов разнесены во времени
+    account_manager.acquire_login_slot(account_id)
+    account_driver.get("https://accounts.binance.com/en/login")
+    logger.info(f"⏳ Ожидание ручной авторизации аккаунта {account_id}...")
+    logger.info("После авторизации нажмите Enter в консоли")
+    input()
+    
+    if not is_dashboard_loaded(account_driver):
+        logger.error(f"❌ Не удалось авторизовать аккаунт {account_id}")
+        return None
+        
+    account_manager.mark_authenticated(account_id)
+    logger.info(f"✅ Аккаунт {account_id} авторизован")
+    return account_driver
+
+def resolve_driver_id(url: str) -> int:
+    """Возвращает ID драйвера, который должен обслуживать URL"""
+    if account_threads:
+        plan = account_manager.assign_urls(monitored_urls())
+        for account_id, account_urls in plan.items():
+            if url in account_urls:
+                return account_threads[account_id]
+    return 1
+
+def scrape_url(url: str, job_id: int, driver_id: int) -> None:
+    """
+    Проверяет один URL на арендованном драйвере (вызывается планировщиком)
+    
+    Каждый URL живет в своей вкладке: при первом запуске вкладка открывается,
+    при следующих - только обновляется.
+    
+    Args:
+        url: Отслеживаемый URL
+        job_id: ID задачи планировщика (используется в сообщениях)
+        driver_id: ID арендованного драйвера
+    """
+    driver = driver_manager.get_driver(driver_id)
+    if not driver:
+        raise WebDriverException(f"Драйвер {driver_id} не найден")
+        
+    page_manager = PageManager(driver)
+    with url_tabs_lock:
+        tab = url_tabs.get(url)
+        
+    if tab and tab[0] == driver_id and tab[1] in driver.window_handles:
+        driver.switch_to.window(tab[1])
+        driver.refresh()
+    else:
+        driver.switch_to.new_window('tab')
+        with url_tabs_lock:
+            url_tabs[url] = (driver_id, driver.current_window_handle)
+        logger.info(f"🌐 Переход по URL: {url} (Монитор {job_id})")
+        driver.get(url)
+        
+    if not page_manager.wait_for_page_load():
+        raise TimeoutException(f"Страница {url} не загрузилась (Монитор {job_id})")
+        
+    check_table_data(driver, job_id, url)
+
+def close_url_tabs(tabs: List[Tuple[str, Tuple[int, str]]]) -> None:
+    """
+    Закрывает вкладки URL, удаленных из списка
+    
+    Args:
+        tabs: Пары (URL, (ID драйвера, дескриптор вкладки))
+    """
+    for url, (driver_id, handle) in tabs:
+        driver = driver_manager.get_driver(driver_id)
+        if not driver:
+            continue
+            
+        with monitor_scheduler.driver_pool.lease(driver_id, timeout=60) as acquired:
+            if not acquired:
+                logger.warning(f"⚠️ Драйвер {driver_id} занят, вкладка {url} не закрыта")
+                continue
+            try:
+                driver.switch_to.window(handle)
+                driver.close()
+                remaining = driver.window_handles
+                if remaining:
+                    driver.switch_to.window(remaining[0])
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось закрыть вкладку {url}: {str(e)}")
+
+def sync_monitors(urls) -> None:
+    """Приводит расписание и открытые вкладки к текущему списку URL"""
+    monitors = config_manager.config.monitors
+    monitor_scheduler.set_targets({url: monitors.get(url, {}) for url in urls})
+    
+    # Вкладки снимаются с учета сразу, чтобы снова добавленный URL открылся в новой
+    with url_tabs_lock:
+        removed = [(url, url_tabs.pop(url)) for url in list(url_tabs) if url not in urls]
+    if removed:
+        # Аренды занятого драйвера можно ждать до минуты, а вызывается синхронизация
+        # из обработчика /url в потоке получения обновлений Telegram
+        threading.Thread(target=close_url_tabs, args=(removed,), name="TabTeardown", daemon=True).start()
+
+def apply_scheduler_settings(old_config, new_config, changed) -> None:
+    """Применяет интервалы из config.json к планировщику"""
+    if "config" in changed:
+        monitor_scheduler.default_interval = new_config.settings.refresh_interval
+        monitor_scheduler.default_jitter = new_config.settings.jitter_percent / 100
+        sync_monitors(monitored_urls())
+
+# Планировщик периодических проверок с ограниченным пулом воркеров
+monitor_scheduler = MonitorScheduler(
+    scrape_url,
+    resolve_driver_id,
+    max_workers=config_manager.settings.max_workers,
+    default_interval=config_manager.settings.refresh_interval,
+    default_jitter=config_manager.settings.jitter_percent / 100
+)
+
+def launch_driver(driver_id: int):
+    """
+    Запускает новый браузер взамен упавшего (вызывается супервизором)
+
+    Драйвер аккаунта поднимается с его профилем, поэтому сессия обычно
+    сохраняется. Если вход потребовался, в Telegram отправляется уведомление,
+    а браузер остается открытым для ручной авторизации.
+    """
+    account_id = next((acc for acc, thread_id in account_threads.items() if thread_id == driver_id), None)
+    if account_id:
+        new_driver = account_manager.create_driver(account_id)
+    else:
+        driver_options = uc.ChromeOptions()
+        driver_options.add_argument('--start-maximized')
+        new_driver = uc.Chrome(options=driver_options)
+
+    new_driver.get("https://www.binance.com/en/my/dashboard")
+    if is_dashboard_loaded(new_driver, timeout=15):
+        if account_id:
+            account_manager.mark_authenticated(account_id)
+        return new_driver
+
+    if account_id:
+        account_manager.mark_unauthenticated(account_id)
+    telegram_manager.enqueue_message(
+        f"⚠️ Браузер {driver_id} перезапущен, требуется ручной вход" + (f" (аккаунт {account_id})" if account_id else ""),
+        idempotency_key=f"driver_login:{driver_id}:{int(time.time())}"
+    )
+    return new_driver
+
+def on_driver_replaced(driver_id: int, new_driver) -> None:
+    """Сбрасывает вкладки замененного драйвера; планировщик откроет их заново"""
+    with url_tabs_lock:
+        for url in [url for url, tab in url_tabs.items() if tab[0] == driver_id]:
+            del url_tabs[url]
+
+# Супервизор проверяет драйверы между проверками URL и заменяет упавшие
+driver_supervisor = DriverSupervisor(
+    driver_manager,
+    launch_driver,
+    on_replaced=on_driver_replaced,
+    lease=monitor_scheduler.driver_pool.lease,
+    probe_interval=env.get_int("DRIVER_PROBE_INTERVAL", 30)
+)
+
+def data_age() -> Dict[Tuple[str], float]:
+    """Возраст последнего снимка по каждому URL узла (до первого снимка - с момента запуска)"""
+    now = time.time()
+    return {(url,): now - last_data_at.get(url, started_at) for url in monitored_urls()}
+
+def driver_states() -> Dict[Tuple[str], float]:
+    """Количество активных и неактивных драйверов"""
+    drivers = driver_manager.get_active_drivers().values()
+    alive = sum(1 for info in drivers if info["alive"])
+    return {("alive",): alive, ("dead",): len(drivers) - alive}
+
+def drivers_in_backoff() -> int:
+    """Драйверы, перезапуск которых отложен после неудачной попытки"""
+    now = time.time()
+    return sum(1 for state in driver_supervisor.status().values() if state["next_restart_at"] > now)
+
+# Состояние, которое уже хранится в менеджерах, читается только при запросе /metrics
+metrics.callback("cptrade_data_age_seconds", "Время с последнего снимка таблицы по URL", data_age, ("url",))
+metrics.callback("cptrade_drivers", "Драйверы по состоянию", driver_states, ("state",))
+metrics.callback("cptrade_drivers_in_backoff", "Драйверы в паузе между попытками перезапуска", drivers_in_backoff)
+metrics.callback("cptrade_telegram_queue_depth", "Сообщения в очереди отправки Telegram", telegram_manager.store.pending_count)
+metrics.callback(
+    "cptrade_position_log_dropped_total", "Снимки позиций, отброшенные при переполнении очереди записи",
+    lambda: position_store.dropped, kind="counter"
+)
+metrics.callback(
+    "cptrade_position_log_written_total", "Снимки позиций, записанные в историю",
+    lambda: position_store.written, kind="counter"
+)
+
+# Встроенный HTTP-сервер метрик в формате Prometheus (METRICS_PORT=0 выключает)
+metrics_server = MetricsServer(
+    metrics,
+    host=env.get("METRICS_HOST", "127.0.0.1"),
+    port=env.get_int("METRICS_PORT", 9108)
+)
+
+def handle_worker_event(event: Dict) -> None:
+    """Обрабатывает события процессов-воркеров в многопроцессном режиме"""
+    worker_id = event["worker_id"]
+    if event["type"] == "positions":
+        # Проверки выполняются в воркерах, в метрики главного процесса они попадают по событиям
+        SCRAPES.labels("ok").inc()
+        SCRAPE_RATE.mark()
+        process_positions(event["url"], event["rows"], event["ts"])
+    elif event["type"] == "login_required":
+        telegram_manager.enqueue_message(
+            f"⚠️ Воркер {worker_id} требует ручного входа (профиль {event['profile_dir']})",
+            idempotency_key=f"worker_login:{worker_id}:{int(event['ts'])}"
+        )
+    elif event["type"] == "error":
+        SCRAPES.labels("failed").inc()
+        logger.warning(f"⚠️ Ошибка проверки {event['url']} (Воркер {worker_id}): {event['error']}")
+
+def worker_targets(urls) -> Dict[str, Dict]:
+    """Собирает параметры проверки URL для процессов-воркеров"""
+    settings = config_manager.settings
+    monitors = config_manager.config.monitors
+    return {
+        url: {
+            "interval": settings.refresh_interval,
+            "jitter": settings.jitter_percent / 100,
+            **monitors.get(url, {})
+        }
+        for url in urls
+    }
+
+def run_worker_processes(worker_count: int) -> None:
+    """
+    Многопроцессный режим: URL распределяются между процессами-воркерами
+    
+    Главный процесс остается координатором: владеет конфигурацией, Telegram
+    и очередью сообщений, а каждый воркер - своим браузером и частью URL.
+    """
+    global coordinator
+    accounts = account_manager.list_accounts()
+    profile_dirs = [
+        account_manager.profile_dir(accounts[i] if i < len(accounts) else f"worker-{i}")
+        for i in range(worker_count)
+    ]
+    coordinator = ProcessCoordinator(worker_count, handle_worker_event, profile_dirs)
+
+    def assign_workers(urls) -> None:
+        coordinator.set_targets(worker_targets(urls))
+
+    def apply_worker_settings(old_config, new_config, changed) -> None:
+        if "config" in changed:
+            assign_workers(monitored_urls())
+
+    try:
+        if not start_lease_distribution(assign_workers):
+            url_registry.subscribe(assign_workers)
+            assign_workers(url_registry.list())
+        config_manager.subscribe(apply_worker_settings)
+        coordinator.start()
+        
+        while not shutdown_event.wait(1):
+            pass
+    finally:
+        if lease_distributor:
+            lease_distributor.stop()
+        coordinator.stop()
+
+def start_multiple_pages():
+    """Запускает мониторинг URL из реестра и поддерживает его актуальным"""
+    try:
+        if WORKER_PROCESSES > 0:
+            run_worker_processes(WORKER_PROCESSES)
             return
             
-        # Создаем потоки для каждого URL
-        threads = []
-        for i, url in enumerate(urls, 1):
-            thread = threading.Thread(
-                target=open_binance_page,
-                args=(url, i),
-                name=f"BinancePage_{i}"
-            )
-            threads.append(thread)
-            thread.start()
-            logger.info(f"✅ Запущен поток {i} для URL: {url}")
+        urls = url_registry.list()
+        if not urls:
+            logger.warning("⚠️ Список URL пуст, добавьте URL командой /url add")
             
-        # Ждем завершения всех потоков
-        for thread in threads:
-            thread.join()
+        # При наличии сохраненных аккаунтов URL распределяются между ними
+        accounts = account_manager.list_accounts()
+        if accounts:
+            # Поток 1 занят драйвером по умолчанию, аккаунты получают следующие ID
+            for driver_id, account_id in enumerate(accounts, 2):
+                try:
+                    if authenticate_account(account_id, driver_id):
+                        account_threads[account_id] = driver_id
+                except Exception as e:
+                    logger.error(f"❌ Ошибка запуска браузера для аккаунта {account_id}", exc_info=e)
+                    
+            if not account_threads:
+                logger.error("❌ Нет авторизованных аккаунтов для мониторинга")
+                return
+        elif not login_driver(1):
+            return
+            
+        # С LEASE_STORE узел обслуживает только URL, закрепленные за ним арендой
+        if not start_lease_distribution(sync_monitors):
+            url_registry.subscribe(sync_monitors)
+            sync_monitors(url_registry.list())
+        config_manager.subscribe(apply_scheduler_settings)
+        monitor_scheduler.start()
+        
+        for driver_id in (account_threads.values() if account_threads else [1]):
+            driver_supervisor.supervise(driver_id)
+        driver_supervisor.start()
+        
+        # Ожидание с таймаутом оставляет главный поток прерываемым по Ctrl+C
+        while not shutdown_event.wait(1):
+            pass
             
     except Exception as e:
         logger.error("❌ Ошибка при запуске страниц", exc_info=e)
     finally:
+        shutdown_event.set()
+        if lease_distributor:
+            lease_distributor.stop()
+        driver_supervisor.stop()
+        monitor_scheduler.stop()
+        url_registry.stop()
         # Очищаем все драйверы при завершении
         driver_manager.cleanup_all()
 
@@ -253,14 +701,31 @@ def main():
     logger = Logger("main")
     logger.info("🚀 Запуск бота...")
     
-    # Запуск Telegram бота
+    # Применяем настройки и следим за изменениями файлов конфигурации
+    apply_settings(None, config_manager.config, {"config"})
+    config_manager.subscribe(apply_settings)
+    config_manager.start_watching()
+    
+    # Запуск Telegram бота и доставки сообщений, оставшихся в очереди
+    telegram_manager.start_delivery()
     telegram_manager.start_polling()
     
+    # Фоновая запись истории позиций и расчет метрик
+    metrics_server.start()
+    position_store.start()
+    apply_analytics_settings(None, config_manager.config, {"config", "rules"})
+    config_manager.subscribe(apply_analytics_settings)
+    analytics_monitor.start()
+    
     try:
         # Регистрация обработчиков команд
         telegram_manager.register_command("/start", handle_start_command)
         telegram_manager.register_command("/help", handle_help_command)
         telegram_manager.register_command("/url", handle_url_command)
+        telegram_manager.register_command("/credentials", handle_credentials_command)
+        telegram_manager.register_command("/screenshot", handle_screenshot_command)
+        telegram_manager.register_command("/status", handle_status_command)
+        telegram_manager.register_command("/profile", handle_profile_command)
         
         # Запуск основного процесса
         logger.info("🚀 Запуск основного процесса...")
@@ -273,6 +738,13 @@ def main():
     finally:
         # Остановка Telegram бота
         telegram_manager.stop_polling()
+        telegram_manager.stop_delivery()
+        analytics_monitor.stop()
+        position_store.stop()
+        metrics_server.stop()
+        config_manager.stop_watching()
+        capture_executor.shutdown(wait=False, cancel_futures=True)
+        notification_store.close()
         logger.info("👋 Бот остановлен")
 
 def handle_start_command(message: Dict) -> None:
@@ -281,6 +753,9 @@ def handle_start_command(message: Dict) -> None:
     telegram_manager.send_message(
         "👋 Привет! Я бот для автоматизации торговли.\n\n"
         "Доступные команды:\n"
+        "/screenshot - Скриншоты потоков, изменившихся с прошлого раза\n"
+        "/status - Статус мониторинга и последние позиции\n"
+        "/profile [command|caller] [reset] - Время команд WebDriver\n"
         "/credentials - Управление учетными данными\n"
         "/help - Помощь",
         chat_id
@@ -296,24 +771,32 @@ def handle_help_command(message: Dict) -> None:
         "   /url list - Показать все URL\n"
         "   /url remove <номер> - Удалить URL\n"
         "   /url clear - Очистить все URL\n\n"
-        "2. После добавления URL бот автоматически откроет их\n"
-        "3. Все уведомления будут приходить в этот чат",
+        "2. Изменения списка URL применяются сразу, без перезапуска\n"
+        "3. Используйте /screenshot для скриншотов браузеров:\n"
+        "   /screenshot - Только изменившиеся с прошлого снимка\n"
+        "   /screenshot all - Все потоки\n"
+        "   /screenshot grid - Все потоки одним изображением\n"
+        "4. Все уведомления будут приходить в этот чат",
         chat_id
     )
 
 def handle_credentials_command(message: Dict) -> None:
-    """Обработчик команды /credentials"""
+    """Обработчик команды /credentials для управления аккаунтами"""
     chat_id = message["chat_id"]
     text = message["text"]
+    usage = (
+        "/credentials set <логин> <пароль>\n"
+        "/credentials list\n"
+        "/credentials remove <логин>\n"
+        "/credentials clear"
+    )
     
     try:
         # Парсинг команды
         parts = text.split(maxsplit=2)
         if len(parts) < 2:
             telegram_manager.send_message(
-                "❌ Неверный формат команды. Используйте:\n"
-                "/credentials set <логин> <пароль>\n"
-                "/credentials clear",
+                "❌ Неверный формат команды. Используйте:\n" + usage,
                 chat_id
             )
             return
@@ -340,20 +823,47 @@ def handle_credentials_command(message: Dict) -> None:
                 
             username, password = credentials
             
-            # Сохранение учетных данных
-            env_manager = EnvManager()
-            env_manager.set_credentials(username, password)
+            # Сохранение учетных данных в зашифрованное хранилище аккаунтов
+            account_id = account_manager.add_account(username, password)
             
             telegram_manager.send_message(
                 f"✅ Учетные данные успешно сохранены:\n"
-                f"Логин: {username}",
+                f"Логин: {username}\n"
+                f"Профиль: {account_id}",
                 chat_id
             )
             
+        elif action == "list":
+            accounts = account_manager.list_accounts()
+            if not accounts:
+                telegram_manager.send_message("📝 Список аккаунтов пуст", chat_id)
+                return
+                
+            authenticated = set(account_manager.authenticated_accounts())
+            message = "📝 Аккаунты:\n\n"
+            for i, account_id in enumerate(accounts, 1):
+                status = "✅" if account_id in authenticated else "⏸"
+                message += f"{i}. {status} {account_id}\n"
+            telegram_manager.send_message(message, chat_id)
+            
+        elif action == "remove":
+            if len(parts) != 3:
+                telegram_manager.send_message(
+                    "❌ Укажите логин аккаунта для удаления!\n"
+                    "Пример: /credentials remove user@example.com",
+                    chat_id
+                )
+                return
+                
+            account_id = account_manager.make_account_id(parts[2].strip())
+            if account_manager.remove_account(account_id):
+                telegram_manager.send_message(f"✅ Аккаунт удален: {account_id}", chat_id)
+            else:
+                telegram_manager.send_message(f"❌ Аккаунт не найден: {account_id}", chat_id)
+            
         elif action == "clear":
             # Очистка учетных данных
-            env_manager = EnvManager()
-            env_manager.clear_credentials()
+            account_manager.clear_accounts()
             
             telegram_manager.send_message(
                 "✅ Учетные данные успешно очищены",
@@ -362,9 +872,7 @@ def handle_credentials_command(message: Dict) -> None:
             
         else:
             telegram_manager.send_message(
-                "❌ Неизвестное действие. Используйте:\n"
-                "/credentials set <логин> <пароль>\n"
-                "/credentials clear",
+                "❌ Неизвестное действие. Используйте:\n" + usage,
                 chat_id
             )
             
@@ -406,13 +914,8 @@ def handle_url_command(message: Dict) -> None:
             
         action = parts[1].lower()
         
-        # Загружаем текущий список URL
-        try:
-            with open('urls.json', 'r') as f:
-                urls_data = json.load(f)
-                urls = urls_data.get('urls', [])
-        except FileNotFoundError:
-            urls = []
+        # Текущий список URL из реестра
+        urls = url_registry.list()
             
         if action == "add":
             if len(parts) != 3:
@@ -424,14 +927,13 @@ def handle_url_command(message: Dict) -> None:
                 return
                 
             new_url = parts[2]
-            if new_url in urls:
+            if not url_registry.add(new_url):
                 telegram_manager.send_message(
                     "⚠️ Этот URL уже есть в списке",
                     chat_id
                 )
                 return
                 
-            urls.append(new_url)
             telegram_manager.send_message(
                 f"✅ URL добавлен:\n{new_url}",
                 chat_id
@@ -461,8 +963,8 @@ def handle_url_command(message: Dict) -> None:
                 
             try:
                 index = int(parts[2]) - 1
-                if 0 <= index < len(urls):
-                    removed_url = urls.pop(index)
+                removed_url = url_registry.remove_index(index)
+                if removed_url is not None:
                     telegram_manager.send_message(
                         f"✅ URL удален:\n{removed_url}",
                         chat_id
@@ -480,7 +982,7 @@ def handle_url_command(message: Dict) -> None:
                 return
                 
         elif action == "clear":
-            urls = []
+            url_registry.clear()
             telegram_manager.send_message(
                 "✅ Список URL очищен",
                 chat_id
@@ -494,10 +996,6 @@ def handle_url_command(message: Dict) -> None:
             )
             return
             
-        # Сохраняем обновленный список URL
-        with open('urls.json', 'w') as f:
-            json.dump({"urls": urls}, f, indent=4)
-            
     except Exception as e:
         logger = Logger("main")
         logger.error("❌ Ошибка при обработке команды url", exc_info=e)
@@ -506,5 +1004,198 @@ def handle_url_command(message: Dict) -> None:
             chat_id
         )
 
+def capture_driver_screenshot(driver_id: int, only_if_changed: bool, deadline: float) -> Optional[bytes]:
+    """
+    Снимает скриншот драйвера под арендой планировщика
+
+    Пока идет съемка, проверки URL на этом драйвере ждут ее завершения,
+    а не переключают вкладки посреди снимка. Ожидание аренды и кодирования
+    ограничено общим сроком команды; съемку, которая все же не уложилась
+    в срок, прервать нельзя, но она продолжает держать аренду, поэтому
+    драйвер не используется одновременно двумя потоками.
+
+    Returns:
+        Optional[bytes]: Изображение, UNCHANGED или None в случае ошибки
+    """
+    with monitor_scheduler.driver_pool.lease(driver_id, max(0.0, deadline - time.monotonic())) as acquired:
+        if not acquired:
+            logger.warning(f"⚠️ Драйвер {driver_id} занят, скриншот не снят")
+            return None
+        driver = driver_manager.get_driver(driver_id)
+        if not driver:
+            logger.warning(f"⚠️ Драйвер не найден для потока {driver_id}")
+            return None
+        screenshot_manager = ScreenshotManager(driver)
+        return screenshot_manager.take_screenshot_bytes(
+            driver_id,
+            timeout=max(1.0, deadline - time.monotonic()),
+            only_if_changed=only_if_changed
+        )
+
+def send_screenshots(chat_id: str, args) -> None:
+    """Снимает скриншоты всех драйверов параллельно и отправляет их альбомами"""
+    driver_ids = list(driver_manager.get_active_drivers())
+    if not driver_ids:
+        telegram_manager.send_message("❌ Нет активных потоков мониторинга", chat_id)
+        return
+        
+    telegram_manager.send_message("📸 Создание скриншотов...", chat_id)
+    grid = "grid" in args
+    only_if_changed = "all" not in args and not grid
+    
+    # Общее время определяется самым медленным драйвером, а не суммой
+    deadline = time.monotonic() + CAPTURE_TIMEOUT
+    futures = {
+        capture_executor.submit(capture_driver_screenshot, driver_id, only_if_changed, deadline): driver_id
+        for driver_id in driver_ids
+    }
+    done, pending = wait(futures, timeout=CAPTURE_TIMEOUT)
+    
+    screenshots, unchanged, failed = [], [], []
+    for future, driver_id in futures.items():
+        data = None
+        if future in done:
+            if future.exception():
+                logger.error(f"❌ Ошибка при создании скриншота для потока {driver_id}", exc_info=future.exception())
+            else:
+                data = future.result()
+        if data:
+            screenshots.append((driver_id, data))
+        elif data == UNCHANGED:
+            unchanged.append(str(driver_id))
+        else:
+            failed.append(str(driver_id))
+            if future in pending:
+                logger.warning(f"⚠️ Таймаут создания скриншота для потока {driver_id}")
+                
+    if failed:
+        telegram_manager.send_message(f"❌ Не удалось создать скриншоты для потоков: {', '.join(failed)}", chat_id)
+    if unchanged:
+        telegram_manager.send_message(
+            f"ℹ️ Без изменений с прошлого снимка: {', '.join(unchanged)} (/screenshot all - снять все)",
+            chat_id
+        )
+    if not screenshots:
+        return
+        
+    if grid:
+        telegram_manager.send_photo(
+            compose_grid([data for _, data in screenshots]),
+            f"📊 Скриншоты потоков: {', '.join(str(driver_id) for driver_id, _ in screenshots)}",
+            chat_id
+        )
+        return
+        
+    telegram_manager.send_media_group(
+        [(data, f"📊 Скриншот потока {driver_id}") for driver_id, data in screenshots],
+        chat_id
+    )
+
+def handle_screenshot_command(message: Dict) -> None:
+    """
+    Обработчик команды /screenshot
+    
+    По умолчанию отправляются только потоки, страница которых заметно
+    изменилась с прошлого снимка; "all" снимает все потоки, "grid"
+    объединяет скриншоты в одно изображение. Съемка выполняется в
+    отдельном потоке, чтобы не задерживать получение обновлений Telegram.
+    """
+    chat_id = message["chat_id"]
+    args = [arg.lower() for arg in message.get("text", "").split()[1:]]
+    
+    def run():
+        try:
+            send_screenshots(chat_id, args)
+        except Exception as e:
+            logger.error("❌ Ошибка при обработке команды screenshot", exc_info=e)
+            telegram_manager.send_message("❌ Произошла ошибка при создании скриншотов", chat_id)
+            
+    threading.Thread(target=run, name="ScreenshotCommand", daemon=True).start()
+
+def handle_status_command(message: Dict) -> None:
+    """Обработчик команды /status: состояние драйверов (или воркеров) и последние позиции"""
+    chat_id = message["chat_id"]
+    
+    try:
+        now = time.time()
+        status_message = "📊 Статус мониторинга:\n\n"
+        
+        if coordinator:
+            for worker_id, worker in coordinator.status().items():
+                state = "Активен" if worker["ready"] else ("Запускается" if worker["running"] else "Остановлен")
+                status_message += f"Воркер {worker_id}: {state}, URL: {worker['urls']}, перезапусков: {worker['restarts']}\n"
+                if worker["last_heartbeat"]:
+                    status_message += f"Последний heartbeat: {now - worker['last_heartbeat']:.0f} с назад\n"
+            status_message += "\n"
+        else:
+            active_drivers = driver_manager.get_active_drivers()
+            if not active_drivers:
+                telegram_manager.send_message("❌ Нет активных потоков мониторинга", chat_id)
+                return
+                
+            for thread_id, driver_info in active_drivers.items():
+                last_active = driver_info['last_active']
+                status_message += f"Поток {thread_id}:\n"
+                status_message += f"Статус: {'Активен' if driver_info['alive'] else 'Неактивен'}\n"
+                status_message += (
+                    f"Последняя активность: {time.strftime('%H:%M:%S', time.localtime(last_active))} "
+                    f"({now - last_active:.0f} с назад)\n\n"
+                )
+                
+        # Последние позиции берутся из буфера в памяти без обращения к браузерам
+        positions = snapshot_buffer.latest_all()[:STATUS_POSITIONS]
+        if positions:
+            status_message += "💼 Последние позиции:\n"
+            for position in positions:
+                status_message += (
+                    f"{position['symbol']} ({position['trader'][:8]}): "
+                    f"цена {position['mark_price']:g}, PNL {position['pnl']:g} ({position['pnl_percent']:g}%)\n"
+                )
+                
+        telegram_manager.send_message(status_message, chat_id)
+        
+    except Exception as e:
+        logger.error("❌ Ошибка при обработке команды status", exc_info=e)
+        telegram_manager.send_message("❌ Произошла ошибка при получении статуса", chat_id)
+
+def handle_profile_command(message: Dict) -> None:
+    """
+    Обработчик команды /profile
+    
+    Без аргументов время команд WebDriver группируется по паре (команда,
+    вызывающая функция), "command" и "caller" группируют только по одному
+    признаку, "reset" сбрасывает статистику после вывода. В многопроцессном
+    режиме браузеры работают в воркерах, и сводки запрашиваются у них
+    через координатор в отдельном потоке, чтобы ожидание ответа не
+    задерживало получение обновлений Telegram.
+    """
+    chat_id = message["chat_id"]
+    args = [arg.lower() for arg in message.get("text", "").split()[1:]]
+    by = next((arg for arg in args if arg in ("command", "caller")), "both")
+    reset = "reset" in args
+    
+    def run():
+        try:
+            if coordinator:
+                summary = "\n\n".join(
+                    f"Воркер {worker_id}:\n{worker_summary or '⚠️ Нет ответа'}"
+                    for worker_id, worker_summary in coordinator.collect_profiles(by, reset).items()
+                )
+            else:
+                summary = driver_profiler.summary(by)
+                if reset:
+                    driver_profiler.reset()
+            if reset:
+                summary += "\n\n🔄 Статистика сброшена"
+                
+            # Ограничение Telegram на длину сообщения
+            telegram_manager.send_message(summary[:4000], chat_id)
+            
+        except Exception as e:
+            logger.error("❌ Ошибка при обработке команды profile", exc_info=e)
+            telegram_manager.send_message("❌ Произошла ошибка при получении статистики команд", chat_id)
+            
+    threading.Thread(target=run, name="ProfileCommand", daemon=True).start()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,390 @@
+import math
+import time
+import threading
+from array import array
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from latency_histogram import LatencyHistogram
+from logger import Logger
+
+# Значения меток -> значение метрики (для метрик, вычисляемых при запросе)
+Samples = Union[float, Dict[Tuple[str, ...], float]]
+
+# Квантили, которые выводятся для Summary
+QUANTILES = (0.5, 0.9, 0.99)
+
+def _escape(value: str) -> str:
+    """Экранирует значение метки по формату Prometheus"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class _Metric:
+    """Общая часть метрик: имя, описание, метки и дочерние значения по меткам"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Значение метрики для набора меток (создается при первом обращении)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class _Value:
+    """Число под собственной блокировкой: инкремент из разных потоков не теряется"""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+class Counter(_Metric):
+    """Монотонный счетчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        # Метрика без меток выводится сразу, а не после первого изменения
+        if not self.labelnames:
+            self.labels()
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Увеличивает счетчик без меток"""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in list(self._children.items())
+        ]
+
+class Gauge(Counter):
+    """Текущее значение (может уменьшаться)"""
+
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+class _SummaryChild:
+    """Гистограмма задержек одного набора меток"""
+
+    __slots__ = ("histogram", "_lock")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.histogram.record(seconds)
+
+    def snapshot(self) -> Tuple[Dict[float, float], float, int]:
+        with self._lock:
+            histogram = self.histogram
+            return histogram.percentiles(q * 100 for q in QUANTILES), histogram.total, histogram.count
+
+class Summary(_Metric):
+    """
+    Распределение задержек: квантили, сумма и количество
+
+    Значения копятся в LatencyHistogram (фиксированные логарифмические
+    корзины), поэтому запись - одно вычисление индекса, а квантили
+    считаются только при запросе /metrics. Квантили накопительные с
+    запуска процесса, а сумма и количество позволяют Prometheus считать
+    среднее за любое окно.
+    """
+
+    kind = "summary"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            self.labels()
+
+    def _new_child(self) -> _SummaryChild:
+        return _SummaryChild()
+
+    def observe(self, seconds: float) -> None:
+        self.labels().observe(seconds)
+
+    def time(self) -> "_Timer":
+        """Контекстный менеджер, замеряющий время блока"""
+        return _Timer(self.labels())
+
+    def render(self) -> List[str]:
+        lines = []
+        for values, child in list(self._children.items()):
+            quantiles, total, count = child.snapshot()
+            for quantile, value in zip(QUANTILES, quantiles.values()):
+                labels = _format_labels(self.labelnames, values, f'quantile="{quantile}"')
+                lines.append(f"{self.name}{labels} {_format_value(value)}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: _SummaryChild):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._child.observe(time.perf_counter() - self._started)
+
+class Rate(_Metric):
+    """
+    Событий в секунду за скользящее окно (выводится как gauge)
+
+    События считаются по секундным ячейкам кольцевого массива: запись -
+    инкремент ячейки текущей секунды, устаревшие ячейки обнуляются при
+    повторном использовании.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, window: int = 60):
+        super().__init__(name, help)
+        self.window = window
+        self._counts = array("q", [0]) * window
+        self._seconds = array("q", [-1]) * window
+        self._created = int(time.monotonic())
+
+    def mark(self, count: int = 1) -> None:
+        """Отмечает события в текущую секунду"""
+        second = int(time.monotonic())
+        index = second % self.window
+        with self._lock:
+            if self._seconds[index] != second:
+                self._seconds[index] = second
+                self._counts[index] = 0
+            self._counts[index] += count
+
+    def value(self) -> float:
+        """
+        Среднее число событий в секунду за окно (без текущей неполной секунды)
+
+        Сразу после запуска среднее берется только по прошедшим секундам
+        """
+        now = int(time.monotonic())
+        with self._lock:
+            total = sum(
+                count for second, count in zip(self._seconds, self._counts)
+                if now - self.window <= second < now
+            )
+        return total / max(1, min(self.window, now - self._created))
+
+    def render(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.value())}"]
+
+class Callback(_Metric):
+    """Метрика, значение которой вычисляется функцией при каждом запросе /metrics"""
+
+    def __init__(self, name: str, help: str, kind: str, func: Callable[[], Samples], labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.func = func
+
+    def render(self) -> List[str]:
+        samples = self.func()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+            for values, value in samples.items()
+        ]
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса в текстовом формате Prometheus
+
+    Метрики на горячих путях (счетчики, Summary, Rate) обновляются под
+    короткой блокировкой своего значения, без обращения к реестру.
+    Состояние, которое и так хранится в менеджерах (драйверы, очередь
+    Telegram, отброшенные снимки), не дублируется: оно читается функциями
+    обратного вызова только при запросе /metrics.
+    """
+
+    def __init__(self):
+        self.logger = Logger("metrics")
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, Callback):
+                # Повторный импорт модуля (например, через -m) получает ту же метрику
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def summary(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Summary:
+        return self._register(Summary(name, help, labelnames))
+
+    def rate(self, name: str, help: str, window: int = 60) -> Rate:
+        return self._register(Rate(name, help, window))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        func: Callable[[], Samples],
+        labelnames: Tuple[str, ...] = (),
+        kind: str = "gauge"
+    ) -> Callback:
+        """
+        Регистрирует метрику, вычисляемую при запросе (повторная регистрация заменяет функцию)
+
+        Args:
+            name: Имя метрики
+            help: Описание
+            func: Функция, возвращающая число или словарь (значения меток) -> число
+            labelnames: Имена меток
+            kind: Тип метрики для Prometheus (gauge или counter)
+        """
+        return self._register(Callback(name, help, kind, func, labelnames))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                self.logger.error(f"❌ Ошибка расчета метрики {metric.name}", exc_info=e)
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Отдает /metrics; остальные пути - 404"""
+
+    def __init__(self, *args, registry: MetricsRegistry, **kwargs):
+        self.registry = registry
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    """Встроенный HTTP-сервер метрик (отдельный поток, только чтение)"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        """
+        Args:
+            registry: Реестр метрик
+            host: Адрес прослушивания (по умолчанию только локальный)
+            port: Порт (0 - выключено)
+        """
+        self.logger = Logger("metrics_server")
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread = None
+
+    def start(self) -> bool:
+        """Запускает сервер; ошибка запуска не мешает работе бота"""
+        if not self.port or self._server:
+            return False
+        try:
+            self._server = ThreadingHTTPServer(
+                (self.host, self.port), partial(_MetricsHandler, registry=self.registry)
+            )
+        except OSError as e:
+            self.logger.error(f"❌ Не удалось запустить сервер метрик на {self.host}:{self.port}", exc_info=e)
+            return False
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer")
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.info(f"✅ Метрики доступны на http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self) -> None:
+        """Останавливает сервер"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+# Создаем глобальный экземпляр
+metrics = MetricsRegistry()
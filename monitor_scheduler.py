@@ -0,0 +1,324 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from logger import Logger
+from metrics import metrics
+
+SCRAPES = metrics.counter("cptrade_scrapes_total", "Проверки URL по результату (ok, failed, busy)", ("result",))
+SCRAPE_RATE = metrics.rate("cptrade_scrapes_per_second", "Завершенные проверки URL в секунду за последнюю минуту")
+SCRAPE_DURATION = metrics.summary("cptrade_scrape_duration_seconds", "Длительность проверки URL")
+SCRAPE_LATENESS = metrics.summary("cptrade_scrape_lateness_seconds", "Опоздание начала проверки относительно расписания")
+MISSED_DEADLINES = metrics.counter("cptrade_scrape_missed_deadlines_total", "Проверки, начатые позже допустимого")
+# Значения с метками создаются заранее, чтобы не искать их на каждой проверке
+_SCRAPES_OK, _SCRAPES_FAILED, _SCRAPES_BUSY = (SCRAPES.labels(result) for result in ("ok", "failed", "busy"))
+
+class DriverPool:
+    """Выдает драйверы в монопольное пользование (аренду) воркерам планировщика"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._leased: Set[int] = set()
+
+    @contextmanager
+    def lease(self, driver_id: int, timeout: float) -> Iterator[bool]:
+        """
+        Арендует драйвер на время блока with
+
+        Args:
+            driver_id: ID драйвера
+            timeout: Максимальное время ожидания освобождения драйвера
+
+        Yields:
+            bool: True если драйвер получен, False по таймауту
+        """
+        with self._condition:
+            acquired = self._condition.wait_for(lambda: driver_id not in self._leased, timeout)
+            if acquired:
+                self._leased.add(driver_id)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with self._condition:
+                    self._leased.discard(driver_id)
+                    self._condition.notify_all()
+
+class MonitorJob:
+    """Параметры и статистика периодической проверки одного URL"""
+
+    def __init__(self, job_id: int, url: str, interval: float, priority: int, jitter: float):
+        self.job_id = job_id
+        self.url = url
+        self.interval = interval
+        self.priority = priority
+        self.jitter = jitter
+        self.version = 0
+        self.running = False
+        self.scheduled_at = 0.0
+
+        self.runs = 0
+        self.failures = 0
+        # Проверки, отложенные из-за занятого драйвера (не считаются ошибками)
+        self.busy_skips = 0
+        self.missed_deadlines = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.last_run_at: Optional[float] = None
+        self.last_duration = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает статистику выполнения"""
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "busy_skips": self.busy_skips,
+            "missed_deadlines": self.missed_deadlines,
+            "avg_lateness": self.total_lateness / self.runs if self.runs else 0.0,
+            "max_lateness": self.max_lateness,
+            "last_run_at": self.last_run_at or 0.0,
+            "last_duration": self.last_duration
+        }
+
+class MonitorScheduler:
+    """
+    Планировщик периодических проверок URL
+
+    Время следующего запуска всех URL хранится в min-куче, поэтому один поток
+    диспетчера обслуживает сотни целей. Проверки выполняет ограниченный пул
+    воркеров, каждый из которых арендует драйвер на время проверки. При
+    равном времени раньше запускается URL с большим приоритетом; случайный
+    разброс (jitter) не дает всем проверкам совпасть по времени.
+    """
+
+    def __init__(
+        self,
+        task: Callable[[str, int, int], None],
+        driver_resolver: Callable[[str], int],
+        max_workers: int = 4,
+        default_interval: float = 30,
+        default_jitter: float = 0.1,
+        lease_timeout: float = 30,
+        deadline_tolerance: float = 0.5
+    ):
+        """
+        Args:
+            task: Функция проверки (URL, ID задачи, ID драйвера); неудача - исключение
+            driver_resolver: Функция, возвращающая ID драйвера для URL
+            max_workers: Количество одновременных проверок
+            default_interval: Интервал проверки по умолчанию в секундах
+            default_jitter: Доля интервала для случайного разброса
+            lease_timeout: Максимальное ожидание свободного драйвера
+            deadline_tolerance: Доля интервала, после которой запуск считается пропущенным
+        """
+        self.logger = Logger("monitor_scheduler")
+        self.task = task
+        self.driver_resolver = driver_resolver
+        self.max_workers = max_workers
+        self.default_interval = default_interval
+        self.default_jitter = default_jitter
+        self.lease_timeout = lease_timeout
+        self.deadline_tolerance = deadline_tolerance
+        self.driver_pool = DriverPool()
+
+        self._condition = threading.Condition()
+        # (время запуска, -приоритет, порядковый номер, URL, версия задачи)
+        self._heap: List[Tuple[float, int, int, str, int]] = []
+        self._jobs: Dict[str, MonitorJob] = {}
+        self._seq = 0
+        self._next_job_id = 1
+        self._slots = threading.Semaphore(max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher = None
+        self._stop = threading.Event()
+
+    def _push(self, job: MonitorJob, run_at: float) -> None:
+        """Помещает задачу в кучу (вызывается под блокировкой)"""
+        self._seq += 1
+        job.scheduled_at = run_at
+        heapq.heappush(self._heap, (run_at, -job.priority, self._seq, job.url, job.version))
+        self._condition.notify()
+
+    def _with_jitter(self, job: MonitorJob) -> float:
+        """Возвращает интервал задачи со случайным разбросом"""
+        spread = job.interval * job.jitter
+        return job.interval + random.uniform(-spread, spread)
+
+    def add(
+        self,
+        url: str,
+        interval: Optional[float] = None,
+        priority: int = 0,
+        jitter: Optional[float] = None
+    ) -> None:
+        """
+        Добавляет URL или обновляет его параметры
+
+        Args:
+            url: Отслеживаемый URL
+            interval: Интервал проверки в секундах
+            priority: Приоритет (больше - раньше при совпадении времени)
+            jitter: Доля интервала для случайного разброса
+        """
+        interval = interval or self.default_interval
+        jitter = self.default_jitter if jitter is None else jitter
+
+        with self._condition:
+            job = self._jobs.get(url)
+            if job is None:
+                job = MonitorJob(self._next_job_id, url, interval, priority, jitter)
+                self._next_job_id += 1
+                self._jobs[url] = job
+                # Первый запуск разносим в пределах разброса, чтобы не было залпа
+                self._push(job, time.monotonic() + random.uniform(0, interval * jitter))
+                return
+
+            if (job.interval, job.priority, job.jitter) == (interval, priority, jitter):
+                return
+            job.interval, job.priority, job.jitter = interval, priority, jitter
+            if not job.running:
+                # Старые записи в куче становятся недействительными по версии
+                job.version += 1
+                self._push(job, min(job.scheduled_at, time.monotonic() + interval))
+
+    def remove(self, url: str) -> None:
+        """Удаляет URL из расписания"""
+        with self._condition:
+            job = self._jobs.pop(url, None)
+            if job:
+                job.version += 1
+
+    def set_targets(self, targets: Dict[str, Dict[str, float]]) -> None:
+        """
+        Приводит расписание к набору URL
+
+        Args:
+            targets: URL -> параметры (interval, priority, jitter)
+        """
+        with self._condition:
+            current = set(self._jobs)
+        for url in current - set(targets):
+            self.remove(url)
+        for url, params in targets.items():
+            self.add(
+                url,
+                params.get("interval"),
+                int(params.get("priority", 0)),
+                params.get("jitter")
+            )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Возвращает статистику по всем URL"""
+        with self._condition:
+            return {url: job.stats() for url, job in self._jobs.items()}
+
+    def start(self) -> None:
+        """Запускает диспетчер и пул воркеров"""
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="MonitorWorker")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="MonitorDispatcher")
+        self._dispatcher.daemon = True
+        self._dispatcher.start()
+        self.logger.info(f"✅ Планировщик мониторинга запущен (воркеров: {self.max_workers})")
+
+    def stop(self) -> None:
+        """Останавливает диспетчер и дожидается текущих проверок"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._dispatcher:
+            self._dispatcher.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        self.logger.info("✅ Планировщик мониторинга остановлен")
+
+    def _dispatch_loop(self) -> None:
+        """Извлекает из кучи задачи, время которых наступило, и передает их воркерам"""
+        while not self._stop.is_set():
+            # Ждем свободного воркера, чтобы опоздание учитывалось честно
+            if not self._slots.acquire(timeout=1):
+                continue
+
+            job = None
+            with self._condition:
+                while not self._stop.is_set():
+                    if not self._heap:
+                        self._condition.wait(timeout=1)
+                        continue
+                    run_at, _, _, url, version = self._heap[0]
+                    delay = run_at - time.monotonic()
+                    if delay > 0:
+                        self._condition.wait(timeout=delay)
+                        continue
+                    heapq.heappop(self._heap)
+                    candidate = self._jobs.get(url)
+                    if candidate is None or candidate.version != version or candidate.running:
+                        continue
+                    candidate.running = True
+                    job = candidate
+                    break
+
+            if job is None:
+                self._slots.release()
+                continue
+
+            self._executor.submit(self._run_job, job)
+
+    def _run_job(self, job: MonitorJob) -> None:
+        """Выполняет проверку URL с арендой драйвера и учетом опозданий"""
+        started = time.monotonic()
+        lateness = started - job.scheduled_at
+        completed = False
+        busy = False
+
+        try:
+            driver_id = self.driver_resolver(job.url)
+            with self.driver_pool.lease(driver_id, self.lease_timeout) as acquired:
+                if not acquired:
+                    busy = True
+                    self.logger.warning(f"⚠️ Драйвер {driver_id} занят, проверка {job.url} отложена")
+                else:
+                    # Опоздание и длительность считаем с момента фактического начала работы
+                    started = time.monotonic()
+                    lateness = started - job.scheduled_at
+                    self.task(job.url, job.job_id, driver_id)
+                    completed = True
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка проверки {job.url}", exc_info=e)
+        finally:
+            finished = time.monotonic()
+            missed = lateness > job.interval * self.deadline_tolerance
+            if completed:
+                _SCRAPES_OK.inc()
+                SCRAPE_RATE.mark()
+                SCRAPE_DURATION.observe(finished - started)
+            else:
+                (_SCRAPES_BUSY if busy else _SCRAPES_FAILED).inc()
+            SCRAPE_LATENESS.observe(max(0.0, lateness))
+            if missed:
+                MISSED_DEADLINES.inc()
+
+            with self._condition:
+                job.runs += 1
+                if busy:
+                    job.busy_skips += 1
+                elif not completed:
+                    job.failures += 1
+                job.total_lateness += max(0.0, lateness)
+                job.max_lateness = max(job.max_lateness, lateness)
+                if missed:
+                    job.missed_deadlines += 1
+                job.last_run_at = time.time()
+                job.last_duration = finished - started
+                job.running = False
+
+                # Следующий запуск считаем от плановой точки, но без догоняющих залпов
+                if self._jobs.get(job.url) is job:
+                    job.version += 1
+                    self._push(job, max(job.scheduled_at + self._with_jitter(job), finished))
+            self._slots.release()
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from logger import Logger
+
+class NotificationStore:
+    """
+    Долговременная очередь исходящих уведомлений и хранилище контрольных точек.
+
+    Очередь хранится в SQLite в режиме WAL: записи только добавляются и помечаются
+    доставленными, поэтому после перезапуска процесса недоставленные уведомления
+    отправляются повторно (доставка "хотя бы один раз"). Повторная постановка
+    сообщения с тем же ключом идемпотентности игнорируется.
+    """
+
+    def __init__(
+        self,
+        db_path: str = os.path.join("state", "notifications.db"),
+        max_attempts: int = 10
+    ):
+        self.logger = Logger("notification_store")
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        """Настраивает WAL и создает таблицы при необходимости"""
+        with self._lock:
+            # В режиме WAL с synchronous=NORMAL коммит не вызывает fsync:
+            # журнал сбрасывается на диск пакетно при контрольных точках,
+            # при этом записи переживают падение процесса
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA wal_autocheckpoint=1000")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    kind TEXT NOT NULL,
+                    chat_id TEXT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    sent_at REAL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, next_attempt_at)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    name TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        chat_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> bool:
+        """
+        Добавляет уведомление в очередь
+
+        Args:
+            kind: Тип уведомления (например, "message")
+            payload: Данные уведомления
+            chat_id: ID чата получателя
+            idempotency_key: Ключ идемпотентности (если None, генерируется уникальный)
+
+        Returns:
+            bool: True если запись добавлена, False если такой ключ уже был в очереди
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox "
+                "(idempotency_key, kind, chat_id, payload, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, chat_id, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+            return cursor.rowcount > 0
+
+    def fetch_due(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Возвращает уведомления, готовые к отправке, в порядке постановки
+
+        Args:
+            limit: Максимальное количество записей
+
+        Returns:
+            List[Dict[str, Any]]: Список записей очереди
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, idempotency_key, kind, chat_id, payload, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+
+        return [
+            {
+                "id": row[0],
+                "idempotency_key": row[1],
+                "kind": row[2],
+                "chat_id": row[3],
+                "payload": json.loads(row[4]),
+                "attempts": row[5]
+            }
+            for row in rows
+        ]
+
+    def mark_sent(self, entry_id: int) -> None:
+        """Помечает уведомление доставленным"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ? WHERE id = ?",
+                (time.time(), entry_id)
+            )
+
+    def mark_failed(self, entry_id: int, retry_delay: float) -> None:
+        """
+        Фиксирует неудачную попытку доставки
+
+        Args:
+            entry_id: ID записи очереди
+            retry_delay: Задержка до следующей попытки в секундах
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE id = ?",
+                (time.time() + retry_delay, self.max_attempts, entry_id)
+            )
+
+    def pending_count(self) -> int:
+        """Возвращает количество недоставленных уведомлений"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def purge_sent(self, older_than: float = 86400) -> int:
+        """
+        Удаляет доставленные уведомления старше указанного возраста
+
+        Args:
+            older_than: Возраст записи в секундах
+
+        Returns:
+            int: Количество удаленных записей
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?",
+                (time.time() - older_than,)
+            )
+            return cursor.rowcount
+
+    def get_checkpoint(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Получает значение контрольной точки
+
+        Args:
+            name: Имя контрольной точки
+            default: Значение по умолчанию
+
+        Returns:
+            Optional[str]: Сохраненное значение
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM checkpoints WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_checkpoint(self, name: str, value: Any) -> None:
+        """Сохраняет значение контрольной точки"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO checkpoints (name, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (name, str(value), time.time())
+            )
+
+    def close(self) -> None:
+        """Сбрасывает WAL в основной файл и закрывает соединение"""
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
+
+# Создаем глобальный экземпляр хранилища
+notification_store = NotificationStore()
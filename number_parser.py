@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import calendar
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Optional
+
+# Символы, которые встречаются в ячейках вместо обычного минуса и пробела
+_MINUS_SIGNS = "\u2212\u2012\u2013\u2014"
+_SPACES = "\u00a0\u202f\u2009 '"
+
+# Число с любыми разделителями и необязательным множителем (K/M/B)
+_NUMBER_PATTERN = re.compile(r"([-+]?)\s*(\d[\d.,\u00a0\u202f\u2009 ']*)\s*([KkMmBb](?![a-zA-Z]))?")
+_LEVERAGE_PATTERN = re.compile(r"(\d+)\s*[xX×]|[xX×]\s*(\d+)")
+
+_MULTIPLIERS = {"k": Decimal(1000), "m": Decimal(1_000_000), "b": Decimal(1_000_000_000)}
+
+# Форматы времени в таблицах Binance
+TIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M"
+)
+
+# Форматы без года: к тексту перед разбором добавляется год (см. parse_timestamp),
+# иначе strptime подставит 1900 и не примет 29 февраля
+SHORT_TIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M"
+)
+
+# Локаль по умолчанию: "en" (1,234.56), "eu" (1.234,56) или "auto"
+DEFAULT_LOCALE = os.getenv("NUMBER_LOCALE", "auto")
+
+def _normalize(digits: str, locale: str) -> str:
+    """Приводит запись числа к виду с точкой-разделителем дробной части"""
+    for space in _SPACES:
+        digits = digits.replace(space, "")
+    digits = digits.rstrip(".,")
+
+    if locale == "en":
+        return digits.replace(",", "")
+    if locale == "eu":
+        return digits.replace(".", "").replace(",", ".")
+
+    # auto: при наличии обоих разделителей дробная часть идет после последнего
+    comma, dot = digits.rfind(","), digits.rfind(".")
+    if comma >= 0 and dot >= 0:
+        if comma > dot:
+            return digits.replace(".", "").replace(",", ".")
+        return digits.replace(",", "")
+    if comma >= 0:
+        # Одна запятая и ровно три цифры после нее - разделитель тысяч ("1,234")
+        if digits.count(",") == 1 and len(digits) - comma - 1 != 3:
+            return digits.replace(",", ".")
+        return digits.replace(",", "")
+    if digits.count(".") > 1:
+        # Несколько точек - разделители тысяч ("1.234.567")
+        return digits.replace(".", "")
+    return digits
+
+@lru_cache(maxsize=65536)
+def parse_decimal(text: Optional[str], locale: str = DEFAULT_LOCALE) -> Optional[Decimal]:
+    """
+    Разбирает число из текста ячейки
+
+    Понимает знак (в том числе типографский минус), разделители тысяч
+    (запятая, точка, пробелы), дробную часть через точку или запятую,
+    множители K/M/B и единицы измерения после числа ("1,234.56 USDT").
+    Результат кешируется: одинаковые строки на каждом обновлении страницы
+    разбираются один раз.
+
+    Args:
+        text: Текст ячейки
+        locale: "en", "eu" или "auto"
+
+    Returns:
+        Optional[Decimal]: Число или None, если числа в тексте нет
+    """
+    if not text:
+        return None
+    for minus in _MINUS_SIGNS:
+        text = text.replace(minus, "-")
+
+    match = _NUMBER_PATTERN.search(text)
+    if not match:
+        return None
+    sign, digits, suffix = match.groups()
+    try:
+        value = Decimal(_normalize(digits, locale))
+    except InvalidOperation:
+        return None
+    if suffix:
+        value *= _MULTIPLIERS[suffix.lower()]
+    return -value if sign == "-" else value
+
+def parse_float(text: Optional[str], locale: str = DEFAULT_LOCALE) -> Optional[float]:
+    """Разбирает число из текста ячейки как float"""
+    value = parse_decimal(text, locale)
+    return None if value is None else float(value)
+
+def parse_percent(text: Optional[str], locale: str = DEFAULT_LOCALE) -> Optional[float]:
+    """Разбирает процент ("+12.34%") и возвращает его в процентах (12.34)"""
+    return parse_float(text, locale)
+
+@lru_cache(maxsize=4096)
+def parse_leverage(text: Optional[str]) -> Optional[int]:
+    """Разбирает плечо ("20x", "Cross 20X", "x20", "20")"""
+    if not text:
+        return None
+    match = _LEVERAGE_PATTERN.search(text)
+    if match:
+        return int(match.group(1) or match.group(2))
+    value = parse_decimal(text, "en")
+    return None if value is None else int(value)
+
+@lru_cache(maxsize=16384)
+def _parse_time(text: str, year: int) -> Optional[float]:
+    """Разбирает абсолютное время (UTC) в timestamp"""
+    candidates = [(text, time_format) for time_format in TIME_FORMATS]
+    candidates += [(f"{year}-{text}", time_format) for time_format in SHORT_TIME_FORMATS]
+    for value, time_format in candidates:
+        try:
+            parsed = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return float(calendar.timegm(parsed.timetuple()))
+    return None
+
+def parse_timestamp(text: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Разбирает время из ячейки таблицы в timestamp (время в ячейках - UTC)
+
+    Args:
+        text: Текст ячейки ("2024-03-15 12:34:56", "03-15 12:34" и т.п.)
+        now: Текущее время; используется для записей без года
+
+    Returns:
+        Optional[float]: Timestamp или None, если формат не распознан
+    """
+    if not text:
+        return None
+    now = time.time() if now is None else now
+    text = text.strip()
+    year = time.gmtime(now).tm_year
+    timestamp = _parse_time(text, year)
+    if timestamp is not None and timestamp <= now + 86400:
+        return timestamp
+    # Запись без года из будущего относится к прошлому году, а 29 февраля,
+    # которого нет в текущем или прошлом году, - к последнему високосному
+    leap_year = year - 2
+    while not calendar.isleap(leap_year):
+        leap_year -= 1
+    for past_year in (year - 1, leap_year):
+        past = _parse_time(text, past_year)
+        if past is not None:
+            return past
+    return timestamp
+
+def cache_info() -> dict:
+    """Возвращает статистику кешей разбора"""
+    return {
+        "decimal": parse_decimal.cache_info()._asdict(),
+        "leverage": parse_leverage.cache_info()._asdict(),
+        "time": _parse_time.cache_info()._asdict()
+    }
@@ -3,15 +3,40 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from logger import Logger
+from number_parser import parse_decimal, parse_timestamp
 
 class OrderManager:
-    def __init__(self, driver):
+    def __init__(self, driver, on_update: Optional[Callable[[Dict[str, str], Optional[str]], None]] = None):
+        """
+        Args:
+            driver: WebDriver
+            on_update: Обработчик изменения ордера (ордер, предыдущий статус или None для нового)
+        """
         self.driver = driver
         self.logger = Logger("order_manager")
         self.wait = WebDriverWait(driver, 6)
         self.previous_orders: Dict[str, str] = {}  # order_id -> status
+        self.on_update = on_update
+        
+    @staticmethod
+    def order_values(order: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Преобразует текст числовых полей ордера в числа
+        
+        Args:
+            order: Ордер из get_orders или get_order_details
+            
+        Returns:
+            Словарь price/amount/filled (Decimal) и time (timestamp), None для отсутствующих полей
+        """
+        return {
+            "price": parse_decimal(order.get("price")),
+            "amount": parse_decimal(order.get("amount")),
+            "filled": parse_decimal(order.get("filled")),
+            "time": parse_timestamp(order.get("time"))
+        }
         
     def get_orders(self) -> List[Dict[str, str]]:
         """
@@ -72,11 +97,18 @@ class OrderManager:
             order_id = order["id"]
             current_status = order["status"]
             
+            previous_status = self.previous_orders.get(order_id)
+            
             # Если ордер новый или статус изменился
             if (order_id not in self.previous_orders or 
-                self.previous_orders[order_id] != current_status):
+                previous_status != current_status):
                 updated_orders.append(order)
                 self.previous_orders[order_id] = current_status
+                if self.on_update:
+                    try:
+                        self.on_update(order, previous_status)
+                    except Exception as e:
+                        self.logger.error("Ошибка в обработчике изменения ордера", exc_info=e)
                 
         return updated_orders
         
@@ -12,6 +12,7 @@ from selenium.common.exceptions import (
 )
 from logger import Logger
 from retry_manager import retry_manager
+from config_manager import config_manager
 
 class PageManager:
     """Менеджер для управления страницей и ожидания элементов"""
@@ -19,7 +20,7 @@ class PageManager:
     def __init__(self, driver: WebDriver):
         self.driver = driver
         self.logger = Logger("page_manager")
-        self.wait = WebDriverWait(driver, 10)
+        self.wait = WebDriverWait(driver, config_manager.settings.timeout)
         
     @retry_manager.retry_on_exception(
         exceptions=(TimeoutException, NoSuchElementException, StaleElementReferenceException),
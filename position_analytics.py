@@ -0,0 +1,230 @@
+import time
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+from logger import Logger
+from rule_engine import RuleEngine
+from snapshot_buffer import SnapshotBuffer
+
+# Метрики, которые рассчитывает PositionAnalytics (поля правил metrics)
+METRICS = (
+    "pnl", "pnl_percent", "leverage", "mark_price", "age",
+    "pnl_drift", "pnl_percent_drift", "drawdown", "drawdown_percent",
+    "mark_velocity", "mark_speed", "exposure"
+)
+
+class PositionMetrics:
+    """Метрики всех отслеживаемых позиций на один момент: массивы по рядам буфера"""
+
+    def __init__(
+        self,
+        series: np.ndarray,
+        values: Dict[str, np.ndarray],
+        buffer: SnapshotBuffer,
+        generations: Optional[np.ndarray] = None
+    ):
+        self.series = series
+        self.values = values
+        # Поколения рядов на момент расчета (см. SnapshotBuffer.generations)
+        self.generations = np.zeros(len(series), dtype=np.int64) if generations is None else generations
+        self.max_series = buffer.max_series
+        self._buffer = buffer
+
+    def __getitem__(self, metric: str) -> np.ndarray:
+        return self.values[metric]
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def label(self, position: int) -> Tuple[str, str]:
+        """Возвращает (трейдер, символ) для позиции в массивах метрик"""
+        series = int(self.series[position])
+        return (
+            self._buffer.traders.name(self._buffer.series_trader[series]),
+            self._buffer.symbols.name(self._buffer.series_symbol[series])
+        )
+
+    def trader_exposure(self) -> Dict[str, float]:
+        """Суммарная экспозиция (маржа x плечо) по трейдерам"""
+        traders = np.frombuffer(self._buffer.series_trader, dtype=f"i{self._buffer.series_trader.itemsize}")[self.series]
+        totals = np.bincount(traders, weights=np.nan_to_num(self.values["exposure"]))
+        return {
+            self._buffer.traders.name(trader): float(total)
+            for trader, total in enumerate(totals)
+            if total
+        }
+
+class PositionAnalytics:
+    """
+    Векторные расчеты по истории позиций из SnapshotBuffer
+
+    Столбцы буфера представляются матрицами NumPy (ряд x позиция в кольце)
+    без копирования, и все метрики считаются одним проходом по всем рядам:
+    изменение PNL за окно, просадка от пика, скорость изменения цены и
+    экспозиция с учетом плеча. Стоимость расчета определяется размером
+    матрицы, а не циклами Python по позициям.
+    """
+
+    def __init__(self, buffer: SnapshotBuffer):
+        self.buffer = buffer
+        shape = (buffer.max_series, buffer.capacity)
+        self._matrices = {
+            name: np.frombuffer(column, dtype=np.float64).reshape(shape)
+            for name, column in buffer.columns.items()
+        }
+        self._heads = np.frombuffer(buffer.heads, dtype=f"i{buffer.heads.itemsize}")
+        self._sizes = np.frombuffer(buffer.sizes, dtype=f"i{buffer.sizes.itemsize}")
+        self._generations = np.frombuffer(buffer.generations, dtype=f"i{buffer.generations.itemsize}")
+
+    def _gather(self, depth: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Копирует последние depth снимков занятых рядов (от новых к старым)
+
+        Копируется только нужная часть кольца, а не матрица целиком,
+        поэтому стоимость зависит от окна, а не от емкости буфера.
+        """
+        with self.buffer._lock:
+            series = np.nonzero(self._sizes)[0]
+            slots = (self._heads[series, None] - 1 - np.arange(depth)) % self.buffer.capacity
+            rows = series[:, None]
+            return series, self._generations[series], {name: matrix[rows, slots] for name, matrix in self._matrices.items()}
+
+    def compute(self, window: float = 300, now: Optional[float] = None) -> PositionMetrics:
+        """
+        Рассчитывает метрики всех рядов за окно
+
+        Args:
+            window: Длина окна в секундах
+            now: Момент расчета (по умолчанию текущее время)
+
+        Returns:
+            PositionMetrics: Метрики по рядам, в которых есть снимки
+        """
+        now = time.time() if now is None else now
+
+        capacity = self.buffer.capacity
+        depth = min(32, capacity)
+        while True:
+            series, generations, data = self._gather(depth)
+            ts = data["ts"]
+            # Снимки в срезе идут от новых к старым; если самый старый еще
+            # внутри окна, а в кольце есть более ранние - берем срез глубже
+            with np.errstate(invalid="ignore"):
+                truncated = (ts[:, -1] >= now - window) & (self._sizes[series] > depth)
+            if depth >= capacity or not truncated.any():
+                break
+            depth = min(depth * 2, capacity)
+
+        latest = {name: values[:, 0] for name, values in data.items()}
+
+        with np.errstate(invalid="ignore"):
+            in_window = (ts >= now - window) & (ts <= now)
+        has_window = in_window.any(axis=1)
+
+        # Самый ранний снимок окна - последний по порядку в срезе
+        rows = np.arange(len(series))
+        first_slot = np.where(in_window, np.arange(depth), -1).max(axis=1).clip(min=0)
+        first = {name: values[rows, first_slot] for name, values in data.items()}
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            elapsed = latest["ts"] - first["ts"]
+            pnl_drift = latest["pnl"] - first["pnl"]
+            pnl_percent_drift = latest["pnl_percent"] - first["pnl_percent"]
+
+            pnl_peak = np.where(in_window, data["pnl"], -np.inf)
+            pnl_percent_peak = np.where(in_window, data["pnl_percent"], -np.inf)
+            drawdown = np.fmax(np.nanmax(pnl_peak, axis=1) - latest["pnl"], 0)
+            drawdown_percent = np.fmax(np.nanmax(pnl_percent_peak, axis=1) - latest["pnl_percent"], 0)
+
+            # Скорость цены в процентах в минуту
+            mark_velocity = np.where(
+                elapsed > 0,
+                (latest["mark_price"] - first["mark_price"]) / first["mark_price"] * 100 / elapsed * 60,
+                0.0
+            )
+
+            # PNL% считается от маржи: маржа = PNL / PNL%, экспозиция = маржа x плечо
+            exposure = np.abs(latest["pnl"] / (latest["pnl_percent"] / 100)) * latest["leverage"]
+            exposure = np.where(np.isfinite(exposure), exposure, np.nan)
+
+        stale = ~has_window
+        values = {
+            "pnl": latest["pnl"],
+            "pnl_percent": latest["pnl_percent"],
+            "leverage": latest["leverage"],
+            "mark_price": latest["mark_price"],
+            "age": now - latest["ts"],
+            "pnl_drift": np.where(stale, np.nan, pnl_drift),
+            "pnl_percent_drift": np.where(stale, np.nan, pnl_percent_drift),
+            "drawdown": np.where(stale, np.nan, drawdown),
+            "drawdown_percent": np.where(stale, np.nan, drawdown_percent),
+            "mark_velocity": np.where(stale, np.nan, mark_velocity),
+            "mark_speed": np.where(stale, np.nan, np.abs(mark_velocity)),
+            "exposure": exposure
+        }
+        return PositionMetrics(series, values, self.buffer, generations)
+
+class AnalyticsMonitor:
+    """
+    Периодически рассчитывает метрики и проверяет правила metrics одним проходом
+
+    Правила проверяются масками по всем рядам сразу (RuleEngine.evaluate_metrics),
+    состояние срабатываний, cooldown и гистерезис хранит RuleEngine.
+    """
+
+    def __init__(
+        self,
+        analytics: PositionAnalytics,
+        engine: RuleEngine,
+        window: float = 300,
+        interval: float = 10
+    ):
+        """
+        Args:
+            analytics: Расчет метрик
+            engine: Правила оповещений
+            window: Окно расчета в секундах
+            interval: Период расчета в секундах
+        """
+        self.logger = Logger("position_analytics")
+        self.analytics = analytics
+        self.engine = engine
+        self.window = window
+        self.interval = interval
+        self.last_duration = 0.0
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def tick(self, now: Optional[float] = None) -> PositionMetrics:
+        """Рассчитывает метрики и проверяет правила"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        metrics = self.analytics.compute(self.window, now)
+        self.engine.evaluate_metrics(metrics, now)
+        self.last_duration = time.perf_counter() - started
+        return metrics
+
+    def start(self) -> None:
+        """Запускает периодический расчет"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="AnalyticsMonitor")
+        self._thread.daemon = True
+        self._thread.start()
+        self.logger.info("✅ Запущен расчет метрик позиций")
+
+    def stop(self) -> None:
+        """Останавливает периодический расчет"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        """Цикл расчета"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                self.logger.error("❌ Ошибка расчета метрик позиций", exc_info=e)
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+from logger import Logger
+from notification_store import NotificationStore, notification_store
+from position_reader import position_values
+
+# Типы событий позиции
+OPENED = "opened"
+CLOSED = "closed"
+SIZE_CHANGED = "size_changed"
+LEVERAGE_CHANGED = "leverage_changed"
+LIQUIDATION_RISK = "liquidation_risk"
+
+EVENT_TITLES = {
+    OPENED: "🟢 Открыта позиция",
+    CLOSED: "🔴 Закрыта позиция",
+    SIZE_CHANGED: "📐 Изменен размер позиции",
+    LEVERAGE_CHANGED: "⚙️ Изменено плечо",
+    LIQUIDATION_RISK: "🚨 Риск ликвидации"
+}
+
+# Поля позиции, которые сохраняются между перезапусками
+_STATE_FIELDS = ("symbol", "leverage", "entry_price", "time")
+
+class PositionEvent:
+    """Событие жизненного цикла позиции"""
+
+    __slots__ = ("type", "trader", "key", "position", "previous", "ts", "idempotency_key")
+
+    def __init__(
+        self,
+        type: str,
+        trader: str,
+        key: str,
+        position: Dict[str, Any],
+        previous: Optional[Dict[str, Any]],
+        ts: float,
+        idempotency_key: str
+    ):
+        self.type = type
+        self.trader = trader
+        self.key = key
+        self.position = position
+        self.previous = previous
+        self.ts = ts
+        self.idempotency_key = idempotency_key
+
+def estimate_size(values: Dict[str, Optional[float]]) -> Optional[float]:
+    """
+    Оценивает размер позиции (количество контрактов) по числам строки
+
+    PNL% считается от маржи, поэтому маржа = PNL / PNL%, а размер =
+    маржа x плечо / цена входа. При PNL% около нуля оценка неточна и
+    не рассчитывается.
+    """
+    pnl, percent = values.get("pnl"), values.get("pnl_percent")
+    leverage, entry = values.get("leverage"), values.get("entry_price")
+    if None in (pnl, percent, leverage, entry) or abs(percent) < 1 or not entry:
+        return None
+    return abs(pnl / (percent / 100)) * leverage / entry
+
+class PositionDiffer:
+    """
+    Сравнение последовательных снимков всей таблицы позиций трейдера
+
+    Строки сопоставляются по data-row-key, и вместо полной таблицы на каждой
+    проверке выдаются только события: открытие, закрытие, изменение размера,
+    изменение плеча и вход в зону риска ликвидации. Для сравнения хранится
+    только устойчивая часть строки (символ, плечо, цена входа, время открытия,
+    размер на момент последнего события), поэтому контрольная точка в
+    NotificationStore перезаписывается лишь при изменениях, а после
+    перезапуска уже известные позиции не считаются открытыми заново.
+    """
+
+    def __init__(
+        self,
+        store: NotificationStore = notification_store,
+        liquidation_percent: float = 80.0,
+        size_tolerance: float = 0.1,
+        close_confirmations: int = 2
+    ):
+        """
+        Args:
+            store: Хранилище контрольных точек
+            liquidation_percent: Убыток в % от маржи, с которого позиция считается под риском
+            size_tolerance: Относительное изменение оценки размера, которое считается изменением
+            close_confirmations: Сколько проверок подряд строка должна отсутствовать, чтобы считаться закрытой
+        """
+        self.logger = Logger("position_differ")
+        self.store = store
+        self.liquidation_percent = liquidation_percent
+        self.size_tolerance = size_tolerance
+        self.close_confirmations = close_confirmations
+
+        self._lock = threading.Lock()
+        # Трейдер -> data-row-key -> сохраняемое состояние строки
+        self._states: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Трейдер -> data-row-key -> последний текст строки (только в памяти)
+        self._last: Dict[str, Dict[str, Dict[str, str]]] = {}
+
+    def _load(self, trader: str) -> Dict[str, Dict[str, Any]]:
+        """Возвращает состояние трейдера, при первом обращении - из контрольной точки"""
+        states = self._states.get(trader)
+        if states is None:
+            raw = self.store.get_checkpoint(f"positions:{trader}")
+            try:
+                states = json.loads(raw) if raw else {}
+            except json.JSONDecodeError:
+                self.logger.warning(f"⚠️ Повреждена контрольная точка позиций {trader}")
+                states = {}
+            self._states[trader] = states
+        return states
+
+    @staticmethod
+    def _key(trader: str, key: str, event_type: str, *parts: Any) -> str:
+        """Ключ идемпотентности события по его содержимому"""
+        digest = hashlib.sha1(json.dumps([trader, key, *parts], ensure_ascii=False).encode()).hexdigest()
+        return f"position_event:{event_type}:{digest}"
+
+    def diff(self, trader: str, rows: Dict[str, Dict[str, str]], ts: Optional[float] = None) -> List[PositionEvent]:
+        """
+        Сравнивает снимок таблицы с предыдущим и возвращает события
+
+        Args:
+            trader: ID трейдера
+            rows: data-row-key -> текст ячеек (position_reader.read_positions)
+            ts: Время снимка
+
+        Returns:
+            List[PositionEvent]: События в порядке обнаружения
+        """
+        ts = ts or time.time()
+        events: List[PositionEvent] = []
+        with self._lock:
+            states = self._load(trader)
+            last = self._last.setdefault(trader, {})
+            before = json.dumps(states, sort_keys=True)
+
+            for key, position in rows.items():
+                values = position_values(position)
+                state = states.get(key)
+
+                if state is None:
+                    state = states[key] = {name: position.get(name) for name in _STATE_FIELDS}
+                    state.update(size=estimate_size(values), risk=False, risk_episode=0, missing=0)
+                    events.append(PositionEvent(
+                        OPENED, trader, key, position, None, ts,
+                        self._key(trader, key, OPENED, position.get("symbol"), position.get("time"))
+                    ))
+                else:
+                    state["missing"] = 0
+                    previous = {**last.get(key, {}), **{name: state.get(name) for name in _STATE_FIELDS}}
+
+                    size = estimate_size(values)
+                    releveraged = position.get("leverage") != state["leverage"]
+                    if releveraged:
+                        events.append(PositionEvent(
+                            LEVERAGE_CHANGED, trader, key, position, previous, ts,
+                            self._key(trader, key, LEVERAGE_CHANGED, state["time"], state["leverage"], position.get("leverage"))
+                        ))
+                        state["leverage"] = position.get("leverage")
+
+                    # Оценка размера зависит от плеча, поэтому при смене плеча
+                    # изменение размера определяется только по цене входа
+                    resized = position.get("entry_price") != state["entry_price"] or (
+                        not releveraged and size is not None and state["size"] is not None
+                        and abs(size - state["size"]) > self.size_tolerance * state["size"]
+                    )
+                    if resized:
+                        events.append(PositionEvent(
+                            SIZE_CHANGED, trader, key, {**position, "size": size}, {**previous, "size": state["size"]}, ts,
+                            self._key(trader, key, SIZE_CHANGED, state["time"], position.get("entry_price"), size and round(size, 6))
+                        ))
+                        state["entry_price"] = position.get("entry_price")
+                        state["size"] = size
+                    elif releveraged or state["size"] is None:
+                        state["size"] = size
+
+                # Риск ликвидации отмечается при входе в зону и снимается при выходе из нее
+                percent = values.get("pnl_percent")
+                at_risk = percent is not None and percent <= -self.liquidation_percent
+                if at_risk and not state["risk"]:
+                    state["risk_episode"] += 1
+                    events.append(PositionEvent(
+                        LIQUIDATION_RISK, trader, key, position, None, ts,
+                        self._key(trader, key, LIQUIDATION_RISK, state["time"], state["risk_episode"])
+                    ))
+                state["risk"] = at_risk
+                last[key] = position
+
+            # Строка считается закрытой, только если ее нет несколько проверок подряд:
+            # таблица может кратковременно отрисоваться не полностью
+            for key in [key for key in states if key not in rows]:
+                state = states[key]
+                state["missing"] += 1
+                if state["missing"] < self.close_confirmations:
+                    continue
+                previous = {**last.pop(key, {}), **{name: state.get(name) for name in _STATE_FIELDS}}
+                events.append(PositionEvent(
+                    CLOSED, trader, key, previous, previous, ts,
+                    self._key(trader, key, CLOSED, state["symbol"], state["time"])
+                ))
+                del states[key]
+
+            if json.dumps(states, sort_keys=True) != before:
+                self.store.set_checkpoint(f"positions:{trader}", json.dumps(states, ensure_ascii=False))
+
+        return events
+
+def format_position_event(event: PositionEvent) -> str:
+    """Формирует текст сообщения Telegram о событии позиции"""
+    position = event.position
+    lines = [
+        f"{EVENT_TITLES[event.type]}: {position.get('symbol')}",
+        f"Трейдер: {event.trader}"
+    ]
+    if event.type == LEVERAGE_CHANGED:
+        lines.append(f"Плечо: {event.previous.get('leverage')}x → {position.get('leverage')}x")
+    elif event.type == SIZE_CHANGED:
+        old_size, new_size = event.previous.get("size"), position.get("size")
+        lines.append(f"Цена входа: {event.previous.get('entry_price')} → {position.get('entry_price')}")
+        if old_size is not None and new_size is not None:
+            lines.append(f"Размер: {old_size:.6g} → {new_size:.6g}")
+    else:
+        lines.append(f"Плечо: {position.get('leverage')}x")
+        lines.append(f"Цена входа: {position.get('entry_price')}")
+    if event.type != CLOSED or "pnl" in position:
+        lines.append(f"PNL: {position.get('pnl', 'N/A')} ({position.get('pnl_percent', 'N/A')})")
+    return "\n".join(lines)
+
+# Создаем глобальный экземпляр
+position_differ = PositionDiffer(
+    liquidation_percent=float(os.getenv("LIQUIDATION_RISK_PERCENT", "80"))
+)
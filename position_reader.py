@@ -0,0 +1,72 @@
+from typing import Dict, Optional
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from number_parser import parse_float, parse_leverage
+
+# Селектор строки таблицы позиций
+ROW_SELECTOR = "tr[data-row-key]"
+
+# Явные признаки пустой таблицы: пустое tbody само по себе ничего не значит,
+# пока строки еще догружаются, и без этого читалось бы как "все позиции закрыты"
+EMPTY_SELECTORS = (".ant-table-placeholder", ".ant-empty")
+
+# Считывает все строки таблицы одним запросом к браузеру вместо
+# нескольких find_element на каждую ячейку каждой строки
+_READ_ROWS_SCRIPT = """
+const text = (row, selector) => {
+    const element = row.querySelector(selector);
+    return element ? element.innerText.trim() : "N/A";
+};
+return Array.from(document.querySelectorAll(arguments[0])).map(row => {
+    const numbers = row.querySelectorAll("td[aria-colindex='6'] .Number");
+    return {
+        key: row.getAttribute("data-row-key"),
+        symbol: text(row, ".name"),
+        leverage: text(row, "td[aria-colindex='2']"),
+        entry_price: text(row, "td[aria-colindex='3']"),
+        mark_price: text(row, "td[aria-colindex='4']"),
+        time: text(row, "td[aria-colindex='5']"),
+        pnl: numbers.length > 0 ? numbers[0].innerText.trim() : "N/A",
+        pnl_percent: numbers.length > 1 ? numbers[1].innerText.trim() : "N/A"
+    };
+});
+"""
+
+# Числовые поля позиции
+NUMERIC_FIELDS = ("leverage", "entry_price", "mark_price", "pnl", "pnl_percent")
+
+def position_values(position: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """Преобразует текст числовых ячеек позиции в числа"""
+    leverage = parse_leverage(position.get("leverage"))
+    values = {name: parse_float(position.get(name)) for name in NUMERIC_FIELDS[1:]}
+    values["leverage"] = None if leverage is None else float(leverage)
+    return values
+
+def read_positions(driver: WebDriver, timeout: int = 30) -> Dict[str, Dict[str, str]]:
+    """
+    Считывает все строки таблицы позиций
+
+    Args:
+        driver: WebDriver с открытой страницей трейдера
+        timeout: Максимальное время ожидания строк или признака пустой таблицы
+
+    Returns:
+        Dict[str, Dict[str, str]]: data-row-key -> текст ячеек позиции (пусто, если позиций нет)
+
+    Raises:
+        TimeoutException: Не появились ни строки, ни признак пустой таблицы
+    """
+    WebDriverWait(driver, timeout).until(
+        lambda driver: driver.find_elements(By.CSS_SELECTOR, ROW_SELECTOR) or any(
+            driver.find_elements(By.CSS_SELECTOR, selector) for selector in EMPTY_SELECTORS
+        )
+    )
+
+    rows = driver.execute_script(_READ_ROWS_SCRIPT, ROW_SELECTOR) or []
+    positions = {}
+    for row in rows:
+        key = row.pop("key", None)
+        if key:
+            positions[key] = row
+    return positions
@@ -0,0 +1,277 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from logger import Logger
+from position_reader import position_values
+
+# Строка таблицы: (ts, trader, symbol, leverage, entry_price, mark_price, pnl, pnl_percent)
+Row = Tuple[float, str, str, Optional[float], Optional[float], Optional[float], Optional[float], Optional[float]]
+
+def trader_id(url: str) -> str:
+    """Возвращает идентификатор трейдера (encryptedUid из URL или сам URL)"""
+    uid = parse_qs(urlparse(url).query).get("encryptedUid")
+    return uid[0] if uid else url
+
+class PositionStore:
+    """
+    Хранилище истории позиций (временной ряд) в SQLite
+
+    record() только кладет снимок в очередь в памяти и не блокирует проверку
+    страницы. Фоновый поток забирает снимки пачками и записывает их одним
+    executemany в одной транзакции. Режим WAL с synchronous=NORMAL и индекс
+    (trader, symbol, ts) позволяют писать миллионы строк в сутки и при этом
+    быстро отвечать на запросы по диапазону времени. Снимки старше retention
+    удаляет тот же поток записи по расписанию, небольшими порциями между
+    пачками вставки, поэтому очистка не конкурирует с записью за соединение.
+    """
+
+    def __init__(
+        self,
+        db_path: str = os.path.join("state", "positions.db"),
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 100_000,
+        retention: Optional[float] = None,
+        purge_interval: float = 3600,
+        purge_chunk: int = 10_000
+    ):
+        """
+        Args:
+            db_path: Путь к файлу базы
+            batch_size: Максимальный размер пачки записи
+            flush_interval: Максимальная задержка записи в секундах
+            max_queue: Размер очереди; при переполнении снимки отбрасываются
+            retention: Срок хранения снимков в секундах (None - хранить все)
+            purge_interval: Интервал удаления устаревших снимков в секундах
+            purge_chunk: Максимум строк, удаляемых одной транзакцией
+        """
+        self.logger = Logger("position_store")
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.purge_chunk = purge_chunk
+        self.dropped = 0
+        self.written = 0
+        self.purged = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        # Отдельные соединения для записи и чтения: в WAL читатели не ждут писателя
+        self._write_conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._read_conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._init_schema()
+
+        self._queue: "queue.Queue[Row]" = queue.Queue(maxsize=max_queue)
+        self._writer_thread = None
+        self._stop_writer = threading.Event()
+
+    def _init_schema(self) -> None:
+        """Настраивает WAL и создает таблицу при необходимости"""
+        conn = self._write_conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS positions (
+                ts REAL NOT NULL,
+                trader TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                leverage REAL,
+                entry_price REAL,
+                mark_price REAL,
+                pnl REAL,
+                pnl_percent REAL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_positions_trader_symbol_ts ON positions (trader, symbol, ts)"
+        )
+        conn.commit()
+
+    def record(self, trader: str, position: Dict[str, str], ts: Optional[float] = None) -> bool:
+        """
+        Ставит снимок позиции в очередь записи (не блокирует)
+
+        Args:
+            trader: ID трейдера
+            position: Текст ячеек позиции (см. position_reader.read_position)
+            ts: Время снимка (по умолчанию текущее)
+
+        Returns:
+            bool: False если очередь переполнена и снимок отброшен
+        """
+        values = position_values(position)
+        row = (
+            ts or time.time(),
+            trader,
+            position["symbol"],
+            values["leverage"],
+            values["entry_price"],
+            values["mark_price"],
+            values["pnl"],
+            values["pnl_percent"]
+        )
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def query(
+        self,
+        trader: str,
+        symbol: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Возвращает снимки трейдера за период в порядке времени
+
+        Args:
+            trader: ID трейдера
+            symbol: Символ (если None - все символы)
+            start: Начало периода (timestamp)
+            end: Конец периода (timestamp)
+            limit: Максимальное количество строк
+
+        Returns:
+            List[Dict[str, Any]]: Снимки позиций
+        """
+        sql = "SELECT ts, trader, symbol, leverage, entry_price, mark_price, pnl, pnl_percent FROM positions WHERE trader = ?"
+        params: List[Any] = [trader]
+        if symbol is not None:
+            sql += " AND symbol = ?"
+            params.append(symbol)
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(end)
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+
+        columns = ("ts", "trader", "symbol", "leverage", "entry_price", "mark_price", "pnl", "pnl_percent")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        """
+        Удаляет снимки старше указанного возраста через соединение записи
+
+        Удаление идет порциями по purge_chunk строк, каждая в своей транзакции,
+        чтобы не задерживать надолго запись новых снимков.
+
+        Args:
+            older_than: Возраст в секундах
+
+        Returns:
+            int: Количество удаленных строк
+        """
+        cutoff = time.time() - older_than
+        deleted = 0
+        while True:
+            with self._write_lock, self._write_conn:
+                cursor = self._write_conn.execute(
+                    "DELETE FROM positions WHERE rowid IN "
+                    "(SELECT rowid FROM positions WHERE ts < ? LIMIT ?)",
+                    (cutoff, self.purge_chunk)
+                )
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.purge_chunk:
+                break
+        self.purged += deleted
+        return deleted
+
+    def pending_count(self) -> int:
+        """Возвращает количество снимков, ожидающих записи"""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Запускает фоновую запись"""
+        if self._writer_thread and self._writer_thread.is_alive():
+            return
+        self._stop_writer.clear()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="PositionStoreWriter")
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+        self.logger.info("✅ Запущена запись истории позиций")
+
+    def stop(self) -> None:
+        """Останавливает фоновую запись, дописав очередь"""
+        self._stop_writer.set()
+        if self._writer_thread:
+            self._writer_thread.join(timeout=10)
+        batch = self._drain()
+        while batch:
+            self._flush(batch)
+            batch = self._drain()
+
+    def _drain(self, first: Optional[Row] = None) -> List[Row]:
+        """Забирает из очереди до batch_size снимков"""
+        batch = [first] if first else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[Row]) -> None:
+        """Записывает пачку снимков одной транзакцией"""
+        if not batch:
+            return
+        with self._write_lock, self._write_conn:
+            self._write_conn.executemany(
+                "INSERT INTO positions (ts, trader, symbol, leverage, entry_price, mark_price, pnl, pnl_percent) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+        self.written += len(batch)
+
+    def _writer_loop(self) -> None:
+        """Копит снимки не дольше flush_interval и записывает их пачками"""
+        next_purge_at = time.time()
+        while not self._stop_writer.is_set():
+            if self.retention and time.time() >= next_purge_at:
+                next_purge_at = time.time() + self.purge_interval
+                try:
+                    purged = self.purge(self.retention)
+                    if purged:
+                        self.logger.info(f"🧹 Удалено устаревших снимков позиций: {purged}")
+                except sqlite3.Error as e:
+                    self.logger.error("❌ Ошибка удаления устаревших снимков позиций", exc_info=e)
+
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Даем пачке набраться, если очередь почти пуста
+            if self._queue.qsize() < self.batch_size:
+                self._stop_writer.wait(min(0.1, self.flush_interval))
+            batch = self._drain(first)
+            try:
+                self._flush(batch)
+            except sqlite3.Error as e:
+                self.logger.error(f"❌ Ошибка записи истории позиций ({len(batch)} строк)", exc_info=e)
+
+# Создаем глобальный экземпляр хранилища (POSITION_RETENTION_DAYS=0 - хранить все)
+position_store = PositionStore(retention=float(os.getenv("POSITION_RETENTION_DAYS", "30")) * 86400 or None)
@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import uuid
+import zlib
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+from logger import Logger
+from retry_manager import retry_manager
+
+class WorkerHandle:
+    """Состояние одного процесса-воркера на стороне координатора"""
+
+    def __init__(self, worker_id: int, profile_dir: str):
+        self.worker_id = worker_id
+        self.profile_dir = profile_dir
+        self.process: Optional[subprocess.Popen] = None
+        self.targets: Dict[str, Dict[str, Any]] = {}
+        self.restarts = 0
+        self.next_start_at = 0.0
+        self.last_heartbeat = 0.0
+        self.started_at = 0.0
+        self.ready = False
+
+    def is_running(self) -> bool:
+        """Проверяет, что процесс запущен и не завершился"""
+        return self.process is not None and self.process.poll() is None
+
+class ProcessCoordinator:
+    """
+    Координатор многопроцессного режима
+
+    Координатор остается в главном процессе вместе с конфигурацией, Telegram
+    и хранилищем состояния. Каждый воркер - отдельный процесс со своим
+    браузером и своей частью URL (по стабильному хешу URL), поэтому разбор
+    страниц не конкурирует за GIL, а падение браузера или интерпретатора
+    затрагивает только одного воркера. Обмен идет строками JSON через
+    stdin/stdout процессов; упавший или зависший воркер перезапускается
+    с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        worker_count: int,
+        on_event: Callable[[Dict[str, Any]], None],
+        profile_dirs: List[str],
+        heartbeat_timeout: float = 60,
+        startup_timeout: float = 300
+    ):
+        """
+        Args:
+            worker_count: Количество процессов-воркеров
+            on_event: Обработчик событий воркеров (positions, error, login_required);
+                ответы profile собирает сам координатор
+            profile_dirs: Директории профилей Chrome по номеру воркера
+            heartbeat_timeout: Время без heartbeat, после которого воркер перезапускается
+            startup_timeout: Время на запуск браузера и ручной вход до первого heartbeat
+        """
+        self.logger = Logger("process_coordinator")
+        self.worker_count = worker_count
+        self.on_event = on_event
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+
+        self._lock = threading.Lock()
+        self._workers = [WorkerHandle(i, profile_dirs[i]) for i in range(worker_count)]
+        self._monitor_thread = None
+        self._stop = threading.Event()
+        # ID запроса -> ответы воркеров на команду profile
+        self._profiles: Dict[str, Dict[int, str]] = {}
+        self._profiles_ready = threading.Condition(self._lock)
+
+    def worker_for(self, url: str) -> int:
+        """Возвращает номер воркера для URL; хеш стабилен между перезапусками"""
+        return zlib.crc32(url.encode()) % self.worker_count
+
+    def set_targets(self, targets: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Распределяет URL между воркерами и отправляет им новые назначения
+
+        Args:
+            targets: URL -> параметры проверки (interval, priority, jitter)
+        """
+        shards: List[Dict[str, Dict[str, Any]]] = [{} for _ in range(self.worker_count)]
+        for url, params in targets.items():
+            shards[self.worker_for(url)][url] = params
+
+        with self._lock:
+            for handle, shard in zip(self._workers, shards):
+                if handle.targets == shard:
+                    continue
+                handle.targets = shard
+                self._send(handle, {"type": "targets", "targets": shard})
+
+    def status(self) -> Dict[int, Dict[str, Any]]:
+        """Возвращает состояние воркеров"""
+        with self._lock:
+            return {
+                handle.worker_id: {
+                    "running": handle.is_running(),
+                    "ready": handle.ready,
+                    "urls": len(handle.targets),
+                    "restarts": handle.restarts,
+                    "last_heartbeat": handle.last_heartbeat
+                }
+                for handle in self._workers
+            }
+
+    def collect_profiles(self, by: str = "both", reset: bool = False, timeout: float = 5) -> Dict[int, Optional[str]]:
+        """
+        Запрашивает у воркеров сводку времени команд WebDriver
+
+        Args:
+            by: Группировка сводки (см. DriverProfiler.summary)
+            reset: Сбросить статистику воркеров после сводки
+            timeout: Максимальное время ожидания ответов
+
+        Returns:
+            Dict[int, Optional[str]]: Номер воркера -> сводка (None, если воркер не ответил)
+        """
+        request_id = uuid.uuid4().hex
+        deadline = time.time() + timeout
+        with self._lock:
+            self._profiles[request_id] = {}
+            expected = [handle.worker_id for handle in self._workers if handle.is_running()]
+            for handle in self._workers:
+                self._send(handle, {"type": "profile", "request_id": request_id, "by": by, "reset": reset})
+            self._profiles_ready.wait_for(
+                lambda: len(self._profiles[request_id]) >= len(expected),
+                max(0.0, deadline - time.time())
+            )
+            received = self._profiles.pop(request_id)
+        return {handle.worker_id: received.get(handle.worker_id) for handle in self._workers}
+
+    def _send(self, handle: WorkerHandle, message: Dict[str, Any]) -> None:
+        """Отправляет команду воркеру (вызывается под блокировкой)"""
+        if not handle.is_running():
+            return
+        try:
+            handle.process.stdin.write(json.dumps(message) + "\n")
+            handle.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.logger.warning(f"⚠️ Воркер {handle.worker_id} недоступен: {str(e)}")
+
+    def _spawn(self, handle: WorkerHandle) -> None:
+        """Запускает процесс воркера (вызывается под блокировкой)"""
+        handle.process = subprocess.Popen(
+            [sys.executable, "-m", "process_worker", str(handle.worker_id), handle.profile_dir],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        handle.started_at = time.time()
+        handle.last_heartbeat = 0.0
+        handle.ready = False
+
+        reader = threading.Thread(
+            target=self._reader_loop,
+            args=(handle, handle.process),
+            name=f"WorkerReader-{handle.worker_id}"
+        )
+        reader.daemon = True
+        reader.start()
+
+        self._send(handle, {"type": "targets", "targets": handle.targets})
+        self.logger.info(f"✅ Запущен воркер {handle.worker_id} (PID {handle.process.pid}, URL: {len(handle.targets)})")
+
+    def _reader_loop(self, handle: WorkerHandle, process: subprocess.Popen) -> None:
+        """Читает события воркера до завершения его процесса"""
+        for line in process.stdout:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                self.logger.warning(f"⚠️ Некорректное сообщение от воркера {handle.worker_id}: {line.strip()}")
+                continue
+
+            if event["type"] in ("heartbeat", "ready"):
+                with self._lock:
+                    if handle.process is process:
+                        handle.last_heartbeat = time.time()
+                        if event["type"] == "ready":
+                            handle.ready = True
+                            handle.restarts = 0
+                continue
+
+            if event["type"] == "profile":
+                with self._lock:
+                    responses = self._profiles.get(event["request_id"])
+                    if responses is not None:
+                        responses[handle.worker_id] = event["summary"]
+                        self._profiles_ready.notify_all()
+                continue
+
+            try:
+                self.on_event(event)
+            except Exception as e:
+                self.logger.error(f"❌ Ошибка обработки события воркера {handle.worker_id}", exc_info=e)
+
+    def start(self) -> None:
+        """Запускает воркеры и поток наблюдения за ними"""
+        if self._monitor_thread and self._monitor_thread.is_alive():
+            return
+        self._stop.clear()
+        with self._lock:
+            for handle in self._workers:
+                self._spawn(handle)
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, name="ProcessCoordinator")
+        self._monitor_thread.daemon = True
+        self._monitor_thread.start()
+        self.logger.info(f"✅ Многопроцессный режим запущен (воркеров: {self.worker_count})")
+
+    def _monitor_loop(self) -> None:
+        """Перезапускает упавшие и зависшие воркеры"""
+        while not self._stop.wait(1):
+            now = time.time()
+            with self._lock:
+                for handle in self._workers:
+                    if handle.is_running():
+                        if handle.ready:
+                            stale = now - handle.last_heartbeat > self.heartbeat_timeout
+                        else:
+                            stale = now - handle.started_at > self.startup_timeout
+                        if not stale:
+                            continue
+                        self.logger.warning(f"⚠️ Воркер {handle.worker_id} не отвечает, перезапуск")
+                        handle.process.kill()
+                        handle.process.wait(timeout=5)
+
+                    if handle.process is not None:
+                        # Процесс только что завершился: планируем перезапуск
+                        delay = retry_manager.exponential_backoff(handle.restarts)
+                        self.logger.warning(
+                            f"⚠️ Воркер {handle.worker_id} завершился (код {handle.process.poll()}), "
+                            f"перезапуск через {delay:.0f} секунд"
+                        )
+                        handle.process = None
+                        handle.restarts += 1
+                        handle.next_start_at = now + delay
+                        continue
+
+                    if now >= handle.next_start_at:
+                        try:
+                            self._spawn(handle)
+                        except OSError as e:
+                            handle.next_start_at = now + retry_manager.exponential_backoff(handle.restarts)
+                            self.logger.error(f"❌ Не удалось запустить воркер {handle.worker_id}", exc_info=e)
+
+    def stop(self, timeout: float = 15) -> None:
+        """Останавливает воркеры: сначала командой, затем принудительно"""
+        self._stop.set()
+        if self._monitor_thread:
+            self._monitor_thread.join(timeout=5)
+
+        with self._lock:
+            for handle in self._workers:
+                self._send(handle, {"type": "stop"})
+            processes = [handle.process for handle in self._workers if handle.process]
+
+        deadline = time.time() + timeout
+        for process in processes:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.logger.info("✅ Воркеры остановлены")
@@ -0,0 +1,169 @@
+"""
+Процесс-воркер мониторинга
+
+Запускается координатором командой `python -m process_worker <ID> <профиль>`.
+Воркер владеет своим браузером и своей частью URL. Команды от координатора
+приходят построчно в stdin в формате JSON, события (позиции, ошибки,
+heartbeat, сводка времени команд) уходят тем же форматом в stdout. Логи пишутся в stderr и файлы,
+поэтому stdout зарезервирован под протокол.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from typing import Any, Dict, Optional, TextIO
+import undetected_chromedriver as uc
+from selenium.common.exceptions import WebDriverException
+from logger import Logger
+from driver_manager import DriverManager
+from driver_profiler import driver_profiler
+from driver_supervisor import DriverSupervisor
+from monitor_scheduler import MonitorScheduler
+from page_manager import PageManager
+from position_reader import read_positions
+
+HEARTBEAT_INTERVAL = 5
+
+class MonitorWorker:
+    """Проверяет свою часть URL в отдельном процессе на собственном браузере"""
+
+    def __init__(self, worker_id: int, profile_dir: str, output: TextIO):
+        """
+        Args:
+            worker_id: Номер воркера
+            profile_dir: Директория профиля Chrome (сохраняет сессию между перезапусками)
+            output: Поток для событий протокола
+        """
+        self.logger = Logger(f"worker_{worker_id}")
+        self.worker_id = worker_id
+        self.profile_dir = profile_dir
+        self.output = output
+        self._output_lock = threading.Lock()
+
+        self.driver_manager = DriverManager(on_register=driver_profiler.instrument)
+        # URL -> дескриптор вкладки
+        self.tabs: Dict[str, str] = {}
+        self.scheduler = MonitorScheduler(self.scrape, lambda url: 1, max_workers=1)
+        self.supervisor = DriverSupervisor(
+            self.driver_manager,
+            self.launch_driver,
+            on_replaced=lambda driver_id, driver: self.tabs.clear(),
+            lease=self.scheduler.driver_pool.lease
+        )
+        self._stop = threading.Event()
+
+    def emit(self, event_type: str, **fields: Any) -> None:
+        """Отправляет событие координатору"""
+        line = json.dumps({"type": event_type, "worker_id": self.worker_id, "ts": time.time(), **fields})
+        with self._output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def launch_driver(self, driver_id: int = 1) -> uc.Chrome:
+        """Запускает браузер с профилем воркера и проверяет авторизацию"""
+        options = uc.ChromeOptions()
+        options.add_argument('--start-maximized')
+        options.add_argument(f'--user-data-dir={self.profile_dir}')
+        driver = uc.Chrome(options=options)
+
+        driver.get("https://www.binance.com/en/my/dashboard")
+        if not PageManager(driver).is_element_present("#dashboard-userinfo-nickname", timeout=15):
+            self.emit("login_required", profile_dir=self.profile_dir)
+        return driver
+
+    def scrape(self, url: str, job_id: int, driver_id: int) -> None:
+        """Проверяет один URL в его вкладке и отправляет таблицу позиций координатору"""
+        driver = self.driver_manager.get_driver(driver_id)
+        if not driver:
+            raise WebDriverException(f"Драйвер {driver_id} не найден")
+
+        handle = self.tabs.get(url)
+        if handle and handle in driver.window_handles:
+            driver.switch_to.window(handle)
+            driver.refresh()
+        else:
+            driver.switch_to.new_window('tab')
+            self.tabs[url] = driver.current_window_handle
+            driver.get(url)
+
+        try:
+            rows = read_positions(driver)
+        except Exception as e:
+            self.emit("error", url=url, error=str(e))
+            # Планировщик воркера должен засчитать проверку как неудачную
+            raise
+        self.emit("positions", url=url, rows=rows)
+
+    def set_targets(self, targets: Dict[str, Dict[str, float]]) -> None:
+        """Приводит расписание и вкладки воркера к назначенным URL"""
+        self.scheduler.set_targets(targets)
+
+        removed = [url for url in self.tabs if url not in targets]
+        if not removed:
+            return
+        driver = self.driver_manager.get_driver(1)
+        with self.scheduler.driver_pool.lease(1, timeout=60) as acquired:
+            if not acquired or not driver:
+                return
+            for url in removed:
+                try:
+                    driver.switch_to.window(self.tabs.pop(url))
+                    driver.close()
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Не удалось закрыть вкладку {url}: {str(e)}")
+            remaining = driver.window_handles
+            if remaining:
+                driver.switch_to.window(remaining[0])
+
+    def _heartbeat_loop(self) -> None:
+        """Периодически сообщает координатору, что воркер жив"""
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            driver = self.driver_manager.get_driver(1)
+            self.emit("heartbeat", driver_alive=driver is not None, urls=len(self.tabs))
+
+    def run(self, commands: TextIO) -> None:
+        """Основной цикл: запускает браузер и выполняет команды координатора"""
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="WorkerHeartbeat")
+        heartbeat.daemon = True
+        try:
+            self.driver_manager.register_driver(1, self.launch_driver())
+            self.scheduler.start()
+            self.supervisor.supervise(1)
+            self.supervisor.start()
+            heartbeat.start()
+            self.emit("ready")
+
+            # Конец stdin означает, что координатор завершился
+            for line in commands:
+                command = json.loads(line)
+                if command["type"] == "targets":
+                    self.set_targets(command["targets"])
+                elif command["type"] == "profile":
+                    summary = driver_profiler.summary(command.get("by", "both"))
+                    self.emit("profile", request_id=command["request_id"], summary=summary)
+                    if command.get("reset"):
+                        driver_profiler.reset()
+                elif command["type"] == "stop":
+                    break
+        finally:
+            self._stop.set()
+            self.supervisor.stop()
+            self.scheduler.stop()
+            self.logger.info(driver_profiler.summary())
+            self.driver_manager.cleanup_all()
+
+def main(argv: Optional[list] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    worker_id, profile_dir = int(argv[0]), argv[1]
+
+    # Протокол идет через исходный stdout; все остальное (логи, вывод
+    # chromedriver) перенаправляем в stderr, чтобы не испортить поток событий
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    MonitorWorker(worker_id, profile_dir, protocol).run(sys.stdin)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import time
 import logging
 from typing import Callable, Any, Optional, Type, Tuple, Union
 from functools import wraps
+from metrics import metrics
 from selenium.common.exceptions import (
     WebDriverException,
     TimeoutException,
@@ -9,6 +10,8 @@ from selenium.common.exceptions import (
     StaleElementReferenceException
 )
 
+RETRIES = metrics.counter("cptrade_retries_total", "Повторные попытки по операциям", ("operation",))
+
 class RetryManager:
     """Менеджер для управления повторными попытками и обработки ошибок"""
     
@@ -50,6 +53,7 @@ class RetryManager:
                                 f"Повторная попытка через {delay:.1f} секунд..."
                             )
                             
+                            RETRIES.labels(func.__qualname__).inc()
                             if on_retry:
                                 on_retry(e, attempt)
                                 
@@ -92,6 +96,7 @@ class RetryManager:
                             f"Повторная попытка через {delay:.1f} секунд..."
                         )
                         
+                        RETRIES.labels(func.__qualname__).inc()
                         if on_retry:
                             on_retry(result, attempt)
                             
@@ -0,0 +1,540 @@
+import re
+import math
+import time
+import operator
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from logger import Logger
+
+# Области правил: снимок позиции, метрики аналитики (векторно) и изменение ордера
+SCOPES = ("position", "metrics", "order")
+SEVERITIES = ("info", "warning", "urgent")
+
+# Поля снимка позиции и ордера (строковые поля сравниваются только на равенство)
+POSITION_FIELDS = ("leverage", "entry_price", "mark_price", "pnl", "pnl_percent")
+ORDER_FIELDS = ("price", "amount", "filled", "filled_percent")
+STRING_FIELDS = ("symbol", "status", "previous_status", "type")
+
+# Короткие имена полей в тексте правил
+ALIASES = {
+    "pnl%": "pnl_percent",
+    "roe": "pnl_percent",
+    "entry": "entry_price",
+    "mark": "mark_price",
+    "price_mark": "mark_price",
+    "filled%": "filled_percent"
+}
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne
+}
+
+DEFAULT_COOLDOWN = 300.0
+
+# name: условие -> важность [cooldown=секунды] [hysteresis=запас]
+_RULE_PATTERN = re.compile(
+    r"^(?P<scope>\w+)\s+(?P<name>[\w.-]+)\s*:\s*(?P<condition>.+?)\s*(?:->|→)\s*"
+    r"(?P<severity>\w+)(?P<options>(?:\s+\w+=\S+)*)\s*$"
+)
+_TOKEN_PATTERN = re.compile(
+    r"\s*(?:(?P<number>[-+]?\d+(?:\.\d+)?)|(?P<string>\"[^\"]*\"|'[^']*')|"
+    r"(?P<op><=|>=|==|!=|<|>)|(?P<paren>[()])|(?P<name>[A-Za-z_][\w]*%?))"
+)
+
+class RuleError(ValueError):
+    """Ошибка в тексте правила"""
+
+class Alert:
+    """Срабатывание правила для одного ключа (позиция, ряд аналитики или ордер)"""
+
+    __slots__ = ("rule", "key", "values", "ts")
+
+    def __init__(self, rule: "Rule", key: Hashable, values: Dict[str, Any], ts: float):
+        self.rule = rule
+        self.key = key
+        self.values = values
+        self.ts = ts
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """Разбивает условие на лексемы (вид, значение)"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise RuleError(f"Непонятный текст условия: {text[position:]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value.lower() in ("and", "or", "not"):
+            kind = value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+class _Parser:
+    """
+    Разбор условия в дерево
+
+    Грамматика: выражение = и ("or" и)*; и = не ("and" не)*;
+    не = "not" не | "(" выражение ")" | поле оператор значение.
+    Узлы дерева - кортежи ("or", a, b), ("and", a, b), ("not", a)
+    и ("cmp", поле, оператор, значение).
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _take(self, kind: str) -> str:
+        if self._peek() != kind:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else "конец условия"
+            raise RuleError(f"Ожидалось {kind}, найдено {found!r}")
+        value = self.tokens[self.position][1]
+        self.position += 1
+        return value
+
+    def parse(self) -> tuple:
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise RuleError(f"Лишний текст в условии: {self.tokens[self.position][1]!r}")
+        return node
+
+    def _or(self) -> tuple:
+        node = self._and()
+        while self._peek() == "or":
+            self._take("or")
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self) -> tuple:
+        node = self._not()
+        while self._peek() == "and":
+            self._take("and")
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self) -> tuple:
+        if self._peek() == "not":
+            self._take("not")
+            return ("not", self._not())
+        if self._peek() == "paren":
+            if self._take("paren") != "(":
+                raise RuleError("Лишняя закрывающая скобка")
+            node = self._or()
+            if self._take("paren") != ")":
+                raise RuleError("Ожидалась закрывающая скобка")
+            return node
+
+        name = self._take("name").lower()
+        field = ALIASES.get(name, name)
+        op = self._take("op")
+        if self._peek() == "string":
+            value: Any = self._take("string")[1:-1].casefold()
+            if op not in ("==", "!="):
+                raise RuleError(f"Строки сравниваются только через == и !=: {name}")
+        else:
+            value = float(self._take("number"))
+        return ("cmp", field, op, value)
+
+def _fields(node: tuple) -> List[str]:
+    """Возвращает поля, которые использует условие"""
+    if node[0] == "cmp":
+        return [node[1]]
+    return [field for child in node[1:] for field in _fields(child)]
+
+def _shifted(op: str, value: Any, shift: float) -> Any:
+    """
+    Сдвигает порог сравнения в сторону ослабления условия
+
+    Для условия удержания (гистерезис): "PNL% < -20" с запасом 5
+    продолжает выполняться, пока PNL% < -15.
+    """
+    if not shift or isinstance(value, str):
+        return value
+    if op in ("<", "<="):
+        return value + shift
+    if op in (">", ">="):
+        return value - shift
+    return value
+
+def _compile_scalar(node: tuple, shift: float = 0.0) -> Callable[[Dict[str, Any]], bool]:
+    """Компилирует дерево в замыкание над словарем значений одного ключа"""
+    kind = node[0]
+    if kind == "and":
+        left, right = _compile_scalar(node[1], shift), _compile_scalar(node[2], shift)
+        return lambda values: left(values) and right(values)
+    if kind == "or":
+        left, right = _compile_scalar(node[1], shift), _compile_scalar(node[2], shift)
+        return lambda values: left(values) or right(values)
+    if kind == "not":
+        # Ослабление условия под отрицанием - усиление вложенного условия
+        inner = _compile_scalar(node[1], -shift)
+        return lambda values: not inner(values)
+
+    _, field, op, value = node
+    compare = OPERATORS[op]
+    threshold = _shifted(op, value, shift)
+    if isinstance(threshold, str):
+        def check_string(values: Dict[str, Any]) -> bool:
+            current = values.get(field)
+            return current is not None and compare(str(current).casefold(), threshold)
+        return check_string
+
+    def check(values: Dict[str, Any]) -> bool:
+        current = values.get(field)
+        return current is not None and compare(current, threshold)
+    return check
+
+def _compile_mask(node: tuple, shift: float = 0.0) -> Callable[[Any], np.ndarray]:
+    """Компилирует дерево в функцию маски над столбцами метрик (NaN - не выполняется)"""
+    kind = node[0]
+    if kind == "and":
+        left, right = _compile_mask(node[1], shift), _compile_mask(node[2], shift)
+        return lambda metrics: left(metrics) & right(metrics)
+    if kind == "or":
+        left, right = _compile_mask(node[1], shift), _compile_mask(node[2], shift)
+        return lambda metrics: left(metrics) | right(metrics)
+    if kind == "not":
+        inner = _compile_mask(node[1], -shift)
+        return lambda metrics: ~inner(metrics)
+
+    _, field, op, value = node
+    if isinstance(value, str):
+        raise RuleError(f"В правилах metrics нельзя сравнивать строки: {field}")
+    compare = OPERATORS[op]
+    threshold = _shifted(op, value, shift)
+    return lambda metrics: compare(metrics[field], threshold)
+
+class Rule:
+    """
+    Скомпилированное правило оповещения
+
+    Текст условия разбирается один раз: для областей position и order
+    строится замыкание над словарем значений, для metrics - функция маски
+    над массивами метрик всех рядов. При проверке строки не разбираются.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        scope: str,
+        condition: str,
+        severity: str = "warning",
+        cooldown: float = DEFAULT_COOLDOWN,
+        hysteresis: float = 0.0,
+        metrics: Optional[Tuple[str, ...]] = None
+    ):
+        """
+        Args:
+            name: Имя правила
+            scope: Область (position, metrics или order)
+            condition: Условие ("PNL% < -20 and leverage >= 50")
+            severity: Важность (info, warning, urgent)
+            cooldown: Минимальный интервал между оповещениями по одному ключу
+            hysteresis: Запас, на который условие должно отступить, чтобы правило сработало снова
+            metrics: Допустимые поля для области metrics
+
+        Raises:
+            RuleError: Ошибка в условии или параметрах
+        """
+        if scope not in SCOPES:
+            raise RuleError(f"Неизвестная область {scope} (ожидается {', '.join(SCOPES)})")
+        if severity not in SEVERITIES:
+            raise RuleError(f"Неизвестная важность {severity} (ожидается {', '.join(SEVERITIES)})")
+
+        self.name = name
+        self.scope = scope
+        self.condition = condition
+        self.severity = severity
+        self.cooldown = float(cooldown)
+        self.hysteresis = float(hysteresis)
+
+        tree = _Parser(_tokenize(condition)).parse()
+        self.fields = tuple(dict.fromkeys(_fields(tree)))
+
+        allowed = {
+            "position": POSITION_FIELDS + ("symbol",),
+            "order": ORDER_FIELDS + STRING_FIELDS,
+            "metrics": metrics
+        }[scope]
+        if allowed is not None:
+            unknown = [field for field in self.fields if field not in allowed]
+            if unknown:
+                raise RuleError(f"Неизвестные поля для {scope}: {', '.join(unknown)}")
+
+        if scope == "metrics":
+            self.mask = _compile_mask(tree)
+            self.hold_mask = _compile_mask(tree, self.hysteresis) if self.hysteresis else self.mask
+        else:
+            self.check = _compile_scalar(tree)
+            self.hold = _compile_scalar(tree, self.hysteresis) if self.hysteresis else self.check
+
+    def __repr__(self) -> str:
+        return f"Rule({self.scope} {self.name}: {self.condition} -> {self.severity})"
+
+def parse_rules(text: str, metrics: Optional[Tuple[str, ...]] = None) -> Tuple[List[Rule], List[str]]:
+    """
+    Разбирает файл правил
+
+    Каждая непустая строка (кроме комментариев #) - одно правило:
+        position liquidation_risk: PNL% < -20 and leverage >= 50 -> urgent cooldown=600 hysteresis=5
+
+    Args:
+        text: Текст файла правил
+        metrics: Допустимые поля для правил metrics
+
+    Returns:
+        Tuple[List[Rule], List[str]]: Правила и описания ошибок в строках, которые пропущены
+    """
+    rules: List[Rule] = []
+    errors: List[str] = []
+    names = set()
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        match = _RULE_PATTERN.match(line)
+        if not match:
+            errors.append(f"строка {number}: ожидается 'область имя: условие -> важность'")
+            continue
+        try:
+            options = dict(option.split("=", 1) for option in match.group("options").split())
+            unknown = set(options) - {"cooldown", "hysteresis"}
+            if unknown:
+                raise RuleError(f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+            if match.group("name") in names:
+                raise RuleError(f"Правило {match.group('name')} уже задано")
+            rule = Rule(
+                match.group("name"),
+                match.group("scope"),
+                match.group("condition"),
+                match.group("severity").lower(),
+                cooldown=float(options.get("cooldown", DEFAULT_COOLDOWN)),
+                hysteresis=float(options.get("hysteresis", 0)),
+                metrics=metrics
+            )
+        except ValueError as e:
+            errors.append(f"строка {number}: {str(e)}")
+            continue
+        names.add(rule.name)
+        rules.append(rule)
+    return rules, errors
+
+class _MaskState:
+    """Состояние правила metrics по номерам рядов буфера"""
+
+    def __init__(self, size: int):
+        self.active = np.zeros(size, dtype=bool)
+        self.last_fired = np.full(size, -math.inf)
+        # Поколение ряда, к которому относится состояние (см. SnapshotBuffer.generations)
+        self.generation = np.zeros(size, dtype=np.int64)
+
+    def sync(self, series: np.ndarray, generations: np.ndarray) -> None:
+        """Сбрасывает состояние рядов, которые буфер отдал другой паре (трейдер, символ)"""
+        changed = self.generation[series] != generations
+        if changed.any():
+            self.clear(series[changed])
+            self.generation[series[changed]] = generations[changed]
+
+    def clear(self, series: Any) -> None:
+        """Сбрасывает состояние рядов"""
+        self.active[series] = False
+        self.last_fired[series] = -math.inf
+
+class RuleEngine:
+    """
+    Проверка скомпилированных правил и отправка оповещений
+
+    Для каждой пары (правило, ключ) хранится состояние: активно ли
+    срабатывание и когда было последнее оповещение. Оповещение отправляется,
+    когда условие начинает выполняться и с прошлого оповещения прошло не
+    меньше cooldown. Активное срабатывание снимается только когда перестает
+    выполняться условие удержания (условие, ослабленное на hysteresis),
+    поэтому колебания около порога не дают повторных сообщений.
+    """
+
+    def __init__(self, on_alert: Callable[[Alert], None]):
+        """
+        Args:
+            on_alert: Обработчик срабатываний
+        """
+        self.logger = Logger("rule_engine")
+        self.on_alert = on_alert
+
+        self._lock = threading.Lock()
+        self._rules: Dict[str, Tuple[Rule, ...]] = {scope: () for scope in SCOPES}
+        # (имя правила, ключ) -> [активно, время последнего оповещения]
+        self._states: Dict[Tuple[str, Hashable], List] = {}
+        self._mask_states: Dict[str, _MaskState] = {}
+
+    @property
+    def rules(self) -> List[Rule]:
+        """Текущие правила всех областей"""
+        return [rule for scope in SCOPES for rule in self._rules[scope]]
+
+    def set_rules(self, rules: List[Rule]) -> None:
+        """Заменяет набор правил, сохраняя состояние правил, которые остались"""
+        grouped = {scope: tuple(rule for rule in rules if rule.scope == scope) for scope in SCOPES}
+        names = {rule.name for rule in rules}
+        with self._lock:
+            self._rules = grouped
+            self._states = {key: state for key, state in self._states.items() if key[0] in names}
+            self._mask_states = {name: state for name, state in self._mask_states.items() if name in names}
+        self.logger.info(
+            "🔄 Правила оповещений: " + ", ".join(f"{scope} {len(grouped[scope])}" for scope in SCOPES)
+        )
+
+    def _evaluate(self, scope: str, key: Hashable, values: Dict[str, Any], now: float) -> List[Alert]:
+        """Проверяет правила области для одного ключа"""
+        alerts = []
+        with self._lock:
+            states = self._states
+            for rule in self._rules[scope]:
+                state_key = (rule.name, key)
+                state = states.get(state_key)
+                if state is not None and state[0]:
+                    if rule.hold(values):
+                        continue
+                    state[0] = False
+                if not rule.check(values):
+                    continue
+                if state is None:
+                    state = states[state_key] = [False, -math.inf]
+                if now - state[1] < rule.cooldown:
+                    continue
+                state[0] = True
+                state[1] = now
+                alerts.append(Alert(rule, key, {field: values.get(field) for field in rule.fields}, now))
+        self._deliver(alerts)
+        return alerts
+
+    def evaluate_position(
+        self,
+        key: Hashable,
+        values: Dict[str, Any],
+        now: Optional[float] = None
+    ) -> List[Alert]:
+        """
+        Проверяет правила position для снимка позиции
+
+        Args:
+            key: Ключ позиции, например (трейдер, символ)
+            values: Числовые значения (position_reader.position_values) и symbol
+            now: Время снимка
+
+        Returns:
+            List[Alert]: Новые срабатывания
+        """
+        if not self._rules["position"]:
+            return []
+        return self._evaluate("position", key, values, time.time() if now is None else now)
+
+    def evaluate_order(
+        self,
+        order: Dict[str, str],
+        values: Dict[str, Any],
+        previous_status: Optional[str] = None,
+        now: Optional[float] = None
+    ) -> List[Alert]:
+        """
+        Проверяет правила order для изменения ордера
+
+        Args:
+            order: Текст полей ордера (OrderManager.get_orders)
+            values: Числа ордера (OrderManager.order_values)
+            previous_status: Статус до изменения (None для нового ордера)
+            now: Время проверки
+
+        Returns:
+            List[Alert]: Новые срабатывания
+        """
+        if not self._rules["order"]:
+            return []
+        merged = {name: order.get(name) for name in STRING_FIELDS}
+        merged["previous_status"] = previous_status
+        for name in ("price", "amount", "filled"):
+            value = values.get(name)
+            merged[name] = None if value is None else float(value)
+        if merged["filled"] is not None and merged["amount"]:
+            merged["filled_percent"] = merged["filled"] / merged["amount"] * 100
+        return self._evaluate("order", order.get("id"), merged, time.time() if now is None else now)
+
+    def evaluate_metrics(self, metrics: Any, now: Optional[float] = None) -> List[Alert]:
+        """
+        Проверяет правила metrics по всем рядам аналитики сразу
+
+        Args:
+            metrics: position_analytics.PositionMetrics
+            now: Момент расчета
+
+        Returns:
+            List[Alert]: Новые срабатывания (ключ - (трейдер, символ))
+        """
+        now = time.time() if now is None else now
+        series = metrics.series
+        fired_rules = []
+        with self._lock:
+            for rule in self._rules["metrics"]:
+                state = self._mask_states.get(rule.name)
+                if state is None:
+                    state = self._mask_states[rule.name] = _MaskState(metrics.max_series)
+                state.sync(series, metrics.generations)
+                try:
+                    with np.errstate(invalid="ignore"):
+                        condition = rule.mask(metrics)
+                        hold = rule.hold_mask(metrics) if rule.hysteresis else condition
+                except KeyError:
+                    self.logger.warning(f"⚠️ Неизвестная метрика в правиле {rule.name}")
+                    continue
+                active = state.active[series]
+                fired = condition & ~active & (now - state.last_fired[series] >= rule.cooldown)
+                state.active[series] = (active & hold) | fired
+                positions = np.nonzero(fired)[0]
+                state.last_fired[series[positions]] = now
+                if len(positions):
+                    fired_rules.append((rule, positions))
+
+        alerts = [
+            Alert(
+                rule,
+                metrics.label(position),
+                {field: float(metrics[field][position]) for field in rule.fields},
+                now
+            )
+            for rule, positions in fired_rules
+            for position in positions
+        ]
+        self._deliver(alerts)
+        return alerts
+
+    def forget(self, key: Hashable, series: Optional[int] = None) -> None:
+        """
+        Удаляет состояние ключа (например, закрытого ордера)
+
+        Args:
+            key: Ключ позиции или ордера
+            series: Номер ряда SnapshotBuffer, состояние которого сбрасывается в правилах metrics
+        """
+        with self._lock:
+            self._states = {state_key: state for state_key, state in self._states.items() if state_key[1] != key}
+            if series is not None:
+                for state in self._mask_states.values():
+                    state.clear(series)
+
+    def _deliver(self, alerts: List[Alert]) -> None:
+        """Передает срабатывания обработчику"""
+        for alert in alerts:
+            try:
+                self.on_alert(alert)
+            except Exception as e:
+                self.logger.error(f"❌ Ошибка отправки оповещения {alert.rule.name}", exc_info=e)
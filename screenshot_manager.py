@@ -1,13 +1,166 @@
 import os
-import time
-from typing import Optional
+import base64
+from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 from logger import Logger
-from env_manager import EnvManager
+from config_manager import config_manager
+from image_hash import ChangeDetector, dhash
+from screenshot_store import screenshot_store
+
+# Общий пул для масштабирования и кодирования изображений: Pillow отпускает GIL
+# на время тяжелых операций, поэтому потоки скрапинга не тратят на это время
+_encode_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SCREENSHOT_ENCODE_WORKERS", "2")),
+    thread_name_prefix="ScreenshotEncoder"
+)
+
+# Расширение и MIME-тип для поддерживаемых форматов кодирования
+IMAGE_FORMATS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "WEBP": ("webp", "image/webp"),
+    "PNG": ("png", "image/png")
+}
+
+def encode_image(
+    png_bytes: bytes,
+    max_width: int = 1280,
+    image_format: str = "JPEG",
+    quality: int = 80,
+    crop: Optional[Tuple[int, int, int, int]] = None
+) -> bytes:
+    """
+    Обрезает, уменьшает и перекодирует PNG-скриншот в памяти
+    
+    Args:
+        png_bytes: Исходный скриншот в формате PNG
+        max_width: Максимальная ширина результата в пикселях
+        image_format: Формат результата (JPEG, WEBP или PNG)
+        quality: Качество сжатия для JPEG/WEBP
+        crop: Область обрезки (left, top, right, bottom) в пикселях исходника
+        
+    Returns:
+        bytes: Закодированное изображение
+    """
+    with Image.open(BytesIO(png_bytes)) as image:
+        if crop:
+            image = image.crop(crop)
+            
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            # LANCZOS сохраняет читаемость мелкого текста таблиц
+            image = image.resize((max_width, height), Image.LANCZOS)
+            
+        return _save_image(image, image_format, quality)
+
+def _save_image(image: Image.Image, image_format: str, quality: int) -> bytes:
+    """Кодирует изображение PIL в указанный формат"""
+    image_format = image_format.upper()
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат изображения: {image_format}")
+        
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+        
+    buffer = BytesIO()
+    if image_format == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    elif image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+def compose_grid(
+    images: List[bytes],
+    columns: int = 4,
+    tile_width: int = 640,
+    image_format: str = "JPEG",
+    quality: int = 80
+) -> bytes:
+    """
+    Собирает несколько скриншотов в одно изображение-сетку
+    
+    Args:
+        images: Список изображений в виде байтов
+        columns: Количество столбцов сетки
+        tile_width: Ширина одной ячейки в пикселях
+        image_format: Формат результата (JPEG, WEBP или PNG)
+        quality: Качество сжатия для JPEG/WEBP
+        
+    Returns:
+        bytes: Закодированное изображение сетки
+    """
+    tiles = []
+    for data in images:
+        with Image.open(BytesIO(data)) as image:
+            height = round(image.height * tile_width / image.width)
+            tiles.append(image.convert("RGB").resize((tile_width, height), Image.LANCZOS))
+            
+    columns = max(1, min(columns, len(tiles)))
+    rows = (len(tiles) + columns - 1) // columns
+    tile_height = max(tile.height for tile in tiles)
+    
+    grid = Image.new("RGB", (columns * tile_width, rows * tile_height), "white")
+    for index, tile in enumerate(tiles):
+        grid.paste(tile, ((index % columns) * tile_width, (index // columns) * tile_height))
+        
+    return _save_image(grid, image_format, quality)
+
+# История перцептивных хешей общая для всех экземпляров менеджера
+change_detector = ChangeDetector(
+    threshold=int(os.getenv("SCREENSHOT_HASH_THRESHOLD", "5")),
+    max_keys=int(os.getenv("SCREENSHOT_HASH_KEYS", "1024"))
+)
+
+# Результат take_screenshot_bytes, если снимок пропущен из-за отсутствия изменений
+UNCHANGED = b""
+
+def _encode_if_changed(
+    png_bytes: bytes,
+    history_key: str,
+    max_width: int,
+    image_format: str,
+    quality: int,
+    crop: Optional[Tuple[int, int, int, int]]
+) -> Optional[bytes]:
+    """Кодирует скриншот только если он заметно отличается от предыдущего"""
+    with Image.open(BytesIO(png_bytes)) as image:
+        region = image.crop(crop) if crop else image
+        if not change_detector.check(history_key, dhash(region)):
+            return None
+    return encode_image(png_bytes, max_width, image_format, quality, crop)
+
+def _pass_if_changed(data: bytes, history_key: str) -> Optional[bytes]:
+    """Возвращает уже закодированный скриншот только если он заметно изменился"""
+    if not change_detector.check(history_key, dhash(data)):
+        return None
+    return data
+
+def _completed_future(result: Any) -> Future:
+    """Возвращает Future с готовым результатом"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+# JavaScript для получения прямоугольника элемента в координатах документа
+_ELEMENT_RECT_SCRIPT = """
+const element = document.querySelector(arguments[0]);
+if (!element) return null;
+const rect = element.getBoundingClientRect();
+return {
+    x: rect.left + window.scrollX,
+    y: rect.top + window.scrollY,
+    width: rect.width,
+    height: rect.height
+};
+"""
 
 class ScreenshotManager:
     """Менеджер для создания и сохранения скриншотов"""
@@ -15,42 +168,149 @@ class ScreenshotManager:
     def __init__(self, driver: WebDriver):
         self.driver = driver
         self.logger = Logger("screenshot_manager")
-        self.env = EnvManager()
-        self.screenshots_dir = "screenshots"
-        self._ensure_screenshots_dir()
+        self.env = config_manager.env
+        self.store = screenshot_store
+        self.screenshots_dir = self.store.root_dir
+        self.image_format = self.env.get("SCREENSHOT_FORMAT", "JPEG").upper()
+        self.max_width = self.env.get_int("SCREENSHOT_MAX_WIDTH", 1280)
+        self.quality = self.env.get_int("SCREENSHOT_QUALITY", 80)
+        # "cdp" - Page.captureScreenshot без изменения размеров окна, "webdriver" - стандартный путь
+        self.backend = self.env.get("SCREENSHOT_BACKEND", "webdriver").lower()
+        self.store.start_janitor()
+        
+    def capture_region_cdp(
+        self,
+        element_selector: Optional[str] = None,
+        clip: Optional[Dict[str, float]] = None,
+        image_format: str = "png",
+        quality: Optional[int] = None,
+        max_width: Optional[int] = None,
+        capture_beyond_viewport: bool = False
+    ) -> Optional[bytes]:
+        """
+        Снимает область страницы через CDP Page.captureScreenshot
         
-    def _ensure_screenshots_dir(self) -> None:
-        """Создает директорию для скриншотов если она не существует"""
-        if not os.path.exists(self.screenshots_dir):
-            os.makedirs(self.screenshots_dir)
-            self.logger.info(f"✅ Создана директория {self.screenshots_dir}")
+        Размер окна не меняется, поэтому раскладка страницы и параллельный
+        скрапинг на том же драйвере не затрагиваются. Chrome сам масштабирует
+        и кодирует область, повторное кодирование PNG не требуется.
+        
+        Args:
+            element_selector: CSS селектор элемента, область которого нужно снять
+            clip: Область {x, y, width, height} в координатах документа
+            image_format: Формат результата (png, jpeg или webp)
+            quality: Качество сжатия для jpeg/webp
+            max_width: Максимальная ширина результата в пикселях
+            capture_beyond_viewport: Снимать область за пределами видимой части окна
             
-    def take_screenshot(self, thread_id: int) -> Optional[str]:
+        Returns:
+            Optional[bytes]: Изображение или None в случае ошибки
+        """
+        try:
+            if element_selector:
+                clip = self.driver.execute_script(_ELEMENT_RECT_SCRIPT, element_selector)
+                if not clip:
+                    self.logger.warning(f"⚠️ Элемент для снимка не найден: {element_selector}")
+                    return None
+                    
+            image_format = image_format.lower()
+            if image_format == "jpg":
+                image_format = "jpeg"
+                
+            params: Dict[str, Any] = {
+                "format": image_format,
+                "fromSurface": True,
+                "captureBeyondViewport": capture_beyond_viewport
+            }
+            if image_format != "png":
+                params["quality"] = quality if quality is not None else self.quality
+                
+            if not clip and max_width:
+                # Без clip Chrome снимает вьюпорт в исходном размере: чтобы
+                # уменьшить его, задаем видимую область явно
+                metrics = self.driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+                viewport = metrics.get("cssVisualViewport") or metrics["visualViewport"]
+                clip = {
+                    "x": viewport["pageX"],
+                    "y": viewport["pageY"],
+                    "width": viewport["clientWidth"],
+                    "height": viewport["clientHeight"]
+                }
+                
+            if clip:
+                scale = 1.0
+                if max_width and clip["width"] > max_width:
+                    scale = max_width / clip["width"]
+                params["clip"] = {
+                    "x": clip["x"],
+                    "y": clip["y"],
+                    "width": clip["width"],
+                    "height": clip["height"],
+                    "scale": scale
+                }
+                
+            result = self.driver.execute_cdp_cmd("Page.captureScreenshot", params)
+            return base64.b64decode(result["data"])
+            
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка при снимке области через CDP: {str(e)}")
+            return None
+            
+    def _history_key(self, thread_id: int, suffix: str = "page") -> str:
+        """Формирует ключ истории хешей для потока и текущего URL"""
+        try:
+            url = self.driver.current_url
+        except Exception:
+            url = ""
+        return f"{thread_id}|{url}|{suffix}"
+        
+    def is_changed(self, image_bytes: bytes, history_key: str) -> bool:
+        """
+        Проверяет, отличается ли изображение от предыдущего для ключа
+        
+        Args:
+            image_bytes: Изображение в виде байтов
+            history_key: Ключ истории хешей
+            
+        Returns:
+            bool: True если отличие превышает порог SCREENSHOT_HASH_THRESHOLD
+        """
+        return change_detector.check(history_key, dhash(image_bytes))
+            
+    def take_screenshot(self, thread_id: int, only_if_changed: bool = False) -> Optional[str]:
         """
         Создает скриншот текущего окна браузера
         
         Args:
             thread_id: ID потока для именования файла
+            only_if_changed: Сохранять только если страница заметно изменилась
             
         Returns:
             Optional[str]: Путь к сохраненному скриншоту или None в случае ошибки
+                или отсутствия изменений
         """
         try:
-            # Устанавливаем размер окна
-            self.driver.set_window_size(1920, 1080)
+            # Устанавливаем размер окна (CDP снимает текущий вьюпорт без релэйаута)
+            if self.backend != "cdp":
+                self.driver.set_window_size(1920, 1080)
             
             # Ждем загрузки страницы
             WebDriverWait(self.driver, 10).until(
                 lambda driver: driver.execute_script("return document.readyState") == "complete"
             )
             
-            # Создаем имя файла с временной меткой
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = f"screenshot_thread_{thread_id}_{timestamp}.png"
-            filepath = os.path.join(self.screenshots_dir, filename)
-            
             # Делаем скриншот
-            self.driver.save_screenshot(filepath)
+            if self.backend == "cdp":
+                png_bytes = self.capture_region_cdp()
+            else:
+                png_bytes = self.driver.get_screenshot_as_png()
+            if not png_bytes:
+                return None
+                
+            if only_if_changed and not self.is_changed(png_bytes, self._history_key(thread_id)):
+                self.logger.info(f"ℹ️ Страница не изменилась, скриншот пропущен (Поток {thread_id})")
+                return None
+                
+            filepath = self.store.save(thread_id, png_bytes, "png", "screenshot")
             self.logger.info(f"✅ Скриншот сохранен: {filepath}")
             
             return filepath
@@ -63,16 +323,23 @@ class ScreenshotManager:
             self.logger.error(f"❌ Ошибка при создании скриншота: {str(e)}")
             return None
             
-    def take_element_screenshot(self, element_selector: str, thread_id: int) -> Optional[str]:
+    def take_element_screenshot(
+        self,
+        element_selector: str,
+        thread_id: int,
+        only_if_changed: bool = False
+    ) -> Optional[str]:
         """
         Создает скриншот конкретного элемента
         
         Args:
             element_selector: CSS селектор элемента
             thread_id: ID потока для именования файла
+            only_if_changed: Сохранять только если элемент заметно изменился
             
         Returns:
             Optional[str]: Путь к сохраненному скриншоту или None в случае ошибки
+                или отсутствия изменений
         """
         try:
             # Ждем появления элемента
@@ -80,13 +347,20 @@ class ScreenshotManager:
                 EC.presence_of_element_located((By.CSS_SELECTOR, element_selector))
             )
             
-            # Создаем имя файла с временной меткой
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = f"element_screenshot_thread_{thread_id}_{timestamp}.png"
-            filepath = os.path.join(self.screenshots_dir, filename)
-            
             # Делаем скриншот элемента
-            element.screenshot(filepath)
+            if self.backend == "cdp":
+                png_bytes = self.capture_region_cdp(element_selector, capture_beyond_viewport=True)
+            else:
+                png_bytes = element.screenshot_as_png
+            if not png_bytes:
+                return None
+                
+            history_key = self._history_key(thread_id, element_selector)
+            if only_if_changed and not self.is_changed(png_bytes, history_key):
+                self.logger.info(f"ℹ️ Элемент {element_selector} не изменился, скриншот пропущен (Поток {thread_id})")
+                return None
+                
+            filepath = self.store.save(thread_id, png_bytes, "png", "element_screenshot")
             self.logger.info(f"✅ Скриншот элемента сохранен: {filepath}")
             
             return filepath
@@ -97,4 +371,101 @@ class ScreenshotManager:
             
         except Exception as e:
             self.logger.error(f"❌ Ошибка при создании скриншота элемента: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+            
+    def take_screenshot_async(
+        self,
+        thread_id: int,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        only_if_changed: bool = False
+    ) -> Optional[Future]:
+        """
+        Снимает скриншот в память и передает кодирование в фоновый пул
+        
+        Args:
+            thread_id: ID потока (для логов)
+            crop: Область обрезки (left, top, right, bottom) в пикселях
+            only_if_changed: Кодировать только если страница заметно изменилась;
+                иначе Future вернет None
+            
+        Returns:
+            Optional[Future]: Future с закодированными байтами или None в случае ошибки
+        """
+        try:
+            WebDriverWait(self.driver, 10).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+            
+            if self.backend == "cdp":
+                clip = None
+                if crop:
+                    clip = self.driver.execute_script(
+                        "return {x: window.scrollX + arguments[0], y: window.scrollY + arguments[1], "
+                        "width: arguments[2], height: arguments[3]};",
+                        crop[0], crop[1], crop[2] - crop[0], crop[3] - crop[1]
+                    )
+                data = self.capture_region_cdp(
+                    clip=clip,
+                    image_format=self.image_format,
+                    max_width=self.max_width
+                )
+                if data is None:
+                    return None
+                if only_if_changed:
+                    return _encode_executor.submit(
+                        _pass_if_changed, data, self._history_key(thread_id)
+                    )
+                return _completed_future(data)
+                
+            png_bytes = self.driver.get_screenshot_as_png()
+            if only_if_changed:
+                return _encode_executor.submit(
+                    _encode_if_changed, png_bytes, self._history_key(thread_id),
+                    self.max_width, self.image_format, self.quality, crop
+                )
+            return _encode_executor.submit(
+                encode_image, png_bytes, self.max_width, self.image_format, self.quality, crop
+            )
+            
+        except TimeoutException:
+            self.logger.error(f"❌ Таймаут при ожидании загрузки страницы (Поток {thread_id})")
+            return None
+            
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка при создании скриншота в памяти (Поток {thread_id}): {str(e)}")
+            return None
+            
+    def take_screenshot_bytes(
+        self,
+        thread_id: int,
+        crop: Optional[Tuple[int, int, int, int]] = None,
+        timeout: float = 30,
+        only_if_changed: bool = False
+    ) -> Optional[bytes]:
+        """
+        Создает сжатый скриншот без записи на диск
+        
+        Args:
+            thread_id: ID потока (для логов)
+            crop: Область обрезки (left, top, right, bottom) в пикселях
+            timeout: Максимальное время ожидания кодирования в секундах
+            only_if_changed: Возвращать изображение только если страница заметно изменилась
+            
+        Returns:
+            Optional[bytes]: Закодированное изображение, UNCHANGED если страница
+                не изменилась, или None в случае ошибки
+        """
+        future = self.take_screenshot_async(thread_id, crop, only_if_changed)
+        if future is None:
+            return None
+            
+        try:
+            data = future.result(timeout=timeout)
+            if data is None:
+                self.logger.info(f"ℹ️ Страница не изменилась, скриншот пропущен (Поток {thread_id})")
+                return UNCHANGED
+            self.logger.info(f"✅ Скриншот в памяти создан: {len(data)} байт, {self.image_format} (Поток {thread_id})")
+            return data
+        except Exception as e:
+            self.logger.error(f"❌ Ошибка при кодировании скриншота (Поток {thread_id}): {str(e)}")
+            return None
@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from logger import Logger
+
+# Имя файла: <тип>_thread_<ID потока>_<временная метка>.<расширение>
+_FILENAME_PATTERN = re.compile(r"^(?P<kind>.+)_thread_(?P<thread_id>\d+)_")
+
+class ScreenshotStore:
+    """
+    Хранилище скриншотов с ограничением по объему и возрасту
+
+    Файлы раскладываются по поддиректориям вида screenshots/ГГГГММДД/ЧЧ, чтобы
+    каталоги оставались небольшими. Индекс в памяти хранит файлы в порядке
+    создания и последний снимок каждого потока; фоновый поток удаляет самые
+    старые файлы при превышении бюджета.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = "screenshots",
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_age: float = 7 * 86400,
+        janitor_interval: float = 60
+    ):
+        self.logger = Logger("screenshot_store")
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.janitor_interval = janitor_interval
+
+        self._lock = threading.Lock()
+        # (время создания, путь, размер) в порядке создания
+        self._files: Deque[Tuple[float, str, int]] = deque()
+        self._latest: Dict[Tuple[int, str], str] = {}
+        self._total_bytes = 0
+
+        self._janitor_thread = None
+        self._stop_janitor = threading.Event()
+
+        if not os.path.exists(self.root_dir):
+            os.makedirs(self.root_dir)
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        """Однократно строит индекс по существующим файлам при запуске"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root_dir):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+
+        entries.sort()
+        latest = {}
+        for _, path, _ in entries:
+            match = _FILENAME_PATTERN.match(os.path.basename(path))
+            if match:
+                latest[(int(match.group("thread_id")), match.group("kind"))] = path
+
+        with self._lock:
+            self._files = deque(entries)
+            self._total_bytes = sum(size for _, _, size in entries)
+            self._latest = latest
+
+        self.logger.info(
+            f"✅ Индекс скриншотов построен: {len(entries)} файлов, {self._total_bytes / 1048576:.1f} МБ"
+        )
+
+    def _shard_dir(self, timestamp: float) -> str:
+        """Возвращает директорию шарда для момента времени"""
+        return os.path.join(
+            self.root_dir,
+            time.strftime("%Y%m%d", time.localtime(timestamp)),
+            time.strftime("%H", time.localtime(timestamp))
+        )
+
+    def save(self, thread_id: int, data: bytes, extension: str = "png", kind: str = "screenshot") -> str:
+        """
+        Сохраняет скриншот и регистрирует его в индексе
+
+        Args:
+            thread_id: ID потока
+            data: Содержимое файла
+            extension: Расширение файла
+            kind: Тип снимка (используется в имени файла и индексе последних снимков)
+
+        Returns:
+            str: Путь к сохраненному файлу
+        """
+        now = time.time()
+        shard_dir = self._shard_dir(now)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now))
+        filename = f"{kind}_thread_{thread_id}_{timestamp}_{int(now * 1000) % 1000:03d}.{extension}"
+        filepath = os.path.join(shard_dir, filename)
+
+        # Пишем во временный файл, чтобы janitor и читатели не видели частичных файлов
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+
+        with self._lock:
+            self._files.append((now, filepath, len(data)))
+            self._total_bytes += len(data)
+            self._latest[(thread_id, kind)] = filepath
+
+        return filepath
+
+    def latest(self, thread_id: int, kind: str = "screenshot") -> Optional[str]:
+        """
+        Возвращает путь к последнему снимку потока без сканирования директорий
+
+        Args:
+            thread_id: ID потока
+            kind: Тип снимка
+
+        Returns:
+            Optional[str]: Путь к файлу или None
+        """
+        with self._lock:
+            return self._latest.get((thread_id, kind))
+
+    def usage(self) -> Tuple[int, int]:
+        """Возвращает (количество файлов, общий объем в байтах)"""
+        with self._lock:
+            return len(self._files), self._total_bytes
+
+    def evict(self) -> int:
+        """
+        Удаляет самые старые файлы сверх бюджета по объему и возрасту
+
+        Returns:
+            int: Количество удаленных файлов
+        """
+        cutoff = time.time() - self.max_age
+        to_remove = []
+
+        with self._lock:
+            while self._files and (
+                self._total_bytes > self.max_bytes or self._files[0][0] < cutoff
+            ):
+                created, path, size = self._files.popleft()
+                self._total_bytes -= size
+                to_remove.append(path)
+
+            removed_paths = set(to_remove)
+            for key in [key for key, path in self._latest.items() if path in removed_paths]:
+                del self._latest[key]
+
+        # Удаление файлов выполняем вне блокировки
+        shard_dirs = set()
+        for path in to_remove:
+            try:
+                os.remove(path)
+                shard_dirs.add(os.path.dirname(path))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"⚠️ Не удалось удалить скриншот {path}: {str(e)}")
+
+        for shard_dir in shard_dirs:
+            self._remove_empty_dirs(shard_dir)
+
+        if to_remove:
+            self.logger.info(f"🧹 Удалено старых скриншотов: {len(to_remove)}")
+        return len(to_remove)
+
+    def _remove_empty_dirs(self, path: str) -> None:
+        """Удаляет пустые директории шардов вверх до корня хранилища"""
+        root = os.path.abspath(self.root_dir)
+        path = os.path.abspath(path)
+        while path != root and path.startswith(root):
+            try:
+                os.rmdir(path)
+            except OSError:
+                return
+            path = os.path.dirname(path)
+
+    def start_janitor(self) -> None:
+        """Запускает фоновую очистку хранилища"""
+        with self._lock:
+            if self._janitor_thread and self._janitor_thread.is_alive():
+                return
+            self._stop_janitor.clear()
+            self._janitor_thread = threading.Thread(target=self._janitor_loop, name="ScreenshotJanitor")
+            self._janitor_thread.daemon = True
+            self._janitor_thread.start()
+
+    def stop_janitor(self) -> None:
+        """Останавливает фоновую очистку хранилища"""
+        self._stop_janitor.set()
+        if self._janitor_thread:
+            self._janitor_thread.join(timeout=5)
+
+    def _janitor_loop(self) -> None:
+        """Цикл фоновой очистки"""
+        while not self._stop_janitor.is_set():
+            try:
+                self.evict()
+            except Exception as e:
+                self.logger.error("❌ Ошибка в цикле очистки скриншотов", exc_info=e)
+            self._stop_janitor.wait(self.janitor_interval)
+
+# Создаем глобальный экземпляр хранилища
+screenshot_store = ScreenshotStore(
+    max_bytes=int(os.getenv("SCREENSHOT_STORE_MAX_MB", "1024")) * 1024 * 1024,
+    max_age=float(os.getenv("SCREENSHOT_STORE_MAX_AGE_HOURS", "168")) * 3600
+)
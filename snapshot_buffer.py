@@ -0,0 +1,243 @@
+import os
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Числовые столбцы буфера (все типа double; отсутствующее значение - NaN)
+COLUMNS = ("ts", "mark_price", "entry_price", "pnl", "pnl_percent", "leverage")
+
+class SymbolTable:
+    """Интернирует строки в небольшие целые числа"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def intern(self, name: str) -> int:
+        """Возвращает номер строки, добавляя ее при первом обращении"""
+        index = self._ids.get(name)
+        if index is None:
+            index = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return index
+
+    def get(self, name: str) -> Optional[int]:
+        """Возвращает номер строки или None, если она не встречалась"""
+        return self._ids.get(name)
+
+    def name(self, index: int) -> str:
+        """Возвращает строку по номеру"""
+        return self._names[index]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+class SnapshotBuffer:
+    """
+    Кольцевые буферы последних снимков позиций в памяти
+
+    Каждая пара (трейдер, символ) - это ряд с фиксированным номером. Значения
+    хранятся по столбцам в заранее выделенных массивах array размером
+    max_series * capacity: строка ряда i с позицией j лежит по индексу
+    i * capacity + j. Память не растет со временем, добавление - O(1), а
+    столбцы можно без копирования представить матрицей (ряд x позиция)
+    для векторных вычислений. Трейдеры и символы хранятся номерами.
+    """
+
+    def __init__(self, max_series: int = 1024, capacity: int = 480):
+        """
+        Args:
+            max_series: Максимальное количество пар (трейдер, символ)
+            capacity: Количество последних снимков на ряд
+        """
+        self.max_series = max_series
+        self.capacity = capacity
+        self._lock = threading.Lock()
+
+        size = max_series * capacity
+        self.columns: Dict[str, array] = {name: array("d", [math.nan]) * size for name in COLUMNS}
+        # Позиция следующей записи и количество снимков в каждом ряду
+        self.heads = array("l", [0]) * max_series
+        self.sizes = array("l", [0]) * max_series
+        # Время последнего снимка ряда (для вытеснения самого давнего)
+        self.updated = array("d", [0.0]) * max_series
+        self.series_trader = array("l", [-1]) * max_series
+        self.series_symbol = array("l", [-1]) * max_series
+        # Поколение ряда растет при каждой выдаче номера новой паре: по нему
+        # потребители состояния по номерам рядов узнают, что ряд сменил владельца
+        self.generations = array("l", [0]) * max_series
+
+        self.traders = SymbolTable()
+        self.symbols = SymbolTable()
+        self._series: Dict[Tuple[int, int], int] = {}
+        # Освобожденные ряды (закрытые позиции) и количество когда-либо выданных рядов
+        self._free: List[int] = []
+        self._allocated = 0
+
+    def series_id(self, trader: str, symbol: str) -> Optional[int]:
+        """Возвращает номер ряда или None, если снимков пары еще нет"""
+        key = (self.traders.get(trader), self.symbols.get(symbol))
+        return self._series.get(key)
+
+    def _allocate(self, key: Tuple[int, int]) -> int:
+        """Выделяет ряд для новой пары (вызывается под блокировкой)"""
+        if self._free:
+            series = self._free.pop()
+        elif self._allocated < self.max_series:
+            series = self._allocated
+            self._allocated += 1
+        else:
+            # Все ряды заняты: переиспользуем ряд, который дольше всех не обновлялся
+            series = min(range(self.max_series), key=self.updated.__getitem__)
+            del self._series[(self.series_trader[series], self.series_symbol[series])]
+            self._clear(series)
+        self._series[key] = series
+        self.series_trader[series], self.series_symbol[series] = key
+        self.generations[series] += 1
+        return series
+
+    def _clear(self, series: int) -> None:
+        """Стирает снимки ряда (вызывается под блокировкой)"""
+        self.heads[series] = 0
+        self.sizes[series] = 0
+        # Старые значения стираем, чтобы они не попали в векторные расчеты
+        base = series * self.capacity
+        blank = array("d", [math.nan]) * self.capacity
+        for column in self.columns.values():
+            column[base:base + self.capacity] = blank
+
+    def release(self, trader: str, symbol: str) -> Optional[int]:
+        """
+        Освобождает ряд пары (например, закрытой позиции)
+
+        Снимки ряда стираются, и он больше не попадает в latest_all и
+        векторные расчеты; номер ряда достается следующей новой паре.
+
+        Returns:
+            Optional[int]: Номер освобожденного ряда или None, если ряда не было
+        """
+        with self._lock:
+            key = (self.traders.get(trader), self.symbols.get(symbol))
+            series = self._series.pop(key, None)
+            if series is None:
+                return None
+            self._clear(series)
+            self._free.append(series)
+            return series
+
+    def append(self, trader: str, symbol: str, ts: float, values: Dict[str, Optional[float]]) -> int:
+        """
+        Добавляет снимок в ряд пары (трейдер, символ)
+
+        Args:
+            trader: ID трейдера
+            symbol: Символ позиции
+            ts: Время снимка
+            values: Числовые значения (см. position_reader.position_values)
+
+        Returns:
+            int: Номер ряда
+        """
+        with self._lock:
+            key = (self.traders.intern(trader), self.symbols.intern(symbol))
+            series = self._series.get(key)
+            if series is None:
+                series = self._allocate(key)
+
+            head = self.heads[series]
+            index = series * self.capacity + head
+            self.columns["ts"][index] = ts
+            for name in COLUMNS[1:]:
+                value = values.get(name)
+                self.columns[name][index] = math.nan if value is None else value
+
+            self.heads[series] = (head + 1) % self.capacity
+            if self.sizes[series] < self.capacity:
+                self.sizes[series] += 1
+            self.updated[series] = ts
+            return series
+
+    def _ordered(self, series: int, column: str) -> array:
+        """Возвращает значения ряда от старых к новым (копия среза)"""
+        base = series * self.capacity
+        head, size = self.heads[series], self.sizes[series]
+        data = self.columns[column]
+        if size < self.capacity:
+            return data[base:base + size]
+        return data[base + head:base + self.capacity] + data[base:base + head]
+
+    def window(
+        self,
+        trader: str,
+        symbol: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Dict[str, array]:
+        """
+        Возвращает снимки ряда за период по столбцам, от старых к новым
+
+        Args:
+            trader: ID трейдера
+            symbol: Символ позиции
+            start: Начало периода (включительно)
+            end: Конец периода (не включительно)
+
+        Returns:
+            Dict[str, array]: Столбцы COLUMNS (пустые, если ряда нет)
+        """
+        with self._lock:
+            series = self.series_id(trader, symbol)
+            if series is None:
+                return {name: array("d") for name in COLUMNS}
+            columns = {name: self._ordered(series, name) for name in COLUMNS}
+
+        # Время внутри ряда возрастает, поэтому границы ищем двоичным поиском
+        ts = columns["ts"]
+        low = bisect_left(ts, start) if start is not None else 0
+        high = bisect_left(ts, end) if end is not None else len(ts)
+        return {name: values[low:high] for name, values in columns.items()}
+
+    def latest(self, trader: str, symbol: str) -> Optional[Dict[str, float]]:
+        """Возвращает последний снимок ряда"""
+        with self._lock:
+            series = self.series_id(trader, symbol)
+            if series is None or not self.sizes[series]:
+                return None
+            return self._latest(series)
+
+    def _latest(self, series: int) -> Dict[str, float]:
+        """Последний снимок ряда (вызывается под блокировкой)"""
+        index = series * self.capacity + (self.heads[series] - 1) % self.capacity
+        return {name: self.columns[name][index] for name in COLUMNS}
+
+    def latest_all(self) -> List[Dict[str, object]]:
+        """Возвращает последние снимки всех рядов, от свежих к старым"""
+        with self._lock:
+            rows = [
+                {
+                    "trader": self.traders.name(trader),
+                    "symbol": self.symbols.name(symbol),
+                    **self._latest(series)
+                }
+                for (trader, symbol), series in self._series.items()
+                if self.sizes[series]
+            ]
+        rows.sort(key=lambda row: row["ts"], reverse=True)
+        return rows
+
+    def series_count(self) -> int:
+        """Возвращает количество занятых рядов"""
+        with self._lock:
+            return len(self._series)
+
+    def memory_bytes(self) -> int:
+        """Возвращает объем памяти столбцов (не меняется во время работы)"""
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+# Создаем глобальный экземпляр буфера
+snapshot_buffer = SnapshotBuffer(
+    max_series=int(os.getenv("SNAPSHOT_BUFFER_SERIES", "1024")),
+    capacity=int(os.getenv("SNAPSHOT_BUFFER_CAPACITY", "480"))
+)
@@ -1,10 +1,17 @@
 import os
+import json
 import logging
 import requests
 import time
 import threading
-from typing import Optional, Union, Callable, Dict, List
+from typing import Optional, Union, Callable, Dict, List, Tuple
 from io import BytesIO
+from notification_store import notification_store
+from metrics import metrics
+
+SEND_DURATION = metrics.summary("cptrade_telegram_send_duration_seconds", "Длительность запроса к Telegram API", ("method",))
+SENT = metrics.counter("cptrade_telegram_sent_total", "Запросы отправки в Telegram по HTTP-статусу", ("method", "status"))
+RETRIES = metrics.counter("cptrade_retries_total", "Повторные попытки по операциям", ("operation",))
 
 class TelegramManager:
     """Менеджер для работы с Telegram API"""
@@ -14,9 +21,16 @@ class TelegramManager:
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
         self.logger = logging.getLogger(__name__)
         self.command_handlers: Dict[str, Callable] = {}
-        self.last_update_id = 0
+        self.store = notification_store
+        self.last_update_id = int(self.store.get_checkpoint("telegram_last_update_id", "0"))
         self.running = False
         self.poll_thread = None
+        self.delivery_running = False
+        self.delivery_thread = None
+        self._delivery_wakeup = threading.Event()
+        # Доставленные сообщения хранятся сутки, очистка - раз в час
+        self.sent_retention = 86400
+        self.purge_interval = 3600
         
         if not self.bot_token:
             self.logger.warning("⚠️ Отсутствует переменная окружения TELEGRAM_BOT_TOKEN")
@@ -66,14 +80,16 @@ class TelegramManager:
             escaped_message = message.replace("<", "&lt;").replace(">", "&gt;")
             
             # Отправляем сообщение
-            response = requests.post(
-                f"https://api.telegram.org/bot{self.bot_token}/sendMessage",
-                json={
-                    "chat_id": target_chat_id,
-                    "text": escaped_message,
-                    "parse_mode": "HTML"
-                }
-            )
+            with SEND_DURATION.labels("sendMessage").time():
+                response = requests.post(
+                    f"https://api.telegram.org/bot{self.bot_token}/sendMessage",
+                    json={
+                        "chat_id": target_chat_id,
+                        "text": escaped_message,
+                        "parse_mode": "HTML"
+                    }
+                )
+            SENT.labels("sendMessage", str(response.status_code)).inc()
             
             if response.status_code == 200:
                 self.logger.info(f"✅ Сообщение отправлено в чат {target_chat_id}")
@@ -87,6 +103,99 @@ class TelegramManager:
             self.logger.error("❌ Ошибка при отправке сообщения в Telegram", exc_info=e)
             return False
     
+    def enqueue_message(
+        self,
+        message: str,
+        chat_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> bool:
+        """
+        Ставит сообщение в долговременную очередь отправки
+        
+        Сообщение сохраняется на диск до отправки и будет доставлено
+        после перезапуска, если процесс завершится раньше.
+        
+        Args:
+            message: Текст сообщения
+            chat_id: ID чата для отправки (если None, используется CHAT_ID из .env)
+            idempotency_key: Ключ для исключения повторной постановки того же сообщения
+            
+        Returns:
+            bool: True если сообщение добавлено в очередь
+        """
+        target_chat_id = chat_id or self.chat_id
+        queued = self.store.enqueue(
+            "message",
+            {"text": message},
+            str(target_chat_id) if target_chat_id else None,
+            idempotency_key
+        )
+        if queued:
+            self._delivery_wakeup.set()
+        else:
+            self.logger.info(f"ℹ️ Сообщение с ключом {idempotency_key} уже в очереди")
+        return queued
+    
+    def start_delivery(self) -> None:
+        """Запускает поток доставки сообщений из очереди"""
+        if self.delivery_thread and self.delivery_thread.is_alive():
+            return
+            
+        self.delivery_running = True
+        self.delivery_thread = threading.Thread(target=self._delivery_loop, name="TelegramDelivery")
+        self.delivery_thread.daemon = True
+        self.delivery_thread.start()
+        self.logger.info(f"✅ Запущена доставка сообщений (в очереди: {self.store.pending_count()})")
+        
+    def stop_delivery(self) -> None:
+        """Останавливает поток доставки сообщений"""
+        self.delivery_running = False
+        self._delivery_wakeup.set()
+        if self.delivery_thread:
+            self.delivery_thread.join(timeout=5)
+            self.logger.info("✅ Остановлена доставка сообщений")
+            
+    def _delivery_loop(self) -> None:
+        """Отправляет накопленные в очереди сообщения"""
+        last_purge = 0.0
+        while self.delivery_running:
+            try:
+                if time.time() - last_purge >= self.purge_interval:
+                    last_purge = time.time()
+                    purged = self.store.purge_sent(self.sent_retention)
+                    if purged:
+                        self.logger.info(f"🧹 Удалено доставленных сообщений из очереди: {purged}")
+                    
+                entries = self.store.fetch_due()
+                for entry in entries:
+                    if not self.delivery_running:
+                        break
+                    self._deliver(entry)
+                    
+                if not entries:
+                    self._delivery_wakeup.wait(timeout=1)
+                    self._delivery_wakeup.clear()
+                    
+            except Exception as e:
+                self.logger.error("❌ Ошибка в цикле доставки сообщений", exc_info=e)
+                time.sleep(1)
+                
+    def _deliver(self, entry: Dict) -> None:
+        """Отправляет одну запись очереди и фиксирует результат"""
+        if entry["kind"] == "message":
+            success = self.send_message(entry["payload"]["text"], entry["chat_id"])
+        else:
+            self.logger.warning(f"⚠️ Неизвестный тип уведомления: {entry['kind']}")
+            success = False
+            
+        if success:
+            self.store.mark_sent(entry["id"])
+        else:
+            delay = min(5 * (2 ** entry["attempts"]), 300)
+            self.store.mark_failed(entry["id"], delay)
+            RETRIES.labels("telegram_delivery").inc()
+            self.logger.warning(f"⚠️ Повторная отправка сообщения {entry['id']} через {delay} секунд")
+    
     def send_photo(self, photo: Union[bytes, BytesIO], caption: Optional[str] = None, chat_id: Optional[str] = None) -> bool:
         """
         Отправляет фото в Telegram
@@ -107,13 +216,16 @@ class TelegramManager:
             if isinstance(photo, BytesIO):
                 photo = photo.getvalue()
                 
-            files = {'photo': ('screenshot.png', photo, 'image/png')}
+            filename, mime_type = self._detect_image_type(photo)
+            files = {'photo': (filename, photo, mime_type)}
             data = {"chat_id": chat_id or self.chat_id}
             
             if caption:
                 data["caption"] = caption
                 
-            response = requests.post(url, data=data, files=files)
+            with SEND_DURATION.labels("sendPhoto").time():
+                response = requests.post(url, data=data, files=files)
+            SENT.labels("sendPhoto", str(response.status_code)).inc()
             
             if response.status_code == 200:
                 self.logger.info("✅ Фото успешно отправлено в Telegram")
@@ -127,6 +239,78 @@ class TelegramManager:
             self.logger.error("❌ Ошибка при отправке фото в Telegram", exc_info=e)
             return False
             
+    def send_media_group(
+        self,
+        photos: List[Tuple[bytes, Optional[str]]],
+        chat_id: Optional[str] = None
+    ) -> bool:
+        """
+        Отправляет фото альбомами по 10 штук (ограничение sendMediaGroup)
+        
+        Args:
+            photos: Список пар (фото в формате bytes, подпись)
+            chat_id: ID чата для отправки (если None, используется TELEGRAM_CHAT_ID)
+            
+        Returns:
+            bool: True если все альбомы отправлены успешно
+        """
+        if not self.is_configured():
+            self.logger.error("❌ Не настроена интеграция с Telegram")
+            return False
+            
+        url = f"https://api.telegram.org/bot{self.bot_token}/sendMediaGroup"
+        success = True
+        
+        for start in range(0, len(photos), 10):
+            chunk = photos[start:start + 10]
+            
+            # Альбом из одного фото Telegram не принимает
+            if len(chunk) == 1:
+                success = self.send_photo(chunk[0][0], chunk[0][1], chat_id) and success
+                continue
+                
+            try:
+                media = []
+                files = {}
+                for index, (photo, caption) in enumerate(chunk):
+                    name = f"photo{index}"
+                    filename, mime_type = self._detect_image_type(photo)
+                    files[name] = (filename, photo, mime_type)
+                    item = {"type": "photo", "media": f"attach://{name}"}
+                    if caption:
+                        item["caption"] = caption
+                    media.append(item)
+                    
+                with SEND_DURATION.labels("sendMediaGroup").time():
+                    response = requests.post(
+                        url,
+                        data={"chat_id": chat_id or self.chat_id, "media": json.dumps(media)},
+                        files=files
+                    )
+                SENT.labels("sendMediaGroup", str(response.status_code)).inc()
+                
+                if response.status_code == 200:
+                    self.logger.info(f"✅ Альбом из {len(chunk)} фото отправлен в Telegram")
+                else:
+                    self.logger.error(f"❌ Ошибка отправки альбома в Telegram: {response.status_code}")
+                    self.logger.error(f"Ответ сервера: {response.text}")
+                    success = False
+                    
+            except Exception as e:
+                self.logger.error("❌ Ошибка при отправке альбома в Telegram", exc_info=e)
+                success = False
+                
+        return success
+        
+    @staticmethod
+    def _detect_image_type(photo: bytes) -> tuple:
+        """Определяет имя файла и MIME-тип изображения по сигнатуре"""
+        if photo[:3] == b"\xff\xd8\xff":
+            return "screenshot.jpg", "image/jpeg"
+        if photo[:4] == b"RIFF" and photo[8:12] == b"WEBP":
+            return "screenshot.webp", "image/webp"
+        return "screenshot.png", "image/png"
+            
     def start_polling(self) -> None:
         """Запускает процесс получения обновлений от Telegram API"""
         if not self.is_configured():
@@ -162,8 +346,11 @@ class TelegramManager:
                     data = response.json()
                     if data["ok"] and data["result"]:
                         for update in data["result"]:
-                            self._handle_update(update)
+                            # Сохраняем смещение до обработки, чтобы после
+                            # перезапуска команда не выполнилась повторно
                             self.last_update_id = update["update_id"]
+                            self.store.set_checkpoint("telegram_last_update_id", self.last_update_id)
+                            self._handle_update(update)
                 else:
                     self.logger.error(f"❌ Ошибка получения обновлений: {response.status_code}")
                     self.logger.error(f"Ответ сервера: {response.text}")
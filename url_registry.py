@@ -0,0 +1,148 @@
+import os
+import json
+import threading
+from typing import Callable, List, Optional, Set
+from logger import Logger
+from config_manager import config_manager
+
+class UrlRegistry:
+    """
+    Реестр отслеживаемых URL в памяти
+
+    Все изменения выполняются под блокировкой и сразу видны подписчикам;
+    запись в urls.json выполняется фоновым потоком атомарно (через временный
+    файл и os.replace), поэтому обработчики команд не конкурируют за файл.
+    """
+
+    def __init__(self, urls_file: str = "urls.json"):
+        self.logger = Logger("url_registry")
+        self.urls_file = urls_file
+        self._lock = threading.Lock()
+        self._urls: List[str] = list(config_manager.config.urls)
+        self._subscribers: List[Callable[[List[str]], None]] = []
+
+        self._dirty = threading.Event()
+        self._writer_thread = None
+        self._stop_writer = threading.Event()
+
+        # Внешние правки urls.json тоже попадают в реестр
+        config_manager.subscribe(self._on_config_change)
+
+    def list(self) -> List[str]:
+        """Возвращает копию текущего списка URL"""
+        with self._lock:
+            return list(self._urls)
+
+    def add(self, url: str) -> bool:
+        """
+        Добавляет URL
+
+        Returns:
+            bool: False если URL уже есть в списке
+        """
+        with self._lock:
+            if url in self._urls:
+                return False
+            self._urls.append(url)
+        self._changed()
+        return True
+
+    def remove_index(self, index: int) -> Optional[str]:
+        """
+        Удаляет URL по индексу (с нуля)
+
+        Returns:
+            Optional[str]: Удаленный URL или None при неверном индексе
+        """
+        with self._lock:
+            if not 0 <= index < len(self._urls):
+                return None
+            removed = self._urls.pop(index)
+        self._changed()
+        return removed
+
+    def clear(self) -> None:
+        """Очищает список URL"""
+        with self._lock:
+            self._urls = []
+        self._changed()
+
+    def subscribe(self, callback: Callable[[List[str]], None]) -> None:
+        """
+        Подписывает обработчик на изменение списка URL
+
+        Args:
+            callback: Функция, получающая новый список URL
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _changed(self) -> None:
+        """Планирует запись на диск и уведомляет подписчиков"""
+        self._dirty.set()
+        self._start_writer()
+
+        urls = self.list()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(urls)
+            except Exception as e:
+                self.logger.error("❌ Ошибка в обработчике изменения списка URL", exc_info=e)
+
+    def _on_config_change(self, old_config, new_config, changed: Set[str]) -> None:
+        """Подхватывает ручные правки urls.json"""
+        if "urls" not in changed:
+            return
+        with self._lock:
+            if new_config.urls == self._urls:
+                return
+            self._urls = list(new_config.urls)
+        self.logger.info("🔄 Список URL обновлен из файла")
+        self._changed()
+
+    def _start_writer(self) -> None:
+        """Запускает фоновую запись, если она еще не запущена"""
+        with self._lock:
+            if self._writer_thread and self._writer_thread.is_alive():
+                return
+            self._stop_writer.clear()
+            self._writer_thread = threading.Thread(target=self._writer_loop, name="UrlRegistryWriter")
+            self._writer_thread.daemon = True
+            self._writer_thread.start()
+
+    def _writer_loop(self) -> None:
+        """Записывает накопленные изменения; несколько правок подряд дают одну запись"""
+        while not self._stop_writer.is_set():
+            if not self._dirty.wait(timeout=1):
+                continue
+            self._dirty.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error("❌ Ошибка при сохранении списка URL", exc_info=e)
+                self._dirty.set()
+                self._stop_writer.wait(5)
+
+    def flush(self) -> None:
+        """Атомарно записывает текущий список URL в файл"""
+        urls = self.list()
+        tmp_path = f"{self.urls_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"urls": urls}, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.urls_file)
+
+    def stop(self) -> None:
+        """Останавливает фоновую запись, сохранив несохраненные изменения"""
+        self._stop_writer.set()
+        if self._writer_thread:
+            self._writer_thread.join(timeout=5)
+        if self._dirty.is_set():
+            self._dirty.clear()
+            self.flush()
+
+# Создаем глобальный экземпляр реестра
+url_registry = UrlRegistry()
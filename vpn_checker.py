@@ -4,7 +4,7 @@ import time
 from typing import Tuple
 from logger import Logger
 from telegram_manager import telegram_manager
-from env_manager import EnvManager
+from config_manager import config_manager
 from vpn_extension_manager import VPNExtensionManager
 
 class VPNChecker:
@@ -12,7 +12,7 @@ class VPNChecker:
     
     def __init__(self, driver=None):
         self.logger = Logger("vpn_checker")
-        self.env = EnvManager()
+        self.env = config_manager.env
         self.env_type = self.env.get("ENV_TYPE", "local")
         self.check_url = "https://www.binance.com"
         self.max_retries = self.env.get_int("VPN_CHECK_RETRIES", 3)
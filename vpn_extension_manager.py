@@ -7,7 +7,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from logger import Logger
-from env_manager import EnvManager
+from config_manager import config_manager
 from telegram_manager import telegram_manager
 
 class VPNExtensionManager:
@@ -16,7 +16,7 @@ class VPNExtensionManager:
     def __init__(self, driver: WebDriver):
         self.driver = driver
         self.logger = Logger("vpn_extension")
-        self.env = EnvManager()
+        self.env = config_manager.env
         self.wait = WebDriverWait(driver, 10)
         self.check_url = "https://whatismyipaddress.com/"
         